@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+`cordova` finto per i benchmark: simula la durata dei comandi e scrive APK / AAB
+finti dove li scriverebbe Cordova, senza Node né Android SDK. Gli artefatti
+sono zip con un AndroidManifest.xml binario (AXML per l'APK, protobuf per
+l'AAB) con la versione di config.xml e una firma v1 finta, così passano la
+verifica di artifact_verify.py.
+
+Durate in millisecondi da BENCH_CORDOVA_MS (JSON, es. '{"platform add": 50}'),
+moltiplicate per BENCH_CORDOVA_SCALE (default 1.0). Con `--gradle` si comporta
+come il Gradle wrapper generato da `platform add`.
+"""
+import json
+import os
+import re
+import struct
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+DEFAULT_MS = {
+    "platform add": 400,
+    "platform remove": 50,
+    "prepare": 150,
+    "build": 800,
+    "gradle": 900,
+}
+
+OUTPUTS = Path("platforms/android/app/build/outputs")
+
+def simulate(command: str):
+    durations = dict(DEFAULT_MS)
+    durations.update(json.loads(os.environ.get("BENCH_CORDOVA_MS", "{}")))
+    scale = float(os.environ.get("BENCH_CORDOVA_SCALE", "1.0"))
+    time.sleep(durations.get(command, 0) * scale / 1000)
+
+ANDROID_NS = "http://schemas.android.com/apk/res/android"
+VERSION_CODE_ID = 0x0101021B
+VERSION_NAME_ID = 0x0101021C
+
+def project_version(root: Path = Path(".")) -> str:
+    m = re.search(r'<widget\b[^>]*\bversion="([^"]+)"', (root / "config.xml").read_text(encoding="utf-8"))
+    return m.group(1) if m else "0.0.0"
+
+def version_code(version: str) -> int:
+    # Come cordova-android: major * 10000 + minor * 100 + patch
+    parts = [int(p) for p in re.findall(r"\d+", version)[:3]] + [0, 0, 0]
+    return parts[0] * 10000 + parts[1] * 100 + parts[2]
+
+def _chunk(kind: int, header: bytes, body: bytes) -> bytes:
+    return struct.pack("<HHI", kind, 8 + len(header), 8 + len(header) + len(body)) + header + body
+
+def axml_manifest(version: str) -> bytes:
+    """<manifest android:versionCode=... android:versionName=...> in XML binario."""
+    strings = ["versionCode", "versionName", "manifest", ANDROID_NS, "android", version]
+    offsets, data = [], b""
+    for text in strings:
+        offsets.append(len(data))
+        data += struct.pack("<H", len(text)) + text.encode("utf-16-le") + b"\0\0"
+    data += b"\0" * (-len(data) % 4)
+    pool = _chunk(
+        0x0001,
+        struct.pack("<IIIII", len(strings), 0, 0, 28 + 4 * len(strings), 0),
+        struct.pack(f"<{len(strings)}I", *offsets) + data,
+    )
+    resources = _chunk(0x0180, b"", struct.pack("<II", VERSION_CODE_ID, VERSION_NAME_ID))
+    attributes = (
+        struct.pack("<IIIHBBI", 3, 0, 0xFFFFFFFF, 8, 0, 0x10, version_code(version))
+        + struct.pack("<IIIHBBI", 3, 1, 5, 8, 0, 0x03, 5)
+    )
+    element = _chunk(
+        0x0102,
+        struct.pack("<II", 1, 0xFFFFFFFF),
+        struct.pack("<IIHHHHHH", 0xFFFFFFFF, 2, 20, 20, 2, 0, 0, 0) + attributes,
+    )
+    return _chunk(0x0003, b"", pool + resources + element)
+
+def _varint(value: int) -> bytes:
+    out = b""
+    while value > 0x7F:
+        out += bytes([value & 0x7F | 0x80])
+        value >>= 7
+    return out + bytes([value])
+
+def _field(number: int, value) -> bytes:
+    if isinstance(value, int):
+        return _varint(number << 3) + _varint(value)
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return _varint(number << 3 | 2) + _varint(len(value)) + value
+
+def proto_manifest(version: str) -> bytes:
+    """Stesso manifest nel formato protobuf (XmlNode) di aapt2, come negli AAB."""
+    def attribute(name: str, value: str, resource_id: int) -> bytes:
+        return _field(1, ANDROID_NS) + _field(2, name) + _field(3, value) + _field(5, resource_id)
+
+    element = (
+        _field(3, "manifest")
+        + _field(4, attribute("versionCode", str(version_code(version)), VERSION_CODE_ID))
+        + _field(4, attribute("versionName", version, VERSION_NAME_ID))
+    )
+    return _field(1, element)
+
+def fake_artifact(path: Path, size: int = 256 * 1024):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    version = project_version()
+    bundle = path.suffix == ".aab"
+    with zipfile.ZipFile(path, "w") as zf:
+        if bundle:
+            zf.writestr("base/manifest/AndroidManifest.xml", proto_manifest(version), zipfile.ZIP_DEFLATED)
+        else:
+            zf.writestr("AndroidManifest.xml", axml_manifest(version), zipfile.ZIP_DEFLATED)
+        # Contenuto diverso a ogni build, come succede con Gradle (timestamp, firme)
+        zf.writestr("base/dex/classes.dex" if bundle else "classes.dex", os.urandom(size))
+        zf.writestr("META-INF/CERT.SF", "Signature-Version: 1.0\n")
+        zf.writestr("META-INF/CERT.RSA", os.urandom(1024))
+
+def write_gradle_wrapper(project: Path):
+    tools = project / "tools"
+    tools.mkdir(parents=True, exist_ok=True)
+    script = Path(__file__).resolve()
+    gradlew = tools / "gradlew"
+    gradlew.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" --gradle "$@"\n', encoding="utf-8")
+    gradlew.chmod(0o755)
+    (tools / "gradlew.bat").write_text(f'@"{sys.executable}" "{script}" --gradle %*\r\n', encoding="utf-8")
+
+def gradle(args: list[str]) -> int:
+    project = Path(args[args.index("-p") + 1]) if "-p" in args else Path("platforms/android")
+    simulate("gradle")
+    outputs = project / "app/build/outputs"
+    if ":app:assembleRelease" in args:
+        fake_artifact(outputs / "apk/release/app-release.apk")
+    if ":app:bundleRelease" in args:
+        fake_artifact(outputs / "bundle/release/app-release.aab")
+    return 0
+
+def main() -> int:
+    args = sys.argv[1:]
+    if args[:1] == ["--gradle"]:
+        return gradle(args[1:])
+
+    command = " ".join(args[:2])
+    if command.startswith("build"):
+        command = "build"
+    elif command.startswith("prepare"):
+        command = "prepare"
+    simulate(command)
+
+    if args[:2] == ["platform", "add"]:
+        name = args[2].split("@", 1)[0]
+        Path("platforms", name).mkdir(parents=True, exist_ok=True)
+        Path("node_modules", f"cordova-{name}").mkdir(parents=True, exist_ok=True)
+        Path("plugins").mkdir(exist_ok=True)
+        if name == "android":
+            write_gradle_wrapper(Path("platforms/android"))
+        elif name == "ios":
+            Path("platforms/ios/Intelliclima+.xcworkspace").mkdir(parents=True, exist_ok=True)
+    elif args[:2] == ["build", "android"]:
+        if "--debug" in args:
+            fake_artifact(OUTPUTS / "apk/debug/app-debug.apk")
+        elif "--packageType=bundle" in args:
+            fake_artifact(OUTPUTS / "bundle/release/app-release.aab")
+        else:
+            fake_artifact(OUTPUTS / "apk/release/app-release.apk")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Benchmark riproducibili degli hook su repo cliente sintetici.
+
+Per ogni run crea in una cartella temporanea una repo "cliente" con:
+- www/js/route.js minificato di --route-mb MB (versione a metà file);
+- CHANGELOG.md con --changelog-entries sezioni;
+- --staged-files file extra in www/ staged insieme ai file di versione;
+- --branches branch (creati in blocco con `git update-ref --stdin`);
+- il tool copiato in tools/git-hooks-cordova e hook attivati con setup_hooks.py;
+- un `cordova` finto (fake_cordova.py) che simula le durate e scrive APK/AAB.
+
+Misura ogni script di controllo in scripts/ da solo, i wrapper `pre-commit` e
+`commit-msg` end to end (a freddo, con la cache dei risultati e tramite il
+daemon degli hook) e il `pre-push`
+con build Android (a freddo e dalla build cache). Risultati in
+bench/results/<timestamp>.json; con --baseline (default bench/baseline.json se
+esiste) confronta le mediane e termina con 1 se qualcosa è più lento della
+soglia (--threshold, default 20%). --update-baseline salva il run come baseline.
+
+Uso:
+    python bench/run_bench.py --route-mb 8 --staged-files 500 --repeat 5
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+TOOL_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+
+VERSION = "9.8.7"
+OLD_VERSION = "9.8.6"
+
+# Sotto questa differenza assoluta (ms) una variazione è rumore, non regressione
+NOISE_FLOOR_MS = 5.0
+
+CHECKS = [
+    "check_release_branch_versions",
+    "check_versions_consistency",
+    "check_commit_message_version",
+]
+
+def git(repo: Path, *args: str, **kwargs) -> str:
+    return subprocess.run(
+        ["git", *args],
+        cwd=repo,
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+        **kwargs,
+    ).stdout
+
+def minified_js(size: int, version: str, produzione: bool) -> str:
+    """Bundle JS su una sola riga, con versione e _versioneProduzione a metà."""
+    rnd = random.Random(size)
+    chunk = "".join(
+        f"function {''.join(rnd.choices(string.ascii_lowercase, k=6))}(a,b){{return a+b*{i}}};"
+        for i in range(2000)
+    )
+    half = max(size // 2, 1)
+    head = (chunk * (half // len(chunk) + 1))[:half]
+    middle = (
+        f'var _versioneProduzione = {"true" if produzione else "false"};'
+        f'FCIC_CONFIG.VERSION = "{version}";'
+    )
+    tail = (chunk * ((size - half) // len(chunk) + 1))[: size - half]
+    return head + middle + tail + "\n"
+
+def config_xml(version: str) -> str:
+    return (
+        "<?xml version='1.0' encoding='utf-8'?>\n"
+        f'<widget id="com.example.bench" version="{version}" xmlns="http://www.w3.org/ns/widgets">\n'
+        "    <name>Bench</name>\n"
+        '    <plugin name="cordova-plugin-device" spec="^2.1.0" />\n'
+        '    <engine name="android" spec="14" />\n'
+        "</widget>\n"
+    )
+
+def changelog(entries: int, newest: str) -> str:
+    lines = ["# Changelog", ""]
+    versions = [newest] + [f"{9 - i // 100}.{(i // 10) % 10}.{i % 10}" for i in range(1, entries)]
+    for v in versions:
+        lines += [f"## {v}", "", f"- modifica per la {v}", "- altra modifica", ""]
+    return "\n".join(lines)
+
+def make_fake_bin(workdir: Path) -> Path:
+    bin_dir = workdir / "bin"
+    bin_dir.mkdir()
+    fake = BENCH_DIR / "fake_cordova.py"
+    cordova = bin_dir / "cordova"
+    cordova.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{fake}" "$@"\n', encoding="utf-8")
+    cordova.chmod(0o755)
+    (bin_dir / "cordova.cmd").write_text(f'@"{sys.executable}" "{fake}" %*\r\n', encoding="utf-8")
+    return bin_dir
+
+def make_repo(workdir: Path, args) -> Path:
+    repo = workdir / "client"
+    (repo / "www" / "js").mkdir(parents=True)
+    git(repo, "init", "-q", "-b", "main")
+    git(repo, "config", "user.email", "bench@example.com")
+    git(repo, "config", "user.name", "bench")
+
+    route_size = int(args.route_mb * 1024 * 1024)
+    (repo / "www/js/route.js").write_text(minified_js(route_size, OLD_VERSION, True), encoding="utf-8")
+    (repo / "config.xml").write_text(config_xml(OLD_VERSION), encoding="utf-8")
+    (repo / "CHANGELOG.md").write_text(changelog(args.changelog_entries, OLD_VERSION), encoding="utf-8")
+    (repo / "package.json").write_text(json.dumps({"name": "bench", "version": OLD_VERSION}), encoding="utf-8")
+    (repo / ".gitignore").write_text("tools/\nbuilds/\nplatforms/\nplugins/\nnode_modules/\n.env\nks.jks\n", encoding="utf-8")
+    for i in range(args.staged_files):
+        path = repo / "www" / "pages" / f"page{i // 100}" / f"p{i}.html"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"<div>pagina {i}</div>\n", encoding="utf-8")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "init", "--no-verify")
+
+    head = git(repo, "rev-parse", "HEAD").strip()
+    refs = "".join(f"create refs/heads/feature/bench-{i} {head}\n" for i in range(args.branches))
+    git(repo, "update-ref", "--stdin", input=refs)
+
+    shutil.copytree(
+        TOOL_DIR,
+        repo / "tools" / "git-hooks-cordova",
+        ignore=shutil.ignore_patterns(".git", "__pycache__", "results", "baseline.json"),
+    )
+    (repo / "ks.jks").write_bytes(b"bench keystore")
+    (repo / ".env").write_text(
+        f"KEYSTORE_PATH={repo / 'ks.jks'}\nKEYSTORE_PASSWORD=bench\nKEY_ALIAS=bench\nKEY_PASSWORD=bench\n",
+        encoding="utf-8",
+    )
+    subprocess.run(
+        [sys.executable, str(repo / "tools/git-hooks-cordova/setup_hooks.py")],
+        cwd=repo,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+    # Commit di rilascio staged: versione nuova in tutti i file + file extra toccati
+    git(repo, "checkout", "-q", "-b", f"release/android-{VERSION}")
+    (repo / "www/js/route.js").write_text(minified_js(route_size, VERSION, True), encoding="utf-8")
+    (repo / "config.xml").write_text(config_xml(VERSION), encoding="utf-8")
+    (repo / "CHANGELOG.md").write_text(changelog(args.changelog_entries, VERSION), encoding="utf-8")
+    for i in range(args.staged_files):
+        with (repo / "www" / "pages" / f"page{i // 100}" / f"p{i}.html").open("a", encoding="utf-8") as f:
+            f.write(f"<!-- {VERSION} -->\n")
+    git(repo, "add", "-A")
+    (repo / ".git" / "COMMIT_EDITMSG").write_text(f"Release {VERSION}\n", encoding="utf-8")
+
+    remote = workdir / "remote.git"
+    subprocess.run(["git", "init", "-q", "--bare", str(remote)], check=True)
+    git(repo, "remote", "add", "origin", str(remote))
+    git(repo, "push", "-q", "--no-verify", "origin", "main")
+    return repo
+
+def stop_daemon(repo: Path):
+    script = repo / "tools/git-hooks-cordova/scripts/hook_daemon.py"
+    if script.exists():
+        subprocess.run([sys.executable, str(script), "stop"], cwd=repo, stdout=subprocess.DEVNULL)
+
+def timed(cmd: list[str], repo: Path, env: dict, before=None) -> float:
+    if before is not None:
+        before()
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=repo, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} fallito ({result.returncode}):\n{result.stderr[-2000:]}")
+    return elapsed
+
+def summarize(runs: list[float]) -> dict:
+    return {
+        "median_ms": round(statistics.median(runs), 3),
+        "min_ms": round(min(runs), 3),
+        "max_ms": round(max(runs), 3),
+        "runs": [round(r, 3) for r in runs],
+    }
+
+def run_scenarios(repo: Path, bin_dir: Path, args) -> dict:
+    hooks = repo / "tools" / "git-hooks-cordova"
+    scripts = hooks / "scripts"
+    state = repo / ".git" / "git-hooks-cordova"
+    msg = str(repo / ".git" / "COMMIT_EDITMSG")
+
+    base_env = {k: v for k, v in os.environ.items() if not k.startswith(("GIT_", "HOOKS_CORDOVA_"))}
+    base_env["PATH"] = str(bin_dir) + os.pathsep + base_env.get("PATH", "")
+    base_env["BENCH_CORDOVA_SCALE"] = str(args.cordova_scale)
+    # Gli scenari storici misurano l'esecuzione diretta; il daemon ha i suoi
+    daemon_env = dict(base_env, HOOKS_CORDOVA_NO_CACHE="1")
+    base_env["HOOKS_CORDOVA_DAEMON"] = "0"
+    cold_env = dict(base_env, HOOKS_CORDOVA_NO_CACHE="1")
+
+    def forget_state():
+        # A freddo: niente snapshot / versioni / esiti salvati dai run precedenti
+        for name in ("state.json", "versions.json"):
+            (state / name).unlink(missing_ok=True)
+        shutil.rmtree(state / "results", ignore_errors=True)
+
+    def forget_builds():
+        forget_state()
+        for name in ("build-cache", "pipelines"):
+            shutil.rmtree(state / name, ignore_errors=True)
+
+    def reset_remote():
+        subprocess.run(
+            ["git", "push", "-q", "--no-verify", "origin", f":release/android-{VERSION}"],
+            cwd=repo,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    scenarios = []
+    for name in CHECKS:
+        cmd = [sys.executable, str(scripts / f"{name}.py")]
+        if name == "check_commit_message_version":
+            cmd.append(msg)
+        scenarios.append((f"script {name}", cmd, cold_env, forget_state))
+    scenarios += [
+        ("hook pre-commit (cold)", ["bash", str(hooks / "pre-commit")], cold_env, forget_state),
+        ("hook pre-commit (cached)", ["bash", str(hooks / "pre-commit")], base_env, None),
+        ("hook commit-msg (cold)", ["bash", str(hooks / "commit-msg"), msg], cold_env, forget_state),
+        ("hook commit-msg (warm)", ["bash", str(hooks / "commit-msg"), msg], base_env, None),
+        ("hook pre-commit (daemon)", ["bash", str(hooks / "pre-commit")], daemon_env, None),
+        ("hook commit-msg (daemon)", ["bash", str(hooks / "commit-msg"), msg], daemon_env, None),
+    ]
+
+    results = {}
+    for name, cmd, env, before in scenarios:
+        timed(cmd, repo, env)  # warm-up (cache del filesystem, bytecode)
+        results[name] = summarize([timed(cmd, repo, env, before) for _ in range(args.repeat)])
+        print(f"{name:<45} {results[name]['median_ms']:>10.1f} ms")
+
+    if args.skip_push:
+        return results
+
+    # pre-push: commit reale, poi push del branch di rilascio
+    git(repo, "commit", "-q", "-F", msg, env=base_env, stderr=subprocess.DEVNULL)
+    push = ["git", "push", "-q", "origin", f"release/android-{VERSION}"]
+    for name, before in (("hook pre-push build (cold)", forget_builds), ("hook pre-push build (cached)", None)):
+        runs = []
+        for _ in range(args.repeat):
+            reset_remote()
+            runs.append(timed(push, repo, base_env, before))
+        results[name] = summarize(runs)
+        print(f"{name:<45} {results[name]['median_ms']:>10.1f} ms")
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        old, new = previous["median_ms"], current["median_ms"]
+        ratio = new / old if old else float("inf")
+        marker = ""
+        if ratio > 1 + threshold and new - old > NOISE_FLOOR_MS:
+            regressions.append(name)
+            marker = "  ✗ REGRESSIONE"
+        print(f"{name:<45} {old:>10.1f} → {new:>10.1f} ms ({ratio - 1:+.0%}){marker}")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark degli hook git-hooks-cordova")
+    parser.add_argument("--staged-files", type=int, default=200, help="file extra staged nel commit di rilascio")
+    parser.add_argument("--route-mb", type=float, default=4.0, help="dimensione di route.js minificato (MB)")
+    parser.add_argument("--changelog-entries", type=int, default=500, help="sezioni in CHANGELOG.md")
+    parser.add_argument("--branches", type=int, default=1000, help="branch nella repo")
+    parser.add_argument("--repeat", type=int, default=5, help="ripetizioni per scenario (si usa la mediana)")
+    parser.add_argument("--cordova-scale", type=float, default=0.1, help="moltiplicatore delle durate del cordova finto")
+    parser.add_argument("--skip-push", action="store_true", help="salta gli scenari pre-push (build)")
+    parser.add_argument("--baseline", type=Path, help=f"JSON da confrontare (default {DEFAULT_BASELINE.name} se esiste)")
+    parser.add_argument("--threshold", type=float, default=0.20, help="rallentamento tollerato (0.20 = 20%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="salva questo run come baseline")
+    parser.add_argument("--keep", action="store_true", help="non cancella la repo sintetica")
+    args = parser.parse_args()
+
+    params = {k: v for k, v in vars(args).items() if k not in {"baseline", "update_baseline", "keep"}}
+    workdir = Path(tempfile.mkdtemp(prefix="hooks-cordova-bench-"))
+    try:
+        print("Repo sintetica in", workdir)
+        bin_dir = make_fake_bin(workdir)
+        repo = make_repo(workdir, args)
+        results = run_scenarios(repo, bin_dir, args)
+    finally:
+        stop_daemon(workdir / "client")
+        if args.keep:
+            print("Repo mantenuta in", workdir)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    git_version = subprocess.check_output(["git", "--version"], text=True).strip()
+    report = {
+        "created": time.time(),
+        "params": params,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": git_version,
+        "results": results,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / time.strftime("%Y%m%d-%H%M%S.json")
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print("✔ Risultati salvati in", out)
+
+    if args.update_baseline:
+        DEFAULT_BASELINE.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print("✔ Baseline aggiornata:", DEFAULT_BASELINE)
+        return 0
+
+    baseline_path = args.baseline or (DEFAULT_BASELINE if DEFAULT_BASELINE.exists() else None)
+    if baseline_path is None:
+        print("ℹ Nessuna baseline: usa --update-baseline per crearla")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("params") != params:
+        print("⚠ Parametri diversi dalla baseline: il confronto è indicativo")
+    print(f"Confronto con {baseline_path} (soglia +{args.threshold:.0%}):")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"✗ {len(regressions)} scenari oltre la soglia:", ", ".join(regressions))
+        return 1
+    print("✅ Nessuna regressione")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,8 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[2]
 HOOK_PATH = ROOT / "tools" / "git-hooks-cordova"
 
+sys.path.insert(0, str(HOOK_PATH / "scripts"))
+
 def run(cmd):
     print(">", " ".join(cmd))
     result = subprocess.run(cmd, shell=(sys.platform == "win32"))
@@ -34,6 +36,11 @@ def main():
         print("  Non sembra essere il tuo tools/git-hooks-cordova. Non lo tocco.")
         return 0
 
+    import hook_daemon
+
+    if hook_daemon.supported():
+        hook_daemon.stop()
+
     # Rimuove l'impostazione
     run(["git", "config", "--unset", "core.hooksPath"])
 
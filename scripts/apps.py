@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Mappa delle app Cordova della repo, per le monorepo con più app white-label
+sotto la stessa root git.
+
+Le app sono dichiarate in tools/git-hooks-cordova/apps.json (nella cartella
+degli hook, non nella repo del cliente):
+
+    {"apps": [
+        {"name": "intelliclima", "path": "apps/intelliclima"},
+        {"name": "brand-x", "path": "apps/brand-x"}
+    ]}
+
+Ogni app ha i suoi www/js/route.js, config.xml e CHANGELOG.md sotto `path`.
+Senza apps.json c'è una sola app nella root della repo: nomi di file,
+messaggi, workspace e cartelle di build restano quelli di sempre.
+
+I controlli girano solo per le app con file di versione staged (o pushati),
+in parallelo (HOOKS_CORDOVA_CHECK_JOBS, default 4) con l'output raccolto e
+stampato app per app; le build delle app coinvolte con al massimo
+HOOKS_CORDOVA_APP_BUILD_JOBS app alla volta (default 1: ogni build usa già
+più processi Gradle).
+"""
+import concurrent.futures
+import json
+import os
+import re
+import sys
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterable, NamedTuple, Optional, TypeVar
+
+from changelog_index import CHANGELOG_FILE
+from git_state import ROOT
+from versions import CONFIG_FILE, ROUTE_FILE
+
+APPS_FILE = Path(__file__).resolve().parents[1] / "apps.json"
+
+# File di versione di ogni app, relativi alla sua cartella
+VERSION_FILES = (ROUTE_FILE, CONFIG_FILE, CHANGELOG_FILE)
+
+CHECK_JOBS = max(1, int(os.environ.get("HOOKS_CORDOVA_CHECK_JOBS", "4")))
+BUILD_JOBS = max(1, int(os.environ.get("HOOKS_CORDOVA_APP_BUILD_JOBS", "1")))
+
+NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+T = TypeVar("T")
+
+class App(NamedTuple):
+    name: str
+    # Cartella dell'app relativa alla root della repo ("." = la root)
+    path: str
+
+    @property
+    def root(self) -> Path:
+        return ROOT / self.path
+
+    @property
+    def default(self) -> bool:
+        """L'app unica nella root (nessun apps.json)."""
+        return self.path == "."
+
+    def rel(self, name: str) -> str:
+        """Path di un file dell'app relativo alla root della repo (come nell'index)."""
+        return name if self.default else f"{self.path}/{name}"
+
+    def release_id(self, version: str) -> str:
+        """Chiave della versione nell'archivio degli artefatti."""
+        return version if self.default else f"{self.name}/{version}"
+
+DEFAULT_APP = App(".", ".")
+
+_apps: Optional[list[App]] = None
+
+def _parse(data: dict) -> list[App]:
+    apps = []
+    for item in data.get("apps", []):
+        name, path = item.get("name", ""), str(PurePosixPath(item.get("path", "")))
+        if not NAME_RE.match(name):
+            raise ValueError(f"nome di app non valido: {name!r}")
+        if PurePosixPath(path).is_absolute() or ".." in PurePosixPath(path).parts:
+            raise ValueError(f"{name}: path deve essere relativo alla root della repo")
+        apps.append(App(name, path))
+    if not apps:
+        raise ValueError("nessuna app dichiarata")
+    if len({a.name for a in apps}) != len(apps):
+        raise ValueError("nomi di app duplicati")
+    if len(apps) > 1 and any(a.default for a in apps):
+        raise ValueError("con più app nessuna può stare nella root della repo")
+    return apps
+
+def load() -> list[App]:
+    """App dichiarate in apps.json, o solo DEFAULT_APP se il file non c'è."""
+    global _apps
+    if _apps is None:
+        try:
+            data = json.loads(APPS_FILE.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            _apps = [DEFAULT_APP]
+            return _apps
+        try:
+            _apps = _parse(data)
+        except (ValueError, AttributeError, TypeError) as e:
+            print(f"✗ {APPS_FILE}: {e}", file=sys.stderr)
+            sys.exit(1)
+    return _apps
+
+def reset():
+    """Rilegge apps.json al prossimo accesso (es. nel daemon)."""
+    global _apps
+    _apps = None
+
+def get(name: Optional[str]) -> App:
+    """App per nome (es. da un job della coda); None = l'app unica."""
+    for app in load():
+        if app.name == name or (name is None and app.default):
+            return app
+    raise KeyError(name)
+
+def version_paths(names: Iterable[str] = VERSION_FILES) -> list[str]:
+    """Path (relativi alla root) dei file `names` di tutte le app."""
+    return [app.rel(name) for app in load() for name in names]
+
+def affected(files: Iterable[str], names: Iterable[str] = VERSION_FILES) -> list[App]:
+    """App con almeno uno dei file `names` fra `files` (staged o pushati), in ordine di apps.json."""
+    files = set(files)
+    names = tuple(names)
+    return [app for app in load() if any(app.rel(n) in files for n in names)]
+
+def named_in(branch: str) -> list[App]:
+    """App il cui nome compare nel branch (es. release/brand-x-1.3.0)."""
+    return [
+        app for app in load()
+        if not app.default
+        and re.search(rf"(?<![A-Za-z0-9]){re.escape(app.name)}(?![A-Za-z0-9])", branch)
+    ]
+
+class Report:
+    """Output di un controllo su una app, stampato tutto insieme alla fine."""
+
+    def __init__(self, app: App):
+        self.app = app
+        self.lines: list[tuple[bool, str]] = []
+
+    def out(self, *args):
+        self.lines.append((False, " ".join(str(a) for a in args)))
+
+    def err(self, *args):
+        self.lines.append((True, " ".join(str(a) for a in args)))
+
+    def flush(self, prefix: bool):
+        for is_err, line in self.lines:
+            text = f"[{self.app.name}] {line}" if prefix else line
+            print(text, file=sys.stderr if is_err else sys.stdout)
+
+def pool_map(func: Callable[[App], T], apps: list[App], jobs: int) -> list[T]:
+    """`func` su ogni app con al massimo `jobs` in parallelo; risultati nell'ordine di `apps`."""
+    if len(apps) <= 1 or jobs <= 1:
+        return [func(app) for app in apps]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(func, apps))
+
+def run_checks(check: Callable[[App, Report], int], apps: list[App]) -> int:
+    """
+    Esegue `check(app, report)` per ogni app in parallelo e stampa l'output app
+    per app (con il nome davanti se le app sono più di una). 1 se una fallisce.
+    """
+    def one(app: App) -> tuple[int, Report]:
+        report = Report(app)
+        return check(app, report), report
+
+    prefix = len(load()) > 1
+    code = 0
+    for result, report in pool_map(one, apps, CHECK_JOBS):
+        report.flush(prefix)
+        code = code or result
+    return code
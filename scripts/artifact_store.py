@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Archivio degli artefatti di build (APK / AAB) indirizzato per contenuto.
+
+Ogni file prodotto da Gradle viene salvato una sola volta in
+.git/git-hooks-cordova/artifacts/objects/<aa>/<sha256>, con l'hash calcolato
+a blocchi mentre lo si copia (gli AAB possono pesare centinaia di MB: mai
+tutti in memoria). Con un reflink la copia è istantanea e l'hash si calcola
+sul clone. File identici (es. la stessa build ripristinata dalla build cache)
+occupano spazio una volta sola.
+
+manifest.json associa versione e variante (debug.apk, release.apk,
+release.aab) al digest: la storia delle build resta anche se builds/ viene
+svuotata. In builds/ gli artefatti vengono pubblicati con un hardlink verso
+l'oggetto (o reflink / copia se non si può); gli oggetti sono in sola lettura.
+
+Vengono tenute le ultime HOOKS_CORDOVA_ARTIFACTS_KEEP versioni (default 10),
+e comunque non oltre HOOKS_CORDOVA_ARTIFACTS_MAX_MB (default 4096) di oggetti:
+oltre il limite si scartano le versioni usate meno di recente (pubblicate o
+ripristinate per ultime in fondo al manifest), tenendo sempre l'ultima. Per
+le versioni scartate si eliminano gli oggetti non più usati e i file
+pubblicati in builds/; le voci della build cache che le usavano contano come
+mancanti. Oltre al limite restano solo gli oggetti di build in corso, per
+GC_GRACE_SECONDS. `python artifact_store.py list|publish <versione>|gc`.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import stat
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import tracing
+import workspace
+from git_state import ROOT, cache_dir
+
+CHUNK_SIZE = 1024 * 1024
+
+KEEP_VERSIONS = max(1, int(os.environ.get("HOOKS_CORDOVA_ARTIFACTS_KEEP", "10")))
+# HOOKS_CORDOVA_BUILD_CACHE_MAX_MB: nome storico (il limite della build cache
+# vale per gli oggetti dell'archivio, dove stanno i suoi artefatti)
+MAX_BYTES = int(
+    os.environ.get("HOOKS_CORDOVA_ARTIFACTS_MAX_MB")
+    or os.environ.get("HOOKS_CORDOVA_BUILD_CACHE_MAX_MB")
+    or "4096"
+) * 1024 * 1024
+
+MANIFEST = "manifest.json"
+
+# Oggetti appena aggiunti ma non ancora nel manifest (build in corso in un altro
+# processo): il gc non li tocca
+GC_GRACE_SECONDS = 3600
+
+def store_dir() -> Path:
+    return cache_dir() / "artifacts"
+
+def object_path(digest: str) -> Path:
+    return store_dir() / "objects" / digest[:2] / digest
+
+def exists(digest: str) -> bool:
+    return object_path(digest).is_file()
+
+def _hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _copy_hashing(src: Path, dst: Path) -> str:
+    """Copia `src` in `dst` calcolando l'hash nello stesso passaggio."""
+    h = hashlib.sha256()
+    with src.open("rb") as s, dst.open("wb") as d:
+        for chunk in iter(lambda: s.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+            d.write(chunk)
+    return h.hexdigest()
+
+@tracing.traced("artifact add", "fs")
+def add(src: Path) -> str:
+    """Salva `src` nell'archivio (se non c'è già) e ritorna il suo SHA-256."""
+    tmp = store_dir() / "objects" / f".{uuid.uuid4().hex}.tmp"
+    tmp.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if workspace.reflink(src, tmp):
+            digest = _hash_file(tmp)
+        else:
+            digest = _copy_hashing(src, tmp)
+        target = object_path(digest)
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # In sola lettura: le copie in builds/ sono hardlink allo stesso file
+            os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp, target)
+        os.utime(target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return digest
+
+@tracing.traced("artifact publish", "fs")
+def publish(digest: str, target: Path):
+    """Pubblica l'oggetto in `target`: hardlink, altrimenti reflink o copia."""
+    source = object_path(digest)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists() and os.path.samefile(source, target):
+        return
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        try:
+            os.link(source, tmp)
+        except OSError:
+            if not workspace.reflink(source, tmp):
+                shutil.copyfile(source, tmp)
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def load_manifest() -> dict:
+    try:
+        return json.loads((store_dir() / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"versions": {}}
+
+def _save_manifest(manifest: dict):
+    path = store_dir() / MANIFEST
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _publish_and_record(version: str, digests: dict[str, str], targets: dict[str, Path]):
+    with workspace.lock("artifacts"):
+        manifest = load_manifest()
+        entry = manifest["versions"].pop(version, None) or {"artifacts": {}}
+        for name, digest in digests.items():
+            publish(digest, targets[name])
+            entry["artifacts"][name] = {
+                "digest": digest,
+                "size": object_path(digest).stat().st_size,
+                "path": os.path.relpath(targets[name], ROOT),
+            }
+        entry["updated"] = time.time()
+        # Ultima versione in fondo: l'ordine del dict è la storia
+        manifest["versions"][version] = entry
+        _gc(manifest)
+        _save_manifest(manifest)
+
+def release(version: str, files: dict[str, Path], targets: dict[str, Path]) -> dict[str, str]:
+    """Archivia i file della build `version` e li pubblica nei target. Ritorna i digest."""
+    digests = {name: add(src) for name, src in files.items()}
+    _publish_and_record(version, digests, targets)
+    return digests
+
+def restore(version: str, digests: dict[str, str], targets: dict[str, Path]):
+    """Ripubblica artefatti già archiviati (es. da una voce della build cache)."""
+    _publish_and_record(version, digests, targets)
+
+def _remove_published(artifact: dict):
+    """Rimuove il file pubblicato, solo se è ancora l'oggetto archiviato."""
+    published = ROOT / artifact["path"]
+    source = object_path(artifact["digest"])
+    try:
+        if source.exists() and os.path.samefile(source, published):
+            published.unlink()
+    except OSError:
+        pass
+
+def _stored_bytes(versions: dict) -> int:
+    """Dimensione degli oggetti usati dalle versioni (ogni oggetto una volta)."""
+    sizes = {a["digest"]: a["size"] for v in versions.values() for a in v["artifacts"].values()}
+    return sum(sizes.values())
+
+def _gc(manifest: dict):
+    versions = manifest["versions"]
+    drop = list(versions)[:-KEEP_VERSIONS]
+    kept = {v: e for v, e in versions.items() if v not in drop}
+    # LRU per dimensione: le prime del dict sono le usate meno di recente
+    while len(kept) > 1 and _stored_bytes(kept) > MAX_BYTES:
+        oldest = next(iter(kept))
+        drop.append(oldest)
+        del kept[oldest]
+    for version in drop:
+        for artifact in versions.pop(version)["artifacts"].values():
+            _remove_published(artifact)
+
+    used = {a["digest"] for v in versions.values() for a in v["artifacts"].values()}
+    objects = store_dir() / "objects"
+    if not objects.exists():
+        return
+    now = time.time()
+    for path in objects.glob("??/*"):
+        if path.name not in used and now - path.stat().st_mtime > GC_GRACE_SECONDS:
+            path.chmod(stat.S_IWUSR | stat.S_IRUSR)
+            path.unlink(missing_ok=True)
+
+def gc():
+    with workspace.lock("artifacts"):
+        manifest = load_manifest()
+        _gc(manifest)
+        _save_manifest(manifest)
+
+def list_versions() -> int:
+    versions = load_manifest()["versions"]
+    if not versions:
+        print("ℹ Nessun artefatto archiviato")
+        return 0
+    for version, entry in reversed(versions.items()):
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["updated"]))
+        print(f"{version}  ({when})")
+        for name, artifact in entry["artifacts"].items():
+            mb = artifact["size"] / (1024 * 1024)
+            print(f"  {name:<12} {artifact['digest'][:12]}  {mb:8.1f} MB  {artifact['path']}")
+    return 0
+
+def republish(version: str) -> int:
+    entry = load_manifest()["versions"].get(version)
+    if entry is None:
+        print(f"✗ Nessun artefatto archiviato per la versione {version}", file=sys.stderr)
+        return 1
+    artifacts = entry["artifacts"]
+    missing = [name for name, a in artifacts.items() if not exists(a["digest"])]
+    if missing:
+        print(f"✗ Oggetti mancanti nell'archivio: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    targets = {name: ROOT / a["path"] for name, a in artifacts.items()}
+    restore(version, {name: a["digest"] for name, a in artifacts.items()}, targets)
+    for target in targets.values():
+        print("✔ Pubblicato:", target)
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Archivio degli artefatti di build")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="versioni archiviate e relativi artefatti")
+    pub = sub.add_parser("publish", help="ripubblica in builds/ gli artefatti di una versione")
+    pub.add_argument("version")
+    sub.add_parser("gc", help="elimina gli oggetti delle versioni non più tenute")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        return list_versions()
+    if args.command == "publish":
+        return republish(args.version)
+    gc()
+    print("✔ Archivio ripulito")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Verifica degli APK / AAB prodotti dalla build, prima di pubblicarli in builds/:
+versionName deve essere la versione rilasciata e il file deve essere firmato.
+Evita di pubblicare come `app-release-prod.1.3.0.apk` un artefatto vecchio
+rimasto in platforms/.
+
+Nessuna estrazione: dello zip si leggono solo la central directory e il
+manifest, con accesso diretto (zipfile fa seek sull'entry), quindi il costo non
+dipende dalla dimensione del bundle.
+
+- APK: AndroidManifest.xml in formato XML binario (AXML) di aapt; firma v2+
+  (APK Signing Block, subito prima della central directory) o v1 (META-INF/*.SF
+  più .RSA / .DSA / .EC).
+- AAB: base/manifest/AndroidManifest.xml in formato protobuf (XmlNode di aapt2);
+  firma v1 di jarsigner.
+
+`python artifact_verify.py <file> [--version X]` stampa cosa è stato letto.
+"""
+import argparse
+import struct
+import sys
+import zipfile
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import tracing
+
+APK_MANIFEST = "AndroidManifest.xml"
+AAB_MANIFEST = "base/manifest/AndroidManifest.xml"
+
+# ID degli attributi android:versionCode / android:versionName
+VERSION_CODE_ID = 0x0101021B
+VERSION_NAME_ID = 0x0101021C
+
+APK_SIG_BLOCK_MAGIC = b"APK Sig Block 42"
+EOCD_SIGNATURE = b"PK\x05\x06"
+ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+V1_SIGNATURE_SUFFIXES = (".RSA", ".DSA", ".EC")
+
+# Chunk del formato AXML
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_TYPE = 0x0003
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+UTF8_FLAG = 0x100
+
+# Tipi di Res_value
+TYPE_REFERENCE = 0x01
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+
+class ArtifactInfo(NamedTuple):
+    version_name: Optional[str]
+    version_code: Optional[str]
+    signatures: list[str]
+
+# --- AXML (APK) -------------------------------------------------------------
+
+class _StringPool:
+    """String pool AXML: le stringhe vengono decodificate solo quando servono."""
+
+    def __init__(self, data: bytes, start: int):
+        header_size, = struct.unpack_from("<H", data, start + 2)
+        count, _styles, flags, strings_start = struct.unpack_from("<IIII", data, start + 8)
+        self.data = data
+        self.utf8 = bool(flags & UTF8_FLAG)
+        self.offsets = struct.unpack_from(f"<{count}I", data, start + header_size)
+        self.base = start + strings_start
+
+    def _length8(self, pos: int) -> tuple[int, int]:
+        n = self.data[pos]
+        if n & 0x80:
+            return ((n & 0x7F) << 8) | self.data[pos + 1], pos + 2
+        return n, pos + 1
+
+    def _length16(self, pos: int) -> tuple[int, int]:
+        n, = struct.unpack_from("<H", self.data, pos)
+        if n & 0x8000:
+            low, = struct.unpack_from("<H", self.data, pos + 2)
+            return ((n & 0x7FFF) << 16) | low, pos + 4
+        return n, pos + 2
+
+    def get(self, index: int) -> Optional[str]:
+        if index == 0xFFFFFFFF or index >= len(self.offsets):
+            return None
+        pos = self.base + self.offsets[index]
+        if self.utf8:
+            _chars, pos = self._length8(pos)
+            size, pos = self._length8(pos)
+            return self.data[pos:pos + size].decode("utf-8", "replace")
+        chars, pos = self._length16(pos)
+        return self.data[pos:pos + 2 * chars].decode("utf-16-le", "replace")
+
+def _axml_value(pool: _StringPool, raw: int, data_type: int, value: int) -> Optional[str]:
+    if data_type == TYPE_STRING:
+        return pool.get(value)
+    if data_type == TYPE_INT_DEC:
+        return str(struct.unpack("<i", struct.pack("<I", value))[0])
+    if data_type == TYPE_INT_HEX:
+        return str(value)
+    if data_type == TYPE_REFERENCE:
+        # Es. @string/app_version: senza resources.arsc non si risolve
+        return f"@0x{value:08x}"
+    return pool.get(raw)
+
+def axml_versions(data: bytes) -> tuple[Optional[str], Optional[str]]:
+    """(versionName, versionCode) dal tag <manifest> di un AndroidManifest.xml binario."""
+    kind, header_size, _size = struct.unpack_from("<HHI", data, 0)
+    if kind != RES_XML_TYPE:
+        raise ValueError("AndroidManifest.xml non è in formato XML binario")
+
+    pool: Optional[_StringPool] = None
+    resource_ids: tuple = ()
+    pos = header_size
+    while pos + 8 <= len(data):
+        kind, header_size, size = struct.unpack_from("<HHI", data, pos)
+        if size < 8:
+            break
+        if kind == RES_STRING_POOL_TYPE:
+            pool = _StringPool(data, pos)
+        elif kind == RES_XML_RESOURCE_MAP_TYPE:
+            resource_ids = struct.unpack_from(f"<{(size - header_size) // 4}I", data, pos + header_size)
+        elif kind == RES_XML_START_ELEMENT_TYPE and pool is not None:
+            # Il primo elemento è <manifest>: il resto del file non serve
+            ext = pos + header_size
+            _ns, _name, attr_start, attr_size, attr_count = struct.unpack_from("<IIHHH", data, ext)
+            found = {}
+            for i in range(attr_count):
+                a = ext + attr_start + i * attr_size
+                _ns, name, raw, _vsize, _res0, data_type, value = struct.unpack_from("<IIIHBBI", data, a)
+                attr_id = resource_ids[name] if name < len(resource_ids) else None
+                if attr_id == VERSION_NAME_ID or (attr_id is None and pool.get(name) == "versionName"):
+                    found["name"] = _axml_value(pool, raw, data_type, value)
+                elif attr_id == VERSION_CODE_ID or (attr_id is None and pool.get(name) == "versionCode"):
+                    found["code"] = _axml_value(pool, raw, data_type, value)
+            return found.get("name"), found.get("code")
+        pos += size
+    raise ValueError("tag <manifest> non trovato in AndroidManifest.xml")
+
+# --- Protobuf (AAB) ---------------------------------------------------------
+
+def _varint(data: bytes, pos: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+def _fields(data: bytes):
+    """(numero campo, valore) di un messaggio protobuf: int per i varint, bytes per i length-delimited."""
+    pos = 0
+    while pos < len(data):
+        key, pos = _varint(data, pos)
+        number, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _varint(data, pos)
+        elif wire == 2:
+            size, pos = _varint(data, pos)
+            value = data[pos:pos + size]
+            pos += size
+        elif wire == 1:
+            value = data[pos:pos + 8]
+            pos += 8
+        elif wire == 5:
+            value = data[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"wire type protobuf non supportato: {wire}")
+        yield number, value
+
+def _proto_item(item: bytes) -> Optional[str]:
+    """Item compilato (Resources.proto): stringa, riferimento o intero."""
+    for number, value in _fields(item):
+        if number in (2, 3):  # String / RawString
+            return next((v.decode("utf-8") for n, v in _fields(value) if n == 1), "")
+        if number == 1:  # Reference
+            ref = next((v for n, v in _fields(value) if n == 2), 0)
+            return f"@0x{ref:08x}"
+        if number == 7:  # Primitive: int_decimal_value / int_hexadecimal_value
+            for n, v in _fields(value):
+                if n == 6:
+                    return str(struct.unpack("<i", struct.pack("<I", v & 0xFFFFFFFF))[0])
+                if n == 7:
+                    return str(v)
+    return None
+
+def proto_versions(data: bytes) -> tuple[Optional[str], Optional[str]]:
+    """(versionName, versionCode) da un AndroidManifest.xml protobuf (XmlNode di aapt2)."""
+    element = next((v for n, v in _fields(data) if n == 1), None)
+    if element is None:
+        raise ValueError("AndroidManifest.xml protobuf senza elemento radice")
+
+    found = {}
+    for number, attribute in _fields(element):
+        if number != 4:  # XmlElement.attribute
+            continue
+        name, value, resource_id, item = None, "", 0, None
+        for n, v in _fields(attribute):
+            if n == 2:
+                name = v.decode("utf-8")
+            elif n == 3:
+                value = v.decode("utf-8")
+            elif n == 5:
+                resource_id = v
+            elif n == 6:
+                item = v
+        if item is not None and (not value or value.startswith("@")):
+            value = _proto_item(item) or value
+        if resource_id == VERSION_NAME_ID or name == "versionName":
+            found["name"] = value
+        elif resource_id == VERSION_CODE_ID or name == "versionCode":
+            found["code"] = value
+    return found.get("name"), found.get("code")
+
+# --- Zip e firme ------------------------------------------------------------
+
+def central_directory_offset(f) -> int:
+    """Offset della central directory, dall'End Of Central Directory (anche zip64)."""
+    f.seek(0, 2)
+    size = f.tell()
+    tail_size = min(size, 22 + 0xFFFF)
+    f.seek(size - tail_size)
+    tail = f.read(tail_size)
+    eocd = tail.rfind(EOCD_SIGNATURE)
+    if eocd < 0:
+        raise zipfile.BadZipFile("End Of Central Directory non trovato")
+    offset, = struct.unpack_from("<I", tail, eocd + 16)
+    if offset != 0xFFFFFFFF:
+        return offset
+
+    locator = eocd - 20
+    if locator < 0 or tail[locator:locator + 4] != ZIP64_LOCATOR_SIGNATURE:
+        raise zipfile.BadZipFile("zip64 locator non trovato")
+    record, = struct.unpack_from("<Q", tail, locator + 8)
+    f.seek(record + 48)
+    return struct.unpack("<Q", f.read(8))[0]
+
+def has_signing_block(f) -> bool:
+    """APK Signing Block (firma v2 / v3): termina col magic subito prima della central directory."""
+    offset = central_directory_offset(f)
+    if offset < len(APK_SIG_BLOCK_MAGIC):
+        return False
+    f.seek(offset - len(APK_SIG_BLOCK_MAGIC))
+    return f.read(len(APK_SIG_BLOCK_MAGIC)) == APK_SIG_BLOCK_MAGIC
+
+def has_v1_signature(names: list[str]) -> bool:
+    meta = [n.upper() for n in names if n.upper().startswith("META-INF/") and n.count("/") == 1]
+    return any(n.endswith(".SF") for n in meta) and any(n.endswith(V1_SIGNATURE_SUFFIXES) for n in meta)
+
+@tracing.traced("artifact inspect", "io")
+def inspect(path: Path) -> ArtifactInfo:
+    """
+    Versione e firme di un APK o AAB (dall'estensione). zipfile.BadZipFile,
+    KeyError (manifest assente) o ValueError se il file non è leggibile.
+    """
+    bundle = path.suffix.lower() == ".aab"
+    with path.open("rb") as f:
+        with zipfile.ZipFile(f) as zf:
+            names = zf.namelist()
+            manifest = zf.read(AAB_MANIFEST if bundle else APK_MANIFEST)
+        signatures = []
+        if not bundle and has_signing_block(f):
+            signatures.append("v2+")
+    if has_v1_signature(names):
+        signatures.append("v1")
+
+    try:
+        name, code = proto_versions(manifest) if bundle else axml_versions(manifest)
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f"manifest non decodificabile: {e}") from e
+    return ArtifactInfo(name, code, signatures)
+
+def check(path: Path, version: str) -> tuple[Optional[ArtifactInfo], list[str]]:
+    """Legge `path` e ritorna (info, problemi): nessun problema se versione e firma sono a posto."""
+    try:
+        info = inspect(path)
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        return None, [f"artefatto non leggibile: {e}"]
+
+    problems = []
+    if info.version_name is None:
+        problems.append("versionName assente nel manifest")
+    elif info.version_name.startswith("@"):
+        # Riferimento a una risorsa: non risolvibile senza resources.arsc
+        print(f"⚠ {path.name}: versionName è un riferimento ({info.version_name}), non verificabile")
+    elif version and info.version_name != version:
+        problems.append(f"versionName {info.version_name}, attesa {version}")
+    if not info.signatures:
+        problems.append("nessuna firma (né APK Signing Block né META-INF/*.SF)")
+    return info, problems
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Versione e firma di APK / AAB")
+    parser.add_argument("files", nargs="+", type=Path)
+    parser.add_argument("--version", help="versionName attesa")
+    args = parser.parse_args()
+
+    code = 0
+    for path in args.files:
+        info, problems = check(path, args.version or "")
+        if info is not None:
+            signatures = ", ".join(info.signatures) or "nessuna"
+            print(f"{path}: versionName={info.version_name} versionCode={info.version_code} firme={signatures}")
+        for problem in problems:
+            print(f"✗ {path.name}: {problem}", file=sys.stderr)
+            code = 1
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Ottimizzazione opzionale degli asset di www/ nel workspace di build release
+(HOOKS_CORDOVA_OPTIMIZE_ASSETS=1): minify di JS / CSS e ricompressione delle
+immagini prima di `cordova prepare`, per APK / AAB più piccoli.
+
+Si usano i tool installati (esbuild / terser, esbuild / cleancss / csso,
+oxipng / optipng, jpegoptim / jpegtran, svgo): per i tipi senza tool i file
+restano come sono. Un file ottimizzato viene tenuto solo se è più piccolo.
+
+Il www/ del workspace è fatto di hardlink ai file dello sviluppatore: niente
+viene modificato sul posto. Il risultato sta in una cache per contenuto
+(.git/git-hooks-cordova/asset-cache/, chiave: SHA-256 del file + tool usato)
+e nel workspace il file viene sostituito da un hardlink all'oggetto in cache.
+Così solo gli asset cambiati vengono rielaborati, in parallelo
+(HOOKS_CORDOVA_ASSET_JOBS, default numero di CPU); per i file non cambiati
+neanche l'hash viene ricalcolato (stat in hashes.json, come in versions.py).
+Max HOOKS_CORDOVA_ASSET_CACHE_MAX_MB (default 512), eviction LRU.
+"""
+import concurrent.futures
+import hashlib
+import json
+import os
+import shutil
+import stat
+import subprocess
+import uuid
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import tracing
+import workspace
+from git_state import cache_dir
+
+ASSETS_DIR = "www"
+
+MAX_BYTES = int(os.environ.get("HOOKS_CORDOVA_ASSET_CACHE_MAX_MB", "512")) * 1024 * 1024
+JOBS = max(1, int(os.environ.get("HOOKS_CORDOVA_ASSET_JOBS", "0")) or os.cpu_count() or 1)
+
+HASHES_FILE = "hashes.json"
+
+# Per estensione, i tool in ordine di preferenza: {src} / {dst} sono i file;
+# senza {dst} il risultato arriva su stdout
+TOOLS = {
+    ".js": [
+        ("esbuild", ["{src}", "--minify", "--log-level=error", "--outfile={dst}"]),
+        ("terser", ["{src}", "--compress", "--mangle", "-o", "{dst}"]),
+    ],
+    ".css": [
+        ("esbuild", ["{src}", "--minify", "--log-level=error", "--outfile={dst}"]),
+        ("cleancss", ["-o", "{dst}", "{src}"]),
+        ("csso", ["{src}", "-o", "{dst}"]),
+    ],
+    ".png": [
+        ("oxipng", ["-o", "2", "--strip", "safe", "--out", "{dst}", "{src}"]),
+        ("optipng", ["-o2", "-quiet", "-out", "{dst}", "{src}"]),
+    ],
+    ".jpg": [
+        ("jpegoptim", ["--strip-all", "--quiet", "--stdout", "{src}"]),
+        ("jpegtran", ["-copy", "none", "-optimize", "-outfile", "{dst}", "{src}"]),
+    ],
+    ".svg": [
+        ("svgo", ["{src}", "-o", "{dst}"]),
+    ],
+}
+TOOLS[".jpeg"] = TOOLS[".jpg"]
+
+# Già minificati: non si tocca
+SKIP_SUFFIXES = (".min.js", ".min.css")
+
+class Tool(NamedTuple):
+    name: str
+    path: str
+    args: list[str]
+    # Identità del tool nella chiave della cache: path e mtime dell'eseguibile
+    ident: str
+
+class Stats(NamedTuple):
+    files: int
+    processed: int
+    saved: int
+
+def enabled() -> bool:
+    return os.environ.get("HOOKS_CORDOVA_OPTIMIZE_ASSETS", "") not in {"", "0"}
+
+def cache_root() -> Path:
+    return cache_dir() / "asset-cache"
+
+def available_tools() -> dict[str, Tool]:
+    """Tool da usare per ogni estensione (il primo installato), solo estensioni coperte."""
+    tools = {}
+    for suffix, candidates in TOOLS.items():
+        for name, args in candidates:
+            path = shutil.which(name)
+            if path:
+                ident = f"{name}:{path}:{os.stat(path).st_mtime_ns}:{' '.join(args)}"
+                tools[suffix] = Tool(name, path, args, ident)
+                break
+    return tools
+
+def fingerprint() -> str:
+    """Impronta della configurazione (per la chiave della build cache): off, o tool usati."""
+    if not enabled():
+        return "off"
+    tools = available_tools()
+    return hashlib.sha256(
+        json.dumps({s: t.ident for s, t in sorted(tools.items())}).encode("utf-8")
+    ).hexdigest()
+
+def _object_path(key: str) -> Path:
+    return cache_root() / "objects" / key[:2] / key
+
+def _file_sha(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _run_tool(tool: Tool, src: Path, dst: Path) -> bool:
+    args = [a.format(src=src, dst=dst) for a in tool.args]
+    with tracing.span(tool.name, "subprocess", file=src.name):
+        if "{dst}" in " ".join(tool.args):
+            result = subprocess.run([tool.path, *args], capture_output=True)
+        else:
+            with dst.open("wb") as out:
+                result = subprocess.run([tool.path, *args], stdout=out, stderr=subprocess.PIPE)
+    return result.returncode == 0 and dst.exists() and dst.stat().st_size > 0
+
+def _optimize(src: Path, tool: Tool, known: Optional[list]) -> tuple[list, Optional[Path], bool]:
+    """
+    Eseguita nei thread del pool. Ritorna stat + SHA del file (`known` se lo
+    stat non è cambiato), l'oggetto in cache con la versione ottimizzata (None
+    se non conviene) e se è stato rielaborato ora.
+    """
+    st = src.stat()
+    memo = [st.st_size, st.st_mtime_ns, st.st_ino]
+    if known and known[:3] == memo:
+        memo = known
+    else:
+        memo.append(_file_sha(src))
+    obj, fresh = _cached_or_run(src, tool, memo[3])
+    return memo, obj, fresh
+
+def _cached_or_run(src: Path, tool: Tool, digest: str) -> tuple[Optional[Path], bool]:
+    key = hashlib.sha256(f"{tool.ident}\0{digest}".encode("utf-8")).hexdigest()
+    obj = _object_path(key)
+    skip = obj.with_name(f"{key}.skip")
+    if obj.exists():
+        os.utime(obj)
+        return obj, False
+    if skip.exists():
+        return None, False
+
+    obj.parent.mkdir(parents=True, exist_ok=True)
+    # Il tool lavora su una copia (alcuni scrivono vicino al sorgente)
+    work = cache_root() / "tmp" / uuid.uuid4().hex
+    work.mkdir(parents=True)
+    try:
+        source = work / f"in{src.suffix}"
+        result = work / f"out{src.suffix}"
+        shutil.copyfile(src, source)
+        if _run_tool(tool, source, result) and result.stat().st_size < source.stat().st_size:
+            os.chmod(result, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(result, obj)
+            return obj, True
+        # Tool fallito o file non più piccolo: ricordato, per non riprovare
+        skip.touch()
+        return None, True
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+def _load_hashes() -> dict:
+    try:
+        return json.loads((cache_root() / HASHES_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _save_hashes(hashes: dict):
+    path = cache_root() / HASHES_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(hashes), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _candidates(root: Path, tools: dict[str, Tool]) -> list[Path]:
+    files = []
+    for dirpath, _dirnames, filenames in os.walk(root / ASSETS_DIR):
+        for filename in filenames:
+            lower = filename.lower()
+            if lower.endswith(SKIP_SUFFIXES) or os.path.splitext(lower)[1] not in tools:
+                continue
+            path = Path(dirpath) / filename
+            if not path.is_symlink():
+                files.append(path)
+    return files
+
+def evict():
+    """Elimina gli oggetti usati meno di recente oltre MAX_BYTES."""
+    objects = []
+    for path in (cache_root() / "objects").glob("??/*"):
+        st = path.stat()
+        objects.append((st.st_mtime, st.st_size, path))
+    objects.sort(reverse=True)
+    total = 0
+    for _, size, path in objects:
+        total += size
+        if total > MAX_BYTES:
+            path.chmod(stat.S_IRUSR | stat.S_IWUSR)
+            path.unlink(missing_ok=True)
+
+@tracing.traced("optimize assets", "fs")
+def optimize_workspace(root: Path) -> Stats:
+    """
+    Sostituisce gli asset di www/ nel workspace `root` con la loro versione
+    ottimizzata. Da chiamare dopo workspace.sync_workspace, che ad ogni run
+    rimette gli hardlink ai file originali.
+    """
+    tools = available_tools()
+    missing = sorted({s for s in TOOLS if s not in tools})
+    if missing:
+        print(f"ℹ [{root.name}] nessun tool per {', '.join(missing)}: questi asset restano come sono")
+    if not tools:
+        return Stats(0, 0, 0)
+
+    with workspace.lock("asset-cache"):
+        hashes = _load_hashes()
+        files = _candidates(root, tools)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=JOBS) as pool:
+            jobs = {
+                path: pool.submit(
+                    _optimize,
+                    path,
+                    tools[path.suffix.lower()],
+                    hashes.get(path.relative_to(root).as_posix()),
+                )
+                for path in files
+            }
+
+        # Solo i file ancora presenti: il memo non cresce all'infinito
+        memos = {}
+        processed = saved = 0
+        for path, job in jobs.items():
+            memo, obj, fresh = job.result()
+            memos[path.relative_to(root).as_posix()] = memo
+            processed += fresh
+            if obj is not None:
+                saved += memo[0] - obj.stat().st_size
+                workspace.link_file(obj, path)
+        _save_hashes(memos)
+        evict()
+
+    print(f"✔ [{root.name}] asset ottimizzati: {len(files)} file ({processed} rielaborati), "
+          f"{saved / 1024:.1f} KB in meno")
+    return Stats(len(files), processed, saved)
@@ -1,24 +1,47 @@
 #!/usr/bin/env python3
-import re
+import argparse
+import concurrent.futures
 import os
 import re
 import shutil
-import subprocess
 import sys
 from pathlib import Path
-
-ROOT = Path(__file__).resolve().parents[1]
-
-ROUTE = ROOT / "www/js/route.js"
-CONFIG = ROOT / "config.xml"
-
-DEBUG_APK_PATH = ROOT / "platforms/android/app/build/outputs/apk/debug/app-debug.apk"
-RELEASE_APK_PATH = ROOT / "platforms/android/app/build/outputs/apk/release/app-release.apk"
-AAB_PATH = ROOT / "platforms/android/app/build/outputs/bundle/release/app-release.aab"
+from typing import Optional
+
+import apps
+import artifact_store
+import asset_optimizer
+import build_log
+import artifact_verify
+import build_cache
+import build_queue
+import dep_cache
+import pipeline
+import platform_state
+import push_state
+import size_report
+import tracing
+import versions
+import workspace
+from git_state import ROOT, cache_dir, get_index_tree, get_staged_files
+from versions import ROUTE_FILE, staged_version
+
+ROUTE_REL = ROUTE_FILE
+ANDROID_PROJECT_REL = "platforms/android"
+
+# Artefatti prodotti da Cordova, relativi alla root del progetto (o del workspace)
+DEBUG_APK_REL = "platforms/android/app/build/outputs/apk/debug/app-debug.apk"
+RELEASE_APK_REL = "platforms/android/app/build/outputs/apk/release/app-release.apk"
+AAB_REL = "platforms/android/app/build/outputs/bundle/release/app-release.aab"
 
 BUILDS_DIR = ROOT / "builds"
 ENV_FILE = ROOT / ".env"
 
+ANDROID_PLATFORM = "android@14"
+
+# Build in parallelo (una per variante), limitate da HOOKS_CORDOVA_BUILD_JOBS
+MAX_JOBS = max(1, int(os.environ.get("HOOKS_CORDOVA_BUILD_JOBS", "2")))
+
 REQUIRED_VARS = [
     "KEYSTORE_PATH",
     "KEYSTORE_PASSWORD",
@@ -41,28 +64,19 @@ def load_dotenv():
         if key not in os.environ:
             os.environ[key] = value.strip()
 
-def get_branch() -> str:
-    return subprocess.check_output(
-        ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-        text=True
-    ).strip()
-
-def get_version() -> str:
-    if ROUTE.exists():
-        text = ROUTE.read_text(encoding="utf-8")
-        m = re.search(r'FCIC_CONFIG\.VERSION\s*=\s*"([^"]+)"', text)
-        if m:
-            return m.group(1)
-
-    if CONFIG.exists():
-        text = CONFIG.read_text(encoding="utf-8")
-        m = re.search(r'<widget[^>]*\bversion="([^"]+)"', text)
-        if m:
-            return m.group(1)
-
-    print("✗ Impossibile determinare la versione", file=sys.stderr)
+def get_version(rev: Optional[str] = None, app: apps.App = apps.DEFAULT_APP) -> str:
+    """Versione del working tree, o del commit `rev` (es. la cima del push)."""
+    version = versions.project_version(rev, app.root)
+    if version:
+        return version
+
+    print(f"✗ {tag(app)}Impossibile determinare la versione" + (f" di {rev}" if rev else ""), file=sys.stderr)
     sys.exit(1)
 
+def tag(app: apps.App) -> str:
+    """Prefisso dei messaggi con più app."""
+    return "" if app.default else f"[{app.name}] "
+
 def require_env_vars():
     missing = [v for v in REQUIRED_VARS if not os.getenv(v)]
     if missing:
@@ -70,25 +84,20 @@ def require_env_vars():
         print("Definiscile come variabili d'ambiente o nel file .env", file=sys.stderr)
         sys.exit(1)
 
-def run(cmd):
-    print("Running:", " ".join(cmd))
-    result = subprocess.run(cmd)
-    if result.returncode != 0:
-        print("✗ Command failed:", " ".join(cmd), file=sys.stderr)
+def run(cmd, cwd: Path = ROOT):
+    label = f" [{cwd.name}]" if cwd != ROOT else ""
+    print(f"Running{label}:", build_log.redact(cmd), flush=True)
+    # Output catturato: riga di avanzamento, log completo compresso ed
+    # estratto degli errori solo se il comando fallisce
+    if build_log.run(cmd, cwd, cwd.name if cwd != ROOT else "") != 0:
         sys.exit(1)
-        
-def get_staged_files():
-    out = subprocess.check_output(
-        ["git", "diff", "--cached", "--name-only"],
-        text=True,
-    )
-    return {f.replace("\\", "/") for f in out.splitlines()}
 
-def set_versione_produzione(value: bool):
+def versione_produzione_overlay(value: bool, source: Path = ROOT) -> bytes:
     """
-    Imposta var _versioneProduzione = true/false in route.js
+    Contenuto di route.js (preso da `source`) con var _versioneProduzione = true/false.
+    Viene scritto solo nel workspace della variante, mai nel working tree.
     """
-    text = ROUTE.read_text(encoding="utf-8")
+    text = (source / ROUTE_REL).read_text(encoding="utf-8")
 
     replacement = f"var _versioneProduzione = {'true' if value else 'false'};"
 
@@ -102,22 +111,343 @@ def set_versione_produzione(value: bool):
         print("✗ Non ho trovato '_versioneProduzione' in route.js", file=sys.stderr)
         sys.exit(1)
 
-    ROUTE.write_text(new_text, encoding="utf-8")
-    print(f"✔ _versioneProduzione impostato a {value}")
+    return new_text.encode("utf-8")
+
+def keystore_path() -> str:
+    """KEYSTORE_PATH assoluto: le build girano nei workspace, non nella root."""
+    return str((ROOT / os.path.expanduser(os.environ["KEYSTORE_PATH"])).resolve())
+
+def find_gradlew(root: Path) -> Optional[Path]:
+    """Gradle wrapper generato da cordova-android (tools/ dalla 12, root prima)."""
+    name = "gradlew.bat" if sys.platform == "win32" else "gradlew"
+    project = root / ANDROID_PROJECT_REL
+    for candidate in (project / "tools" / name, project / name):
+        if candidate.exists():
+            return candidate
+    return None
+
+def write_signing_properties(path: Path):
+    """
+    Stesso file che scrive `cordova build --release -- --keystore=...`:
+    app/build.gradle lo legge da ../release-signing.properties.
+    """
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\")
+
+    lines = [
+        f"storeFile={escape(keystore_path())}",
+        f"storePassword={escape(os.environ['KEYSTORE_PASSWORD'])}",
+        f"keyAlias={escape(os.environ['KEY_ALIAS'])}",
+        f"keyPassword={escape(os.environ['KEY_PASSWORD'])}",
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+def build_release_split(root: Path, signing_args: list[str]):
+    """Release con due `cordova build` separati (APK poi AAB)."""
+    run(["cordova", "build", "android", "--release", "--", *signing_args, "--packageType=apk"], root)
+    run(["cordova", "build", "android", "--release", "--", *signing_args, "--packageType=bundle"], root)
+
+def build_debug(root: Path):
+    run(["cordova", "build", "android", "--debug"], root)
+
+def prepare_android(root: Path):
+    """`cordova prepare`: copia www/ e config.xml nella piattaforma."""
+    run(["cordova", "prepare", "android"], root)
+
+def build_release(root: Path, signing_args: list[str]):
+    """
+    APK e AAB firmati con una sola configurazione Gradle: dopo il prepare,
+    un'unica invocazione del wrapper esegue assembleRelease e bundleRelease insieme.
+    """
+    gradlew = find_gradlew(root)
+    if gradlew is None:
+        print("Gradle wrapper non trovato: build release con due passate cordova")
+        build_release_split(root, signing_args)
+        return
+
+    project = root / ANDROID_PROJECT_REL
+    signing_properties = project / "release-signing.properties"
+
+    write_signing_properties(signing_properties)
+    try:
+        run([str(gradlew), "-p", str(project), ":app:assembleRelease", ":app:bundleRelease"], root)
+    finally:
+        # Contiene le password: non lo lasciamo in giro
+        signing_properties.unlink(missing_ok=True)
+
+def signing_fingerprint() -> str:
+    """Impronta dell'identità di firma (keystore + alias, senza password)."""
+    keystore = Path(keystore_path())
+    digest = build_cache.file_digest(keystore) if keystore.exists() else "missing"
+    return f"{digest}:{os.environ['KEY_ALIAS']}"
+
+def builds_dir(app: apps.App) -> Path:
+    """builds/ nella cartella dell'app (quella storica con l'app unica)."""
+    return BUILDS_DIR if app.default else app.root / "builds"
+
+def build_targets(version: str, app: apps.App = apps.DEFAULT_APP) -> dict[str, Path]:
+    directory = builds_dir(app)
+    return {
+        "debug.apk": directory / f"app-debug-test.{version}.apk",
+        "release.apk": directory / f"app-release-prod.{version}.apk",
+        "release.aab": directory / f"app-release-prod.{version}.aab",
+    }
+
+def clean_platforms(root: Path):
+    """Rimozione completa di piattaforme e artefatti Cordova (comportamento storico)."""
+    try:
+        run(["cordova", "platform", "remove", "ios"], root)
+        run(["cordova", "platform", "remove", "android"], root)
+    except SystemExit:
+        print("Warning: impossibile rimuovere piattaforma android, continuo comunque")
+    
+    # Clean Cordova artifacts
+    for path in [root / "node_modules", root / "platforms", root / "plugins"]:
+        if path.exists():
+            print(f"Removing {path}")
+            with tracing.span(f"rmtree {path.name}", "fs"):
+                shutil.rmtree(path, ignore_errors=True)
+
+def prepare_platform(root: Path, force_clean: bool):
+    """Clean completa e `cordova platform add` (node_modules / plugins dalla cache dipendenze)."""
+    clean_platforms(root)
+    dep_key = dep_cache.before_platform_add(root, ANDROID_PLATFORM, refresh=force_clean)
+
+    # Add platform
+    run(["cordova", "platform", "add", ANDROID_PLATFORM], root)
+    if dep_key is not None:
+        dep_cache.store(root, dep_key)
+
+def variant_pipeline(root: Path, produzione: bool, signing: list[str], force_clean: bool) -> pipeline.Pipeline:
+    """
+    Step della build di una variante. La piattaforma viene ricreata solo se
+    piattaforma/plugin sono cambiati (o con --clean), altrimenti si riusano
+    platforms/ e lo stato incrementale di Gradle; dopo un errore (es. Gradle)
+    il run successivo riparte dallo step fallito.
+    """
+    sources = {
+        "sources": pipeline.files_digest(root, build_cache.INPUT_PATHS),
+        "script": build_cache.file_digest(Path(__file__)),
+    }
+    steps = pipeline.Pipeline(root.name)
+    steps.add(
+        "platform",
+        lambda: prepare_platform(root, force_clean),
+        inputs={"platform": platform_state.platform_fingerprint(ANDROID_PLATFORM, root)},
+        outputs=[root / ANDROID_PROJECT_REL, root / "node_modules"],
+    )
+    if not produzione:
+        steps.add("build-debug", lambda: build_debug(root), inputs=sources, outputs=[root / DEBUG_APK_REL])
+        return steps
+
+    steps.add("prepare", lambda: prepare_android(root), inputs=sources, outputs=[root / ANDROID_PROJECT_REL])
+    steps.add(
+        "build-release",
+        lambda: build_release(root, signing),
+        inputs=dict(sources, signing=signing_fingerprint()),
+        outputs=[root / RELEASE_APK_REL, root / AAB_REL],
+    )
+    return steps
+
+def build_variant(
+    app: apps.App, name: str, produzione: bool, signing: list[str], force_clean: bool, source: Path
+) -> Path:
+    """
+    Builda una variante nel proprio workspace (copia leggera di `source` con
+    _versioneProduzione già impostato). Ritorna la root del workspace.
+    """
+    root = workspace.sync_workspace(
+        f"android-{name}" if app.default else f"{app.name}-android-{name}",
+        {ROUTE_REL: versione_produzione_overlay(produzione, source)},
+        source,
+    )
+    print(f"✔ [{root.name}] workspace pronto, _versioneProduzione = {produzione}")
+    if produzione and asset_optimizer.enabled():
+        # Nel workspace, prima del prepare: il www/ dello sviluppatore non cambia
+        asset_optimizer.optimize_workspace(root)
+    variant_pipeline(root, produzione, signing, force_clean).run(force=force_clean)
+    return root
+
+def signing_args() -> list[str]:
+    return [
+        f"--keystore={keystore_path()}",
+        f"--storePassword={os.environ['KEYSTORE_PASSWORD']}",
+        f"--alias={os.environ['KEY_ALIAS']}",
+        f"--password={os.environ['KEY_PASSWORD']}",
+    ]
+
+def build_all(
+    version: str,
+    force_clean: bool,
+    cache_key: Optional[tuple[str, dict]],
+    source: Path = ROOT,
+    app: apps.App = apps.DEFAULT_APP,
+) -> int:
+    """
+    Debug + release (APK e AAB) dell'app `app` a partire da `source` (la sua
+    cartella), artefatti nella sua builds/.
+    Usata sia dall'hook sincrono sia dal worker della coda (build_queue.py).
+    """
+    args = signing_args()
+    tracing.annotate(version=version)
+    release_id = app.release_id(version)
+
+    # Debug e release in parallelo, ognuna nel proprio workspace: il
+    # working tree (route.js compreso) resta identico
+    variants = {"debug": False, "release": True}
+    roots = {}
+    with workspace.lock("workspaces" if app.default else f"workspaces-{app.name}"):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_JOBS) as pool:
+            futures = {
+                name: pool.submit(build_variant, app, name, produzione, args, force_clean, source)
+                for name, produzione in variants.items()
+            }
+            for name, future in futures.items():
+                try:
+                    roots[name] = future.result()
+                except SystemExit:
+                    print(f"✗ {tag(app)}Build {name} fallita", file=sys.stderr)
+
+    if len(roots) != len(variants):
+        return 1
+
+    print(f"✔ {tag(app)}Version detected:", version)
+
+    artifacts = {
+        "debug.apk": roots["debug"] / DEBUG_APK_REL,
+        "release.apk": roots["release"] / RELEASE_APK_REL,
+        "release.aab": roots["release"] / AAB_REL,
+    }
+    labels = {"debug.apk": "Debug APK", "release.apk": "Release APK", "release.aab": "AAB"}
+    targets = build_targets(version, app)
+
+    # builds/ non viene più svuotata: gli artefatti sono archiviati per digest
+    # e pubblicati con hardlink, le versioni precedenti restano
+    found = {}
+    for name, src in artifacts.items():
+        if src.exists():
+            found[name] = src
+        else:
+            print(f"✗ {tag(app)}{labels[name]} not found:", src)
+
+    # Versione e firma lette dal manifest dentro lo zip: un artefatto vecchio
+    # rimasto in platforms/ non viene pubblicato con il nome della nuova versione
+    failed = False
+    for name, src in found.items():
+        info, problems = artifact_verify.check(src, version)
+        for problem in problems:
+            print(f"✗ {tag(app)}{labels[name]}: {problem}", file=sys.stderr)
+        if problems:
+            failed = True
+        else:
+            print(f"✔ {tag(app)}{labels[name]} verificato: versionName {info.version_name}, "
+                  f"versionCode {info.version_code}, firma {'+'.join(info.signatures)}")
+    if failed:
+        print(f"✗ {tag(app)}Artefatti non coerenti con la versione", version, "- non pubblicati", file=sys.stderr)
+        return 1
+
+    digests = artifact_store.release(release_id, found, targets)
+    for name, digest in digests.items():
+        print(f"✔ {tag(app)}{labels[name]} published to:", targets[name], f"({digest[:12]})")
+
+    if cache_key is not None and len(digests) == len(artifacts):
+        build_cache.store("android", cache_key[0], cache_key[1], digests)
+        print(f"✔ {tag(app)}Artefatti salvati nella build cache")
+
+    # Crescita delle dimensioni rispetto alla versione precedente: gli
+    # artefatti restano pubblicati (e nella build cache, così un nuovo
+    # tentativo rifà solo questo controllo), ma oltre la soglia la build fallisce
+    if not size_report.report(release_id):
+        return 1
+
+    print(f"✅ {tag(app)}Android build completed")
+    return 0
+
+def restore_or_enqueue(
+    app: apps.App,
+    push: Optional[push_state.PushTarget],
+    branch: str,
+    force_clean: bool,
+    async_build: bool,
+) -> tuple[bool, Optional[tuple[str, dict]]]:
+    """
+    Ripristino dalla build cache o accodamento della build di `app`. Ritorna
+    (fatto, chiave della build cache): fatto=False se la build va eseguita ora.
+    """
+    tree = push.tree if push else None
+    rev = push.to_ref if push else None
+
+    # Build cache: stessi input (www/, res/, config.xml, package*.json, piattaforma,
+    # firma) -> ripristiniamo gli artefatti già prodotti
+    cache_key = build_cache.input_key({
+        "platform": ANDROID_PLATFORM,
+        "signing": signing_fingerprint(),
+        "assets": asset_optimizer.fingerprint(),
+        "script": build_cache.file_digest(Path(__file__)),
+    }, tree, app.path)
+    if cache_key is None:
+        print(f"{tag(app)}Build cache non utilizzabile (modifiche non staged o file non tracciati in www/, res/, config.xml o package*.json)")
+    else:
+        entry = build_cache.lookup("android", cache_key[0], list(build_targets("")))
+        if entry is not None:
+            version = get_version(rev, app)
+            tracing.annotate(version=version)
+            artifact_store.restore(app.release_id(version), build_cache.artifacts(entry), build_targets(version, app))
+            print(f"✔ {tag(app)}Artefatti Android {version} ripristinati dalla build cache ({entry.name[:12]})")
+            # La soglia di crescita vale anche per gli artefatti dalla cache
+            if not size_report.report(app.release_id(version)):
+                sys.exit(1)
+            print(f"✅ {tag(app)}Android build completed (cached)")
+            return True, cache_key
+
+    if async_build:
+        # Le versioni sono già state validate dagli hook precedenti: accodiamo
+        # la build del tree staged e lasciamo andare avanti il commit
+        if push:
+            job = build_queue.enqueue(tree, branch, get_version(rev, app), cache_key, force_clean, app)
+        else:
+            job = build_queue.enqueue(
+                get_index_tree(), branch, staged_version(app.rel(ROUTE_REL)), cache_key, force_clean, app
+            )
+        print(f"✔ {tag(app)}Build accodata ({job['id']}): stato con `python {build_queue.__file__} status`")
+        return True, cache_key
+
+    return False, cache_key
 
 def main():
-    staged = get_staged_files()
+    parser = argparse.ArgumentParser(description="Build Android di release")
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="rimuove e ricrea sempre piattaforme, plugin e node_modules dei workspace",
+    )
+    parser.add_argument(
+        "--async",
+        dest="async_build",
+        action="store_true",
+        help="accoda la build al worker in background invece di aspettarla",
+    )
+    args, _ = parser.parse_known_args(sys.argv[1:])
+    force_clean = args.clean or os.environ.get("HOOKS_CORDOVA_CLEAN", "") not in {"", "0"}
+    async_build = args.async_build or os.environ.get("HOOKS_CORDOVA_ASYNC_BUILD", "") not in {"", "0"}
+
+    # Nel pre-push si builda solo la cima del range pushato, dal suo tree;
+    # nel pre-commit l'index
+    push = push_state.current()
+    changed = set(push_state.changed_files()) if push else get_staged_files()
 
     VERSION_FILES = {
         "www/js/route.js",
         "config.xml",
     }
 
-    if not staged.intersection(VERSION_FILES):
+    # Solo le app con route.js / config.xml nel commit (o nel push)
+    affected = apps.affected(changed, VERSION_FILES)
+    if not affected:
         print("Skipping Android build: no version files in commit")
         return 0
 
-    branch = get_branch()
+    branch = push_state.target_branch()
 
     # Esegui solo su branch tipo:
     #   release/*android*
@@ -126,94 +456,49 @@ def main():
         return 0
 
     print("Android release build triggered on:", branch)
+    tracing.annotate(branch=branch)
+    if push:
+        print("Push: build della sola cima", push.to_ref[:10])
+    if len(affected) > 1:
+        print(f"App da buildare: {', '.join(a.name for a in affected)} "
+              f"(max {apps.BUILD_JOBS} alla volta, HOOKS_CORDOVA_APP_BUILD_JOBS)")
 
     # Carica .env se necessario
     load_dotenv()
     require_env_vars()
 
-    KEYSTORE_PATH = os.environ["KEYSTORE_PATH"]
-    KEYSTORE_PASSWORD = os.environ["KEYSTORE_PASSWORD"]
-    KEY_ALIAS = os.environ["KEY_ALIAS"]
-    KEY_PASSWORD = os.environ["KEY_PASSWORD"]
-
-    # Remove platforms
-    try:
-        run(["cordova", "platform", "remove", "ios"])
-        run(["cordova", "platform", "remove", "android"])
-    except SystemExit:
-        print("Warning: impossibile rimuovere piattaforma android, continuo comunque")
-    
-    # Clean builds and Cordova artifacts (ma NON node_modules)
-    for path in [BUILDS_DIR, ROOT / "node_modules", ROOT / "platforms", ROOT / "plugins"]:
-        if path.exists():
-            print(f"Removing {path}")
-            shutil.rmtree(path, ignore_errors=True)
-
-    # Add platform
-    run(["cordova", "platform", "add", "android@14"])
-    
-    # 1. Metti _versioneProduzione = false
-    set_versione_produzione(False)
-    
-    # Build debug APK
-    run([
-        "cordova", "build", "android", "--debug"
-    ])
-    
-    # 1. Metti _versioneProduzione = true
-    set_versione_produzione(True)
-
-    # Build release APK
-    run([
-        "cordova", "build", "android", "--release",
-        "--",
-        f"--keystore={KEYSTORE_PATH}",
-        f"--storePassword={KEYSTORE_PASSWORD}",
-        f"--alias={KEY_ALIAS}",
-        f"--password={KEY_PASSWORD}",
-        "--packageType=apk"
-    ])
-
-    # Build release AAB
-    run([
-        "cordova", "build", "android", "--release",
-        "--",
-        f"--keystore={KEYSTORE_PATH}",
-        f"--storePassword={KEYSTORE_PASSWORD}",
-        f"--alias={KEY_ALIAS}",
-        f"--password={KEY_PASSWORD}",
-        "--packageType=bundle"
-    ])
-
-    version = get_version()
-    print("✔ Version detected:", version)
-
-    BUILDS_DIR.mkdir(exist_ok=True)
-
-    debug_apk_target = BUILDS_DIR / f"app-debug-test.{version}.apk"
-    release_apk_target = BUILDS_DIR / f"app-release-prod.{version}.apk"
-    aab_target = BUILDS_DIR / f"app-release-prod.{version}.aab"
-
-    if DEBUG_APK_PATH.exists():
-        shutil.copy2(DEBUG_APK_PATH, debug_apk_target)
-        print("✔ Debug APK copied to:", debug_apk_target)
-    else:
-        print("✗ Debug APK not found:", DEBUG_APK_PATH)
-        
-    if RELEASE_APK_PATH.exists():
-        shutil.copy2(RELEASE_APK_PATH, release_apk_target)
-        print("✔ Release APK copied to:", release_apk_target)
-    else:
-        print("✗ Release APK not found:", RELEASE_APK_PATH)
-
-    if AAB_PATH.exists():
-        shutil.copy2(AAB_PATH, aab_target)
-        print("✔ AAB copied to:", aab_target)
+    # Cache e coda app per app (solo comandi git), poi le build vere
+    failed = []
+    pending = {}
+    for app in affected:
+        try:
+            done, cache_key = restore_or_enqueue(app, push, branch, force_clean, async_build)
+        except SystemExit:
+            failed.append(app.name)
+            continue
+        if not done:
+            pending[app] = cache_key
+
+    def one(app: apps.App, source: Path) -> int:
+        try:
+            version = get_version(push.to_ref if push else None, app)
+            return build_all(version, force_clean, pending[app], source, app)
+        except SystemExit as e:
+            # Una app fallita non interrompe le build delle altre
+            return 0 if e.code in (None, 0) else 1
+
+    if pending and push:
+        # Un solo push alla volta usa la cartella di export (una per tutte le app)
+        with workspace.lock("push-export"):
+            export = workspace.export_tree(push.tree, cache_dir() / "push" / "export")
+            results = apps.pool_map(lambda app: one(app, export / app.path), list(pending), apps.BUILD_JOBS)
     else:
-        print("✗ AAB not found:", AAB_PATH)
+        results = apps.pool_map(lambda app: one(app, app.root), list(pending), apps.BUILD_JOBS)
 
-    print("✅ Android build completed")
-    return 0
+    failed += [app.name for app, code in zip(pending, results) if code != 0]
+    if failed and len(affected) > 1:
+        print(f"✗ Build Android fallita per: {', '.join(failed)}", file=sys.stderr)
+    return 1 if failed else 0
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Cache locale degli artefatti di build, indicizzata per hash degli input.
+
+Input della chiave: tree di www/, res/, resources/ e blob di config.xml /
+package.json / package-lock.json (dall'index), versione della piattaforma Cordova, impronta
+dell'identità di firma (keystore + alias, mai le password) e hash dello script
+di build. Se la stessa combinazione è già stata buildata, gli artefatti vengono
+ripristinati in builds/ senza rifare nulla. Con più app (apps.py) i path sono
+quelli della cartella dell'app.
+
+Ogni voce vive in .git/git-hooks-cordova/build-cache/<chiave>/manifest.json, con
+gli input e il digest degli artefatti prodotti: i file stanno una volta sola
+nell'archivio degli artefatti (artifact_store.py). Lo spazio su disco è quello
+dell'archivio, limitato per numero di versioni e per dimensione
+(HOOKS_CORDOVA_ARTIFACTS_MAX_MB); qui restano solo i manifest. Una voce i cui
+oggetti sono stati eliminati dall'archivio conta come mancante e viene rimossa.
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Optional
+
+import artifact_store
+import tracing
+from git_state import ROOT, cache_dir, get_index_tree
+
+# Anche res/ e resources/ (icone, splash): il workspace le copia nella build
+INPUT_PATHS = ["www", "res", "resources", "config.xml", "package.json", "package-lock.json"]
+
+MANIFEST = "manifest.json"
+
+def cache_root(kind: str) -> Path:
+    return cache_dir() / "build-cache" / kind
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def input_paths(app_path: str = ".") -> list[str]:
+    """INPUT_PATHS relativi alla root della repo per l'app in `app_path`."""
+    return INPUT_PATHS if app_path == "." else [f"{app_path}/{p}" for p in INPUT_PATHS]
+
+def working_tree_matches_index(app_path: str = ".") -> bool:
+    """
+    True se gli INPUT_PATHS nel working tree coincidono con l'index: la build
+    usa il working tree, la chiave l'index. Contano anche i file non tracciati
+    e quelli ignorati (es. un bundle generato in www/), che finiscono nell'APK
+    senza cambiare la chiave.
+    """
+    with tracing.span("git status", "git"):
+        result = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=all", "--ignored", "--",
+             *input_paths(app_path)],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+        )
+    return result.returncode == 0 and not result.stdout.strip()
+
+def index_inputs(tree: Optional[str] = None, app_path: str = ".") -> Optional[dict]:
+    """SHA (da index, o dal tree indicato) di www/ e dei file di progetto che influenzano la build."""
+    tree = tree or get_index_tree()
+    if not tree:
+        return None
+    with tracing.span("git ls-tree", "git"):
+        out = subprocess.check_output(
+            ["git", "ls-tree", tree, "--", *input_paths(app_path)], cwd=ROOT, text=True
+        )
+    inputs = {}
+    for line in out.splitlines():
+        meta, path = line.split("\t", 1)
+        inputs[path] = meta.split()[2]
+    return inputs
+
+def input_key(extra: dict, tree: Optional[str] = None, app_path: str = ".") -> Optional[tuple[str, dict]]:
+    """
+    Ritorna (chiave, input) per la build corrente, oppure None se gli input non
+    sono determinabili (index con conflitti o modifiche non staged).
+    Con `tree` (es. la cima di un push) la build parte da quel tree esportato e
+    il working tree non conta.
+    """
+    if tree is None and not working_tree_matches_index(app_path):
+        return None
+    inputs = index_inputs(tree, app_path)
+    if inputs is None:
+        return None
+    inputs.update(extra)
+    raw = json.dumps(inputs, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest(), inputs
+
+def _read_manifest(entry: Path) -> Optional[dict]:
+    try:
+        return json.loads((entry / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def lookup(kind: str, key: str, names: list[str]) -> Optional[Path]:
+    entry = cache_root(kind) / key
+    manifest = _read_manifest(entry)
+    if manifest is None:
+        return None
+    artifacts = manifest.get("artifacts", {})
+    if not all(n in artifacts and artifact_store.exists(artifacts[n]["sha256"]) for n in names):
+        return None
+    os.utime(entry / MANIFEST)
+    return entry
+
+def artifacts(entry: Path) -> dict[str, str]:
+    """Nome artefatto -> digest nell'archivio, per una voce trovata con lookup."""
+    manifest = _read_manifest(entry) or {}
+    return {name: a["sha256"] for name, a in manifest.get("artifacts", {}).items()}
+
+@tracing.traced("build-cache store", "fs")
+def store(kind: str, key: str, inputs: dict, digests: dict[str, str]):
+    """Registra gli artefatti (già nell'archivio, per digest) prodotti dagli input."""
+    root = cache_root(kind)
+    tmp = root / f"{key}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    artifacts = {
+        name: {"sha256": digest, "size": artifact_store.object_path(digest).stat().st_size}
+        for name, digest in digests.items()
+    }
+    manifest = {"created": time.time(), "inputs": inputs, "artifacts": artifacts}
+    (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    entry = root / key
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp, entry)
+    evict(kind)
+
+def evict(kind: str):
+    """Elimina le voci con artefatti non più presenti nell'archivio."""
+    for entry in cache_root(kind).iterdir():
+        manifest = _read_manifest(entry)
+        if manifest is None:
+            continue
+        digests = [a["sha256"] for a in manifest.get("artifacts", {}).values()]
+        if not all(artifact_store.exists(d) for d in digests):
+            shutil.rmtree(entry, ignore_errors=True)
@@ -6,14 +6,25 @@ import subprocess
 import sys
 from pathlib import Path
 
-ROOT = Path(__file__).resolve().parents[1]
+import apps
+import build_log
+import dep_cache
+import pipeline
+import platform_state
+import tracing
+from git_state import ROOT, get_staged_files
+from push_state import changed_files, current, target_branch
+from versions import CONFIG_FILE, ROUTE_FILE
+
 ENV_FILE = ROOT / ".env"
 
-ROUTE = ROOT / "www/js/route.js"
+ROUTE = ROOT / ROUTE_FILE
 
 DEFAULT_XCODE_PATH = "/Applications/Xcode.app/Contents/MacOS/Xcode"
 WORKSPACE_PATH = ROOT / "platforms/ios/Intelliclima+.xcworkspace"
 
+IOS_PLATFORM = "ios@7"
+
 def load_dotenv():
     """Carica .env se esiste (solo righe KEY=VALUE, no dipendenze esterne)."""
     if not ENV_FILE.exists():
@@ -27,26 +38,20 @@ def load_dotenv():
         if key and key not in os.environ:
             os.environ[key] = value.strip()
 
-def run(cmd, allow_fail=False):
+def run(cmd, allow_fail=False, root: Path = ROOT):
     """Esegue un comando, esce con errore se fallisce (a meno di allow_fail=True)."""
-    print("Running:", " ".join(cmd))
-    result = subprocess.run(cmd)
-    if result.returncode != 0 and not allow_fail:
-        print(f"✗ Command failed: {' '.join(cmd)}", file=sys.stderr)
-        sys.exit(result.returncode)
-    return result.returncode
-
-def get_branch() -> str:
-    return subprocess.check_output(
-        ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-        text=True
-    ).strip()
-    
-def set_versione_produzione(value: bool):
+    label = f" [{root.name}]" if root != ROOT else ""
+    print(f"Running{label}:", build_log.redact(cmd), flush=True)
+    returncode = build_log.run(cmd, root, root.name if root != ROOT else "", report=not allow_fail)
+    if returncode != 0 and not allow_fail:
+        sys.exit(returncode)
+    return returncode
+
+def set_versione_produzione(value: bool, route: Path = ROUTE):
     """
     Imposta var _versioneProduzione = true/false in route.js
     """
-    text = ROUTE.read_text(encoding="utf-8")
+    text = route.read_text(encoding="utf-8")
 
     replacement = f"var _versioneProduzione = {'true' if value else 'false'};"
 
@@ -60,7 +65,7 @@ def set_versione_produzione(value: bool):
         print("✗ Non ho trovato '_versioneProduzione' in route.js", file=sys.stderr)
         sys.exit(1)
 
-    ROUTE.write_text(new_text, encoding="utf-8")
+    route.write_text(new_text, encoding="utf-8")
     print(f"✔ _versioneProduzione impostato a {value}")
     
 def force_kill_xcode():
@@ -74,57 +79,109 @@ def force_kill_xcode():
 
     print("✔ Xcode process killed (if it was running)")
 
-def main() -> int:
-    branch = get_branch()
-
-    # Esegui solo su branch tipo:
-    #   release/*android*
-    if not (branch.startswith("release/") and "ios" in branch.lower()):
-        print(f"Skipping iOS build (branch {branch} is not release/* with 'ios' in the name)")
-        return 0
-    
-    # Chiudi Xcode se è aperto
-    force_kill_xcode()
-    
-    # ----------------- Xcode path: .env > default -----------------
-    load_dotenv()
-    xcode_path = os.environ.get("XCODE_PATH") or DEFAULT_XCODE_PATH
-    xcode_path = os.path.expanduser(xcode_path)
-
-    print(f"Using Xcode path: {xcode_path}")
-
-    # ----------------- Cordova: remove platforms -----------------
+def recreate_platform(root: Path = ROOT):
+    """Rimozione di piattaforme / plugin / node_modules e `cordova platform add ios`."""
     # Se la piattaforma non esiste, non vogliamo fallire per quello.
-    run(["cordova", "platform", "remove", "ios"], allow_fail=True)
-    run(["cordova", "platform", "remove", "android"], allow_fail=True)
+    run(["cordova", "platform", "remove", "ios"], allow_fail=True, root=root)
+    run(["cordova", "platform", "remove", "android"], allow_fail=True, root=root)
 
-    for rel in ("builds","node_modules", "platforms", "plugins"):
-        path = ROOT / rel
+    for rel in ("node_modules", "platforms", "plugins"):
+        path = root / rel
         if path.exists():
             print(f"Removing {path}")
-            shutil.rmtree(path, ignore_errors=True)
-    
-    # Metti _versioneProduzione = true
-    set_versione_produzione(True)
+            with tracing.span(f"rmtree {path.name}", "fs"):
+                shutil.rmtree(path, ignore_errors=True)
 
-    # ----------------- Add iOS platform -----------------
-    run(["cordova", "platform", "add", "ios@7"])
+    # node_modules / plugins dalla cache dipendenze, se ci sono
+    dep_key = dep_cache.before_platform_add(root, IOS_PLATFORM)
 
-    # ----------------- Apri Xcode -----------------
-    if not WORKSPACE_PATH.exists():
-        print(f"✗ Workspace non trovato: {WORKSPACE_PATH}", file=sys.stderr)
-        return 1
+    # ----------------- Add iOS platform -----------------
+    run(["cordova", "platform", "add", IOS_PLATFORM], root=root)
+    if dep_key is not None:
+        dep_cache.store(root, dep_key)
+
+def prepare_ios(root: Path = ROOT):
+    run(["cordova", "prepare", "ios"], root=root)
+
+def workspace_path(app: apps.App) -> Path:
+    """Workspace Xcode dell'app: il nome dipende dal <name> di config.xml."""
+    if app.default:
+        return WORKSPACE_PATH
+    found = sorted((app.root / "platforms/ios").glob("*.xcworkspace"))
+    return found[0] if found else app.root / "platforms/ios" / f"{app.name}.xcworkspace"
+
+def open_xcode(xcode_path: str, app: apps.App = apps.DEFAULT_APP):
+    workspace = workspace_path(app)
+    if not workspace.exists():
+        print(f"✗ Workspace non trovato: {workspace}", file=sys.stderr)
+        sys.exit(1)
 
     try:
         # Lanciamo Xcode in background, come nello script bash (&> /dev/null &)
         subprocess.Popen(
-            [xcode_path, str(WORKSPACE_PATH)],
+            [xcode_path, str(workspace)],
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
         )
     except FileNotFoundError:
         print(f"✗ Xcode non trovato in: {xcode_path}", file=sys.stderr)
-        return 1
+        sys.exit(1)
+
+def ios_pipeline(app: apps.App, xcode_path: str, kill_xcode: bool = True) -> pipeline.Pipeline:
+    """
+    Chiudi Xcode e imposta _versioneProduzione = true ogni volta; la
+    piattaforma viene ricreata solo se piattaforma/plugin sono cambiati e il
+    prepare solo se è cambiato www/ (o se il run precedente si era fermato lì)
+    """
+    root = app.root
+    workspace = workspace_path(app)
+    steps = pipeline.Pipeline("ios" if app.default else f"ios-{app.name}")
+    if kill_xcode:
+        steps.add("kill-xcode", force_kill_xcode)
+    steps.add("versione-produzione", lambda: set_versione_produzione(True, root / ROUTE_FILE))
+    steps.add(
+        "platform",
+        lambda: recreate_platform(root),
+        inputs={"platform": platform_state.platform_fingerprint(IOS_PLATFORM, root)},
+        outputs=[workspace, root / "node_modules"],
+    )
+    steps.add(
+        "prepare",
+        lambda: prepare_ios(root),
+        inputs=lambda: {"sources": pipeline.files_digest(root, ["www", "config.xml"])},
+        outputs=[workspace],
+    )
+    steps.add("open-xcode", lambda: open_xcode(xcode_path, app))
+    return steps
+
+def main() -> int:
+    branch = target_branch()
+
+    # Esegui solo su branch tipo:
+    #   release/*android*
+    if not (branch.startswith("release/") and "ios" in branch.lower()):
+        print(f"Skipping iOS build (branch {branch} is not release/* with 'ios' in the name)")
+        return 0
+
+    # ----------------- Xcode path: .env > default -----------------
+    load_dotenv()
+    xcode_path = os.environ.get("XCODE_PATH") or DEFAULT_XCODE_PATH
+    xcode_path = os.path.expanduser(xcode_path)
+
+    print(f"Using Xcode path: {xcode_path}")
+
+    # Con più app solo quelle con route.js / config.xml nel push (o nel
+    # commit); una dopo l'altra, Xcode è uno solo
+    targets = apps.load()
+    if len(targets) > 1:
+        changed = changed_files() if current() else get_staged_files()
+        targets = apps.affected(changed, (ROUTE_FILE, CONFIG_FILE))
+
+    # HOOKS_CORDOVA_CLEAN=1: ricrea tutto come prima, ignorando i checkpoint
+    force = os.environ.get("HOOKS_CORDOVA_CLEAN", "") not in {"", "0"}
+    for i, app in enumerate(targets):
+        # Xcode si chiude solo prima della prima app: le altre si aprono accanto
+        ios_pipeline(app, xcode_path, kill_xcode=i == 0).run(force=force)
 
     print("✅ iOS project recreated and Xcode launched")
     return 0
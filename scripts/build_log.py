@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Output dei comandi di build (cordova, Gradle, ...) catturato con memoria
+costante, invece di migliaia di righe riversate sul terminale.
+
+Ogni riga viene:
+- scritta nel log completo del run, compresso, in
+  .git/git-hooks-cordova/logs/<data>-<run>-<pid>.log.gz (ultimi MAX_LOGS,
+  password della riga di comando mascherate);
+- tenuta in un ring buffer delle ultime righe (deque a lunghezza fissa);
+- analizzata per i blocchi di errore di Gradle ("FAILURE:" / "* What went
+  wrong:" fino a "* Try:") e le righe di errore dei compilatori, anche loro
+  in buffer limitati.
+
+Durante il comando, se lo stderr del processo è un terminale (anche quando
+run_hooks.py cattura lo stdout degli hook), una sola riga di avanzamento
+mostra tempo trascorso e ultima riga di ogni comando attivo (le varianti
+buildano in parallelo). Se il comando fallisce vengono stampati i blocchi di
+errore e le ultime HOOKS_CORDOVA_LOG_TAIL righe significative (default 40).
+Con HOOKS_CORDOVA_VERBOSE=1 l'output viene anche mostrato per intero.
+"""
+import atexit
+import collections
+import gzip
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import tracing
+from git_state import cache_dir
+
+MAX_LOGS = 20
+
+TAIL_LINES = max(1, int(os.environ.get("HOOKS_CORDOVA_LOG_TAIL", "40")))
+# Le ultime righe in assoluto: quelle significative si scelgono da qui
+RING_LINES = TAIL_LINES * 5
+ERROR_BLOCK_LINES = 80
+ERROR_LINES = 20
+# Righe più lunghe (es. classpath) vengono spezzate: memoria limitata anche così
+MAX_LINE_BYTES = 4096
+
+PROGRESS_INTERVAL = 0.1
+
+BLOCK_START_RE = re.compile(r"^(FAILURE: |\* What went wrong:)")
+BLOCK_END_RE = re.compile(r"^(\* Try:|\* Get more help|BUILD FAILED)")
+ERROR_RE = re.compile(r"(^e: |^ERROR:|: error:|^error:|\bError: )")
+# Password nella riga di comando (es. `cordova build --release -- --storePassword=...`)
+SECRET_ARG_RE = re.compile(r"^(--\w*[Pp]assword=).*")
+# Righe che non aiutano a capire un errore
+NOISE_RE = re.compile(r"^(> Task |> Configure project|Download(ing)? https?://|<[-=]*> \d+%|\s*$)")
+
+_lock = threading.Lock()
+_log = None
+_log_path: Optional[Path] = None
+
+def verbose() -> bool:
+    return os.environ.get("HOOKS_CORDOVA_VERBOSE", "") not in {"", "0"}
+
+def redact(cmd: list[str]) -> str:
+    return " ".join(SECRET_ARG_RE.sub(r"\1***", arg) for arg in cmd)
+
+def logs_dir() -> Path:
+    return cache_dir() / "logs"
+
+def _write_log(data: bytes) -> Optional[Path]:
+    """Aggiunge `data` al log del run (aperto al primo comando). Chiamata con _lock."""
+    global _log, _log_path
+    if _log is None:
+        directory = logs_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        _log_path = directory / f"{stamp}-{tracing.run_name()}-{os.getpid()}.log.gz"
+        # compresslevel basso: il log non deve rallentare la build
+        _log = gzip.open(_log_path, "wb", compresslevel=1)
+        for old in sorted(directory.glob("*.log.gz"))[:-MAX_LOGS]:
+            old.unlink(missing_ok=True)
+    _log.write(data)
+    return _log_path
+
+@atexit.register
+def close() -> Optional[Path]:
+    """Chiude il log del run (il comando successivo ne apre uno nuovo) e ne ritorna il path."""
+    global _log
+    with _lock:
+        if _log is None:
+            return None
+        _log.close()
+        _log = None
+        return _log_path
+
+class _Progress:
+    """Riga di avanzamento condivisa da tutti i comandi attivi (thread diversi)."""
+
+    def __init__(self):
+        self.active: dict[int, list] = {}
+        self.last_render = 0.0
+        self.shown = False
+
+    @staticmethod
+    def terminal():
+        """
+        Lo stderr originale del processo: run_hooks.py cattura sys.stdout degli
+        hook in memoria, ma la riga di avanzamento deve arrivare al terminale.
+        """
+        return sys.__stderr__
+
+    def enabled(self) -> bool:
+        out = self.terminal()
+        return out is not None and out.isatty() and not verbose()
+
+    def start(self, key: int, label: str):
+        with _lock:
+            self.active[key] = [label, time.monotonic(), ""]
+
+    def update(self, key: int, line: str):
+        now = time.monotonic()
+        with _lock:
+            self.active[key][2] = line
+            if now - self.last_render >= PROGRESS_INTERVAL:
+                self.last_render = now
+                self._render(now)
+
+    def stop(self, key: int):
+        with _lock:
+            self.active.pop(key, None)
+            self._clear()
+            if self.active:
+                self._render(time.monotonic())
+
+    def _clear(self):
+        if self.shown:
+            out = self.terminal()
+            out.write("\r\x1b[K")
+            out.flush()
+            self.shown = False
+
+    def _render(self, now: float):
+        try:
+            width = os.get_terminal_size(self.terminal().fileno()).columns - 1
+        except OSError:
+            width = 79
+        parts = [f"[{label}] {now - start:.0f}s" for label, start, _ in self.active.values()]
+        text = "⏳ " + " · ".join(parts)
+        last = next((line for _, _, line in reversed(self.active.values()) if line), "")
+        if last:
+            text += f"  {last.strip()}"
+        out = self.terminal()
+        out.write("\r\x1b[K" + text[:width])
+        out.flush()
+        self.shown = True
+
+_progress = _Progress()
+
+class _Capture:
+    """Ultime righe e blocchi di errore di un comando, in buffer a lunghezza fissa."""
+
+    def __init__(self):
+        self.tail = collections.deque(maxlen=RING_LINES)
+        self.blocks = collections.deque(maxlen=ERROR_BLOCK_LINES)
+        self.errors = collections.deque(maxlen=ERROR_LINES)
+        self.in_block = False
+
+    def feed(self, line: str):
+        self.tail.append(line)
+        if BLOCK_START_RE.match(line):
+            self.in_block = True
+        if self.in_block:
+            self.blocks.append(line)
+            if BLOCK_END_RE.match(line):
+                self.in_block = False
+        elif ERROR_RE.search(line):
+            self.errors.append(line)
+
+    def report(self, log: Optional[Path]):
+        out = sys.stderr
+        if self.blocks:
+            print("  Errori Gradle:", file=out)
+            for line in self.blocks:
+                print("  │", line, file=out)
+        if self.errors:
+            print("  Righe di errore:", file=out)
+            for line in self.errors:
+                print("  │", line, file=out)
+        relevant = [line for line in self.tail if not NOISE_RE.match(line)]
+        if relevant:
+            print(f"  Ultime {min(len(relevant), TAIL_LINES)} righe:", file=out)
+            for line in relevant[-TAIL_LINES:]:
+                print("  │", line, file=out)
+        if log is not None:
+            print("  Log completo:", log, file=out)
+
+def run(cmd: list[str], cwd: Optional[Path] = None, label: str = "", report: bool = True) -> int:
+    """
+    Esegue `cmd` catturandone l'output (stdout e stderr insieme). Se fallisce
+    (e `report`) stampa gli errori trovati e le ultime righe. Ritorna il returncode.
+    """
+    name = tracing.command_name(cmd)
+    prefix = f"[{label}] " if label else ""
+    label = label or name
+    capture = _Capture()
+    key = threading.get_ident()
+    echo = verbose()
+    progress = _progress.enabled()
+    log = None
+    start = time.monotonic()
+
+    with tracing.span(name, "subprocess", cwd=cwd.name if cwd else ""):
+        proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        if progress:
+            _progress.start(key, label)
+        try:
+            with _lock:
+                log = _write_log(f"[{label}] $ {redact(cmd)}\n".encode("utf-8"))
+            for raw in iter(lambda: proc.stdout.readline(MAX_LINE_BYTES), b""):
+                with _lock:
+                    _write_log(f"[{label}] ".encode("utf-8") + raw)
+                line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                capture.feed(line)
+                if echo:
+                    print(line, flush=True)
+                elif progress:
+                    _progress.update(key, line)
+            returncode = proc.wait()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+            if progress:
+                _progress.stop(key)
+            with _lock:
+                _write_log(f"[{label}] exit {proc.returncode}\n".encode("utf-8"))
+
+    if returncode != 0:
+        if report:
+            print("✗ Command failed:", redact(cmd), f"(exit {returncode})", file=sys.stderr)
+            capture.report(log)
+    else:
+        print(f"✔ {prefix}{name} ({time.monotonic() - start:.1f}s)")
+    return returncode
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Coda locale delle build Android asincrone.
+
+Con HOOKS_CORDOVA_ASYNC_BUILD=1 (o `build_android.py --async`) l'hook valida le
+versioni, accoda un job e ritorna subito; un worker in background svuota la coda:
+
+- i job sono file JSON in .git/git-hooks-cordova/queue/jobs/ (tree dell'index,
+  HEAD, branch, app, versione, varianti, chiave della build cache, stato);
+- un solo worker per volta (lock "queue-worker") e le build passano dal lock
+  "workspaces" (uno per app), quindi mai due build sullo stesso platforms/;
+- dei job accodati per lo stesso branch e la stessa app si builda solo il più
+  recente, gli altri diventano "superseded";
+- la build usa il tree esportato dall'index del momento del commit (non il
+  working tree, che nel frattempo può cambiare); stato corrente in
+  builds/build-status.json, artefatti in builds/ come per la build sincrona
+  (con più app nella builds/ di ogni app, con i soli job di quell'app).
+
+Uso:
+    python build_queue.py status     # job in coda / in corso / conclusi
+    python build_queue.py worker     # svuota la coda (lanciato dall'hook)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import apps
+import build_log
+import workspace
+from git_state import ROOT, cache_dir
+
+VARIANTS = ["debug", "release"]
+
+# Job conclusi (done / failed / superseded) conservati su disco
+MAX_FINISHED = 50
+
+STATUS_FILE = "build-status.json"
+
+def queue_dir() -> Path:
+    return cache_dir() / "queue"
+
+def jobs_dir() -> Path:
+    return queue_dir() / "jobs"
+
+def _write_json(path: Path, data: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+def save_job(job: dict):
+    job["updated"] = time.time()
+    _write_json(jobs_dir() / f"{job['id']}.json", job)
+
+def load_jobs() -> list[dict]:
+    """Tutti i job su disco, dal più vecchio al più recente."""
+    jobs = []
+    if not jobs_dir().exists():
+        return jobs
+    for path in jobs_dir().glob("*.json"):
+        try:
+            jobs.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    jobs.sort(key=lambda j: j["created"])
+    return jobs
+
+def enqueue(
+    tree: str,
+    branch: str,
+    version: Optional[str],
+    cache_key: Optional[tuple[str, dict]],
+    force_clean: bool,
+    app: apps.App = apps.DEFAULT_APP,
+) -> dict:
+    """Accoda la build di `app` dal tree `tree` e avvia il worker se non è già attivo."""
+    # Su un branch ancora senza commit HEAD non esiste: nessun parent
+    result = subprocess.run(
+        ["git", "rev-parse", "--verify", "--quiet", "HEAD"],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    head = result.stdout.strip() if result.returncode == 0 else None
+    job = {
+        "id": time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6],
+        "created": time.time(),
+        "status": "queued",
+        "tree": tree,
+        "parent": head,
+        "commit": None,
+        "branch": branch,
+        # None = l'app unica nella root della repo
+        "app": None if app.default else app.name,
+        "version": version,
+        "variants": VARIANTS,
+        "cache_key": list(cache_key) if cache_key else None,
+        "clean": force_clean,
+    }
+    save_job(job)
+    spawn_worker()
+    return job
+
+def spawn_worker():
+    """Lancia il worker staccato dal terminale: sopravvive alla fine del commit."""
+    log = queue_dir() / "worker.log"
+    log.parent.mkdir(parents=True, exist_ok=True)
+    # Le variabili impostate da git per l'hook (GIT_INDEX_FILE in primis) non
+    # devono arrivare al worker, che lavora a commit concluso
+    env = {k: v for k, v in os.environ.items() if not k.startswith("GIT_")}
+    kwargs = {}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    with log.open("ab") as out:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "worker"],
+            cwd=ROOT,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+            **kwargs,
+        )
+
+def resolve_commit(job: dict) -> Optional[str]:
+    """Il commit creato dal tree del job (l'hook gira prima che esista)."""
+    try:
+        out = subprocess.check_output(
+            ["git", "log", "-n", "20", "--format=%H %T", job["branch"], "--"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        )
+    except subprocess.CalledProcessError:
+        return None
+    for line in out.splitlines():
+        commit, tree = line.split()
+        if tree == job["tree"]:
+            return commit
+    return None
+
+def status_path(app_name: Optional[str]) -> Path:
+    """build-status.json nella builds/ dell'app (None = l'app unica nella root)."""
+    try:
+        app = apps.get(app_name)
+    except KeyError:
+        # App tolta da apps.json: lo stato va comunque scritto da qualche parte
+        return ROOT / "builds" / STATUS_FILE
+    return (ROOT if app.default else app.root) / "builds" / STATUS_FILE
+
+def write_status(app_name: Optional[str], current: Optional[dict]):
+    """Stato dei job di una sola app: con più app ognuna ha il suo file."""
+    jobs = [j for j in load_jobs() if j.get("app") == app_name]
+    _write_json(status_path(app_name), {
+        "updated": time.time(),
+        "running": current,
+        "queued": [j["id"] for j in jobs if j["status"] == "queued"],
+        "last": next((j for j in reversed(jobs) if j["status"] in {"done", "failed"}), None),
+    })
+
+def prune():
+    finished = [j for j in load_jobs() if j["status"] not in {"queued", "running"}]
+    for job in finished[:-MAX_FINISHED]:
+        (jobs_dir() / f"{job['id']}.json").unlink(missing_ok=True)
+
+def next_job() -> Optional[dict]:
+    """
+    Il job accodato più vecchio, dopo aver scartato quelli superati da un job
+    più recente dello stesso branch e della stessa app.
+    """
+    latest = {}
+    for job in load_jobs():
+        if job["status"] != "queued":
+            continue
+        target = (job["branch"], job.get("app"))
+        previous = latest.get(target)
+        if previous is not None:
+            previous["status"] = "superseded"
+            previous["superseded_by"] = job["id"]
+            save_job(previous)
+            print(f"↷ Job {previous['id']} superato da {job['id']}")
+        latest[target] = job
+    return min(latest.values(), key=lambda j: j["created"], default=None)
+
+def run_job(job: dict) -> bool:
+    import build_android
+
+    build_android.load_dotenv()
+    build_android.require_env_vars()
+
+    cache_key = tuple(job["cache_key"]) if job["cache_key"] else None
+    try:
+        app = apps.get(job.get("app"))
+    except KeyError:
+        print(f"✗ App {job['app']} non più presente in {apps.APPS_FILE.name}", file=sys.stderr)
+        return False
+    source = workspace.export_tree(job["tree"], queue_dir() / "export") / app.path
+    try:
+        return build_android.build_all(job["version"], job["clean"], cache_key, source, app) == 0
+    except SystemExit as e:
+        return e.code in (None, 0)
+    finally:
+        # Un log per job, non uno per tutta la vita del worker
+        log = build_log.close()
+        if log is not None:
+            job["log"] = str(log)
+
+def drain():
+    """Esegue i job accodati finché la coda è vuota (con il lock "queue-worker" preso)."""
+    while True:
+        job = next_job()
+        if job is None:
+            break
+        job["status"] = "running"
+        job["started"] = time.time()
+        job["pid"] = os.getpid()
+        save_job(job)
+        write_status(job.get("app"), job)
+        app = f"{job['app']} " if job.get("app") else ""
+        print(f"▶ Job {job['id']} ({job['branch']}, {app}{job['version']})", flush=True)
+
+        ok = run_job(job)
+
+        job["status"] = "done" if ok else "failed"
+        job["finished"] = time.time()
+        job["commit"] = resolve_commit(job)
+        save_job(job)
+        write_status(job.get("app"), None)
+        print(f"{'✔' if ok else '✗'} Job {job['id']}: {job['status']}", flush=True)
+    prune()
+
+def worker() -> int:
+    while True:
+        try:
+            with workspace.lock("queue-worker", blocking=False):
+                drain()
+        except BlockingIOError:
+            # Un altro worker sta già svuotando la coda: prenderà anche i nuovi job
+            return 0
+        # Un job accodato dopo l'ultimo next_job() ma mentre tenevamo il lock
+        # (es. durante prune()) ha trovato il worker attivo e non ne ha lanciato
+        # un altro: a lock rilasciato ricontrolliamo la coda
+        if not any(j["status"] == "queued" for j in load_jobs()):
+            return 0
+
+def _describe(job: dict) -> str:
+    when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(job["created"]))
+    commit = (job.get("commit") or job["tree"])[:10]
+    app = f"{job['app']}/" if job.get("app") else ""
+    return f"{job['status']:<10} {job['id']}  {when}  {job['branch']}  {app}{job['version']}  {commit}"
+
+def status() -> int:
+    jobs = load_jobs()
+    if not jobs:
+        print("Nessun job nella coda")
+        return 0
+    # Job "running" il cui worker è morto (es. reboot) vanno segnalati
+    for job in jobs:
+        if job["status"] == "running" and not _pid_alive(job.get("pid")):
+            job["status"] = "failed"
+            job["error"] = "worker terminato"
+            save_job(job)
+    for job in jobs:
+        print(_describe(job))
+    return 0
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Coda delle build Android asincrone")
+    parser.add_argument("command", choices=["status", "worker"])
+    args = parser.parse_args()
+    if args.command == "worker":
+        return worker()
+    return status()
+
+if __name__ == "__main__":
+    sys.exit(main())
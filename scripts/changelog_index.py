@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Indice dei titoli di versione del CHANGELOG staged, per non cercare la versione
+come sottostringa di tutto il file (che cresce a ogni rilascio, e dove `1.2.1`
+"compare" anche dentro `1.2.10`).
+
+L'indice contiene offset e titolo di ogni titolo Markdown (`## 1.3.0 - ...`)
+con almeno un numero, ed è salvato per SHA del blob in
+.git/git-hooks-cordova/changelog-index.json: per lo stesso CHANGELOG staged
+(pre-commit, commit-msg, commit successivi) il file non viene più letto.
+
+Quando il CHANGELOG cambia solo in cima (il caso normale: nuova voce sopra le
+altre) l'indice viene aggiornato in modo incrementale: si analizza solo la
+parte nuova e il resto (dal primo titolo di versione salvato in poi) si
+riconosce da lunghezza e hash: i suoi primi WINDOW byte scartano subito quasi
+tutte le code cambiate (e l'analisi continua sullo stesso flusso, senza una
+seconda lettura), poi l'hash di tutta la coda conferma il riuso. Solo se la
+coda differisce più in basso, a parità di lunghezza e di finestra, il blob
+viene riletto da capo. Il blob viene sempre letto a blocchi, mai tutto in
+memoria. Le ultime MAX_ENTRIES versioni sono tenute per ogni CHANGELOG (una
+per app), così le app non si tolgono le voci a vicenda.
+"""
+import hashlib
+import json
+import os
+import re
+from typing import NamedTuple, Optional
+
+import staged_blobs
+import tracing
+from git_state import cache_dir, get_staged_blob
+from staged_blobs import stream_blob
+
+CHANGELOG_FILE = "CHANGELOG.md"
+
+INDEX_FILE = "changelog-index.json"
+# Voci dell'indice per ogni CHANGELOG
+MAX_ENTRIES = 4
+# Byte iniziali della coda confrontati prima dell'hash completo
+WINDOW = 4 * 1024
+
+HEADING_RE = re.compile(rb"^#{1,6}[ \t]+([^\r\n]*?)[ \t#]*\r?$", re.M)
+TOKEN_RE = re.compile(r"[0-9A-Za-z][0-9A-Za-z._+-]*")
+
+class Heading(NamedTuple):
+    offset: int
+    title: str
+
+def version_tokens(title: str) -> set[str]:
+    """Token "interi" di un titolo: `## [v1.3.0] - 2024-05-02` -> {1.3.0, 2024-05-02}."""
+    tokens = set()
+    for token in TOKEN_RE.findall(title):
+        token = token.rstrip("._+-")
+        if token[:1] in ("v", "V") and token[1:2].isdigit():
+            token = token[1:]
+        tokens.add(token)
+    return tokens
+
+def _is_version_heading(title: str) -> bool:
+    return any(c.isdigit() for c in title)
+
+class _Scanner:
+    """Trova i titoli di versione in un flusso di blocchi, con il loro offset."""
+
+    def __init__(self):
+        self.offset = 0
+        self.pending = b""
+        self.headings: list[list] = []
+        self.first: Optional[int] = None
+        # I primi WINDOW byte e l'hash del contenuto dal primo titolo di versione in poi
+        self.window = b""
+        self.tail = hashlib.sha256()
+
+    def feed(self, data: bytes, final: bool = False):
+        buf = self.pending + data
+        end = len(buf) if final else buf.rfind(b"\n") + 1
+        complete = buf[:end]
+        if self.first is not None:
+            self.tail.update(complete)
+            if len(self.window) < WINDOW:
+                self.window += complete[:WINDOW - len(self.window)]
+        for m in HEADING_RE.finditer(complete):
+            title = m.group(1).decode("utf-8", "replace").strip()
+            if not _is_version_heading(title):
+                continue
+            if self.first is None:
+                self.first = self.offset + m.start()
+                self.window = complete[m.start():m.start() + WINDOW]
+                self.tail.update(complete[m.start():])
+            self.headings.append([self.offset + m.start(), title])
+        self.pending = buf[end:]
+        self.offset += end
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _entry(size: int, headings: list, first: Optional[int], window: bytes, tail: str) -> dict:
+    return {"size": size, "first": first, "window": _digest(window), "tail": tail, "headings": headings}
+
+def _index(rel: str, previous: Optional[dict]) -> tuple[str, dict]:
+    """
+    Indicizza il blob staged di `rel`. Se il nuovo blob finisce con la stessa
+    "coda" di `previous` (dal primo titolo di versione in poi: stessa
+    lunghezza, stessa finestra iniziale, stesso hash) analizza solo i byte
+    prima e riusa i titoli di `previous`. Se la finestra non corrisponde
+    prosegue l'analisi sullo stesso flusso; se differisce solo l'hash della
+    coda completa, rilegge il blob da capo.
+    """
+    sha, size, chunks = stream_blob(rel)
+    scanner = _Scanner()
+
+    # "head": prima della coda, "check": finestra della coda in arrivo,
+    # "skip": coda riconosciuta (i blocchi vengono solo scartati), "scan": da capo
+    state = "scan"
+    split = -1
+    if previous is not None and previous["first"] is not None and "window" in previous and "tail" in previous:
+        split = size - (previous["size"] - previous["first"])
+        if split >= 0:
+            state = "head" if split > 0 else "check"
+    held = b""
+    pos = 0
+    # Hash della sola coda di `previous`, per confermarne il riuso
+    tail = hashlib.sha256()
+
+    def skip(data: bytes):
+        tail.update(data)
+        if scanner.first is not None:
+            scanner.tail.update(data)
+
+    def check():
+        nonlocal state
+        if _digest(held[:WINDOW]) == previous["window"]:
+            state = "skip"
+            skip(held)
+        else:
+            state = "scan"
+            scanner.feed(held)
+
+    for chunk in chunks:
+        if state == "head":
+            head = chunk[:split - pos]
+            scanner.feed(head)
+            pos += len(head)
+            chunk = chunk[len(head):]
+            if pos == split:
+                # La coda deve iniziare a inizio riga
+                state = "check" if not scanner.pending else "scan"
+        if state == "check":
+            held += chunk
+            if len(held) >= WINDOW:
+                check()
+        elif state == "skip":
+            skip(chunk)
+        elif state == "scan":
+            scanner.feed(chunk)
+    if state == "check":
+        check()
+
+    if state == "skip":
+        if tail.hexdigest() != previous["tail"]:
+            # Coda cambiata più in basso della finestra: indice da capo
+            return _index(rel, None)
+        shift = split - previous["first"]
+        headings = scanner.headings + [[offset + shift, title] for offset, title in previous["headings"]]
+        if scanner.first is None:
+            return sha, _entry(size, headings, split, held[:WINDOW], previous["tail"])
+        return sha, _entry(size, headings, scanner.first, (scanner.window + held)[:WINDOW],
+                           scanner.tail.hexdigest())
+
+    scanner.feed(b"", final=True)
+    return sha, _entry(size, scanner.headings, scanner.first, scanner.window, scanner.tail.hexdigest())
+
+def _load() -> dict:
+    try:
+        return json.loads((cache_dir() / INDEX_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _save(entries: dict):
+    path = cache_dir() / INDEX_FILE
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(entries), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+@tracing.traced("changelog index")
+def staged_headings(rel: str = CHANGELOG_FILE) -> list[Heading]:
+    """
+    Titoli di versione del CHANGELOG staged, dall'alto verso il basso.
+    FileNotFoundError se il file non è nell'index.
+    """
+    # Un CHANGELOG alla volta (più app in parallelo): il blob si legge a
+    # blocchi da cat-file e l'indice su disco è condiviso
+    with staged_blobs.lock:
+        return _staged_headings(rel)
+
+def _staged_headings(rel: str) -> list[Heading]:
+    entries = _load()
+    sha = get_staged_blob(rel)
+    if sha and f"{rel}:{sha}" in entries:
+        return [Heading(*h) for h in entries[f"{rel}:{sha}"]["headings"]]
+
+    previous = next(
+        (entries[key] for key in reversed(list(entries)) if key.rsplit(":", 1)[0] == rel),
+        None,
+    )
+    sha, entry = _index(rel, previous)
+
+    entries.pop(f"{rel}:{sha}", None)
+    entries[f"{rel}:{sha}"] = entry
+    # Limite per CHANGELOG: con più app ognuna tiene le sue voci
+    own = [key for key in entries if key.rsplit(":", 1)[0] == rel]
+    for key in own[:-MAX_ENTRIES]:
+        del entries[key]
+    _save(entries)
+    return [Heading(*h) for h in entry["headings"]]
+
+def find_version(version: str, rel: str = CHANGELOG_FILE) -> Optional[tuple[int, Heading]]:
+    """(posizione, titolo) della voce per `version` (0 = la prima), None se manca."""
+    for position, heading in enumerate(staged_headings(rel)):
+        if version in version_tokens(heading.title):
+            return position, heading
+    return None
@@ -1,40 +1,53 @@
 #!/usr/bin/env python3
-import re
-import subprocess
 import sys
 from pathlib import Path
-from typing import Optional
 
-ROOT = Path(__file__).resolve().parents[1]
-ROUTE = ROOT / "www/js/route.js"
-CONFIG = ROOT / "config.xml"
+import apps
+from git_state import get_branch, get_staged_files
+from versions import CONFIG_FILE, ROUTE_FILE, staged_version
 
+# Path relativi alla cartella dell'app
 VERSION_FILES = {
     "www/js/route.js",
     "config.xml",
     "CHANGELOG.md",
 }
 
-def get_branch_name() -> str:
-    return subprocess.check_output(
-        ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-        text=True,
-    ).strip()
+def check_app(app: apps.App, report: apps.Report, commit_msg: str) -> int:
+    route = app.rel(ROUTE_FILE)
+    config = app.rel(CONFIG_FILE)
 
-def get_staged_files() -> set[str]:
-    out = subprocess.check_output(
-        ["git", "diff", "--cached", "--name-only"],
-        text=True,
-    )
-    return {line.strip().replace("\\", "/") for line in out.splitlines() if line.strip()}
+    # Leggiamo la versione STAGED (quella che finisce nel commit)
+    try:
+        v_route = staged_version(route)
+    except FileNotFoundError:
+        report.err(f"✗ {route} non trovato")
+        return 1
 
-def get_version_route(text: str) -> Optional[str]:
-    m = re.search(r'FCIC_CONFIG\.VERSION\s*=\s*"([^"]+)"', text)
-    return m.group(1) if m else None
+    try:
+        v_config = staged_version(config)
+    except FileNotFoundError:
+        report.err(f"✗ {config} non trovato")
+        return 1
 
-def get_version_config(text: str) -> Optional[str]:
-    m = re.search(r'<widget[^>]*\bversion="([^"]+)"', text)
-    return m.group(1) if m else None
+    if not v_route:
+        report.err(f"✗ FCIC_CONFIG.VERSION non trovata in {route}")
+        return 1
+    if not v_config:
+        report.err(f"✗ attributo version non trovato in {config}")
+        return 1
+    if v_route != v_config:
+        report.err("✗ Versioni non coerenti tra route.js e config.xml, commit message check abortito")
+        return 1
+
+    if v_route not in commit_msg:
+        report.err(f"✗ Il messaggio di commit non contiene la versione {v_route}")
+        report.err("  Suggerimento: includi la versione nel commit, ad esempio:")
+        report.err(f"    \"release android {v_route}\"")
+        return 1
+
+    report.out(f"✓ Commit message contiene la versione {v_route}")
+    return 0
 
 def main() -> int:
     # Il path al file con il messaggio di commit è il primo argomento
@@ -44,45 +57,19 @@ def main() -> int:
 
     commit_msg_path = Path(sys.argv[1])
 
-    branch = get_branch_name()
+    branch = get_branch()
 
     # Esegui solo sui branch di release
     if not branch.startswith("release/"):
         print(f"Skipping commit message version check on non-release branch: {branch}")
         return 0
 
-    # Esegui il controllo solo se nel commit ci sono i file di versione/changelog
-    staged = get_staged_files()
-    if not staged.intersection(VERSION_FILES):
+    # Esegui il controllo solo per le app con file di versione/changelog nel commit
+    affected = apps.affected(get_staged_files(), VERSION_FILES)
+    if not affected:
         print("Skipping commit message version check (no version/changelog files in commit)")
         return 0
 
-    # Leggi versione da route/config
-    try:
-        route_text = ROUTE.read_text(encoding="utf-8")
-    except FileNotFoundError:
-        print("✗ www/js/route.js non trovato", file=sys.stderr)
-        return 1
-
-    try:
-        config_text = CONFIG.read_text(encoding="utf-8")
-    except FileNotFoundError:
-        print("✗ config.xml non trovato", file=sys.stderr)
-        return 1
-
-    v_route = get_version_route(route_text)
-    v_config = get_version_config(config_text)
-
-    if not v_route:
-        print("✗ FCIC_CONFIG.VERSION non trovata in www/js/route.js", file=sys.stderr)
-        return 1
-    if not v_config:
-        print("✗ attributo version non trovato in config.xml", file=sys.stderr)
-        return 1
-    if v_route != v_config:
-        print("✗ Versioni non coerenti tra route.js e config.xml, commit message check abortito", file=sys.stderr)
-        return 1
-
     # Leggi messaggio di commit
     try:
         commit_msg = commit_msg_path.read_text(encoding="utf-8")
@@ -90,14 +77,7 @@ def main() -> int:
         print(f"✗ File commit message non trovato: {commit_msg_path}", file=sys.stderr)
         return 1
 
-    if v_route not in commit_msg:
-        print(f"✗ Il messaggio di commit non contiene la versione {v_route}", file=sys.stderr)
-        print("  Suggerimento: includi la versione nel commit, ad esempio:", file=sys.stderr)
-        print(f"    \"release android {v_route}\"", file=sys.stderr)
-        return 1
-
-    print(f"✓ Commit message contiene la versione {v_route}")
-    return 0
+    return apps.run_checks(lambda app, report: check_app(app, report, commit_msg), affected)
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -1,102 +1,80 @@
 #!/usr/bin/env python3
-import re
-import subprocess
-import sys
-from pathlib import Path
-from typing import Optional
-
-ROOT = Path(__file__).resolve().parents[1]
-ROUTE = ROOT / "www/js/route.js"
-CONFIG = ROOT / "config.xml"
-CHANGELOG = ROOT / "CHANGELOG.md"
-
-def get_branch_name() -> str:
-    return subprocess.check_output(
-        ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-        text=True,
-    ).strip()
-
-def file_is_staged(path: Path) -> bool:
-    rel = path.relative_to(ROOT).as_posix()
-    out = subprocess.check_output(
-        ["git", "diff", "--cached", "--name-only"],
-        text=True,
-    )
-    for line in out.splitlines():
-        if line.strip().replace("\\", "/") == rel:
-            return True
-    return False
-
-def get_version_route(text: str) -> Optional[str]:
-    m = re.search(r'FCIC_CONFIG\.VERSION\s*=\s*"([^"]+)"', text)
-    return m.group(1) if m else None
-
-def get_version_config(text: str) -> Optional[str]:
-    m = re.search(r'<widget[^>]*\bversion="([^"]+)"', text)
-    return m.group(1) if m else None
+import apps
+from changelog_index import CHANGELOG_FILE, find_version
+from git_state import get_branch, get_staged_files
+from versions import CONFIG_FILE, ROUTE_FILE, staged_version
 
-def main() -> int:
-    route_staged = file_is_staged(ROUTE)
-    config_staged = file_is_staged(CONFIG)
-
-    # Se nessuno dei due è nello staged, non c'è niente da controllare
-    if not (route_staged or config_staged):
-        print("✓ Version consistency check skipped (version files not staged)")
-        return 0
+def check_app(app: apps.App, report: apps.Report) -> int:
+    route = app.rel(ROUTE_FILE)
+    config = app.rel(CONFIG_FILE)
+    changelog = app.rel(CHANGELOG_FILE)
 
+    # Leggiamo la versione STAGED (quella che finisce nel commit)
     try:
-        route_text = ROUTE.read_text(encoding="utf-8")
+        v_route = staged_version(route)
     except FileNotFoundError:
-        print("✗ www/js/route.js non trovato", file=sys.stderr)
+        report.err(f"✗ {route} non trovato")
         return 1
 
     try:
-        config_text = CONFIG.read_text(encoding="utf-8")
+        v_config = staged_version(config)
     except FileNotFoundError:
-        print("✗ config.xml non trovato", file=sys.stderr)
+        report.err(f"✗ {config} non trovato")
         return 1
 
-    v_route = get_version_route(route_text)
-    v_config = get_version_config(config_text)
-
     if not v_route:
-        print("✗ FCIC_CONFIG.VERSION non trovata in www/js/route.js", file=sys.stderr)
+        report.err(f"✗ FCIC_CONFIG.VERSION non trovata in {route}")
         return 1
     if not v_config:
-        print("✗ attributo version non trovato in config.xml", file=sys.stderr)
+        report.err(f"✗ attributo version non trovato in {config}")
         return 1
 
     if v_route != v_config:
-        print("✗ Versioni non coerenti:", file=sys.stderr)
-        print("  - route.js :", v_route, file=sys.stderr)
-        print("  - config.xml:", v_config, file=sys.stderr)
+        report.err("✗ Versioni non coerenti:")
+        report.err("  - route.js :", v_route)
+        report.err("  - config.xml:", v_config)
         return 1
 
-    print("✓ Versioni coerenti ({}) tra route.js e config.xml".format(v_route))
+    report.out("✓ Versioni coerenti ({}) tra route.js e config.xml".format(v_route))
 
     # --- Nuovo controllo: versione presente nel CHANGELOG ---
     try:
-        changelog_text = CHANGELOG.read_text(encoding="utf-8")
+        entry = find_version(v_route, changelog)
     except FileNotFoundError:
-        print("✗ CHANGELOG.md non trovato", file=sys.stderr)
+        report.err(f"✗ {changelog} non trovato")
         return 1
 
-    if v_route not in changelog_text:
-        print(f"✗ CHANGELOG.md non contiene la versione {v_route}", file=sys.stderr)
+    if entry is None:
+        report.err(f"✗ {changelog} non contiene un titolo per la versione {v_route}")
+        report.err(f"  Suggerimento: aggiungi in cima una voce come \"## {v_route}\"")
         return 1
 
-    print(f"✓ CHANGELOG contiene la versione {v_route}")
-    
+    position, heading = entry
+    report.out(f"✓ CHANGELOG contiene la versione {v_route}")
+    if position > 0:
+        report.out(f"⚠ La voce \"{heading.title}\" non è la prima del CHANGELOG")
+
     # --- Nuovo controllo: versione nel nome del branch ---
-    branch = get_branch_name()
+    branch = get_branch()
 
     if v_route not in branch:
-        print(f"✗ Il nome del branch '{branch}' non contiene la versione {v_route}", file=sys.stderr)
+        report.err(f"✗ Il nome del branch '{branch}' non contiene la versione {v_route}")
         return 1
 
-    print(f"✓ Il branch '{branch}' contiene la versione {v_route}")
+    report.out(f"✓ Il branch '{branch}' contiene la versione {v_route}")
 
     return 0
 
+def main() -> int:
+    # Solo le app con route.js o config.xml nello staged
+    affected = apps.affected(get_staged_files(), (ROUTE_FILE, CONFIG_FILE))
+
+    # Se nessuno dei due è nello staged, non c'è niente da controllare
+    if not affected:
+        print("✓ Version consistency check skipped (version files not staged)")
+        return 0
+
+    return apps.run_checks(check_app, affected)
+
 if __name__ == "__main__":
     raise SystemExit(main())
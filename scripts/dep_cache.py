@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Cache locale di node_modules/ e plugins/, per non reinstallare tutto a ogni
+`cordova platform add` dopo la clean.
+
+Chiave: package-lock.json (o package.json se manca il lock) + `node --version`
++ piattaforma Cordova + plugin dichiarati in config.xml. Ogni voce è un
+archivio tar.gz in .git/git-hooks-cordova/dep-cache/ con accanto un manifest
+JSON (SHA-256 e dimensione dell'archivio): prima del ripristino l'archivio viene
+verificato e, se non corrisponde, scartato. Eviction LRU sulla dimensione
+totale (HOOKS_CORDOVA_DEP_CACHE_MAX_MB, default 2048).
+HOOKS_CORDOVA_NO_DEP_CACHE=1 per disattivarla.
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tarfile
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import platform_state
+import tracing
+from git_state import cache_dir
+
+DIRS = ["node_modules", "plugins"]
+
+MAX_BYTES = int(os.environ.get("HOOKS_CORDOVA_DEP_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+_node_version: Optional[str] = None
+
+def enabled() -> bool:
+    return os.environ.get("HOOKS_CORDOVA_NO_DEP_CACHE", "") in {"", "0"}
+
+def cache_root() -> Path:
+    return cache_dir() / "dep-cache"
+
+def node_version() -> Optional[str]:
+    global _node_version
+    if _node_version is None:
+        try:
+            _node_version = subprocess.check_output(
+                ["node", "--version"],
+                text=True,
+                stderr=subprocess.DEVNULL,
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            _node_version = ""
+    return _node_version or None
+
+def _digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def dep_key(root: Path, platform_spec: str) -> Optional[str]:
+    """Chiave delle dipendenze del progetto in `root`, None se non determinabile."""
+    node = node_version()
+    lock = root / "package-lock.json"
+    if not lock.exists():
+        lock = root / "package.json"
+    if node is None or not lock.exists():
+        return None
+    data = {
+        "lock": _digest(lock),
+        "node": node,
+        "platform": platform_spec,
+        "plugins": platform_state.config_plugins(root),
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _paths(key: str) -> tuple[Path, Path]:
+    return cache_root() / f"{key}.tar.gz", cache_root() / f"{key}.json"
+
+def discard(key: str):
+    for path in _paths(key):
+        path.unlink(missing_ok=True)
+
+@tracing.traced("dep-cache restore", "fs")
+def restore(root: Path, key: str) -> bool:
+    """
+    Ripristina node_modules/ e plugins/ in `root` (che non devono esistere).
+    False se la voce manca o non supera la verifica di integrità.
+    """
+    archive, manifest_path = _paths(key)
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    if not archive.exists() or archive.stat().st_size != manifest.get("size") or _digest(archive) != manifest.get("sha256"):
+        print(f"⚠ Cache dipendenze {key[:12]} corrotta: la scarto")
+        discard(key)
+        return False
+
+    kwargs = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+    try:
+        with tarfile.open(archive, "r:gz") as tar:
+            tar.extractall(root, **kwargs)
+    except (OSError, tarfile.TarError) as e:
+        print(f"⚠ Ripristino dipendenze fallito ({e}): reinstallo")
+        for name in DIRS:
+            shutil.rmtree(root / name, ignore_errors=True)
+        discard(key)
+        return False
+
+    os.utime(manifest_path)
+    return True
+
+@tracing.traced("dep-cache store", "fs")
+def store(root: Path, key: str):
+    """Salva node_modules/ e plugins/ di `root` sotto `key` (se non c'è già)."""
+    archive, manifest_path = _paths(key)
+    if manifest_path.exists():
+        return
+    present = [name for name in DIRS if (root / name).exists()]
+    if "node_modules" not in present:
+        return
+
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    # Nome univoco anche tra thread dello stesso processo (varianti in parallelo)
+    tmp = archive.with_name(f".{archive.name}.{uuid.uuid4().hex}.tmp")
+    # compresslevel basso: conta più la velocità che lo spazio
+    with tarfile.open(tmp, "w:gz", compresslevel=1) as tar:
+        for name in present:
+            tar.add(root / name, arcname=name)
+
+    manifest = {
+        "created": time.time(),
+        "node": node_version(),
+        "dirs": present,
+        "size": tmp.stat().st_size,
+        "sha256": _digest(tmp),
+    }
+    os.replace(tmp, archive)
+    manifest_tmp = manifest_path.with_name(f".{manifest_path.name}.{uuid.uuid4().hex}.tmp")
+    manifest_tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(manifest_tmp, manifest_path)
+    evict()
+
+def before_platform_add(root: Path, platform_spec: str, refresh: bool = False) -> Optional[str]:
+    """
+    Da chiamare dopo la clean e prima di `cordova platform add`: ripristina
+    node_modules/ e plugins/ se la cache li ha (con refresh=True la voce viene
+    invece scartata e ricreata). Ritorna la chiave da passare a store() dopo
+    l'add, None se non c'è nulla da salvare.
+    """
+    if not enabled():
+        return None
+    key = dep_key(root, platform_spec)
+    if key is None:
+        return None
+    if refresh:
+        discard(key)
+    elif restore(root, key):
+        print(f"✔ [{root.name}] node_modules e plugins ripristinati dalla cache dipendenze ({key[:12]})")
+        return None
+    return key
+
+def evict():
+    """Elimina le voci usate meno di recente finché la cache supera MAX_BYTES."""
+    entries = []
+    for manifest_path in cache_root().glob("*.json"):
+        archive = manifest_path.with_suffix(".tar.gz")
+        if not archive.exists():
+            manifest_path.unlink(missing_ok=True)
+            continue
+        entries.append((manifest_path.stat().st_mtime, archive.stat().st_size, manifest_path.stem))
+
+    entries.sort(reverse=True)
+    total = 0
+    for _, size, key in entries:
+        total += size
+        if total > MAX_BYTES:
+            discard(key)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Snapshot condiviso dello stato git (branch, file staged, blob SHA, tree dell'index).
+
+Tutti gli script in scripts/ leggono da qui invece di lanciare ognuno i propri
+`git rev-parse` / `git diff --cached`. Lo snapshot viene calcolato una sola volta
+per processo e salvato in .git/git-hooks-cordova/state.json, indicizzato
+dall'hash del tree dell'index (+ HEAD), così anche gli hook lanciati in processi
+separati (pre-commit, commit-msg) riusano lo stesso risultato.
+"""
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional
+
+import tracing
+
+# repo-cliente/tools/git-hooks-cordova/scripts/git_state.py -> repo-cliente/
+ROOT = Path(__file__).resolve().parents[3]
+
+STATE_FILE = "state.json"
+
+_snapshot: Optional[dict] = None
+# Letto anche dai controlli delle app, in thread diversi
+_lock = threading.Lock()
+
+def _git(*args: str) -> str:
+    with tracing.span(f"git {args[0]}", "git"):
+        return subprocess.check_output(["git", *args], text=True)
+
+def _read_refs() -> tuple[str, str, str]:
+    """Ritorna (git common dir, sha di HEAD, nome branch) con una sola chiamata git."""
+    try:
+        out = _git("rev-parse", "--git-common-dir", "HEAD", "--abbrev-ref", "HEAD")
+        git_dir, head, branch = out.splitlines()[:3]
+    except subprocess.CalledProcessError:
+        # Primo commit della repo: HEAD non punta ancora a nessun commit
+        git_dir = _git("rev-parse", "--git-common-dir").strip()
+        head = ""
+        branch = _git("symbolic-ref", "--short", "HEAD").strip()
+    return str(Path(git_dir).resolve()), head.strip(), branch.strip()
+
+def _write_tree() -> Optional[str]:
+    try:
+        with tracing.span("git write-tree", "git"):
+            return subprocess.check_output(
+                ["git", "write-tree"],
+                text=True,
+                stderr=subprocess.DEVNULL,
+            ).strip()
+    except subprocess.CalledProcessError:
+        # Index con conflitti non risolti: niente tree, niente persistenza
+        return None
+
+def _read_staged() -> dict[str, str]:
+    """
+    Path staged -> blob SHA nell'index ("" se il file è stato cancellato).
+    Un solo `git diff --cached --raw`, al posto dei vari --name-only.
+    """
+    out = _git("diff", "--cached", "--raw", "-z", "--no-abbrev")
+    fields = out.split("\0")
+    staged = {}
+    i = 0
+    while i < len(fields) - 1:
+        meta = fields[i].split()
+        status = meta[4]
+        # Rename/copy: due path, conta quello di destinazione (come --name-only)
+        if status[0] in {"R", "C"}:
+            path = fields[i + 2]
+            i += 3
+        else:
+            path = fields[i + 1]
+            i += 2
+        blob = meta[3]
+        staged[path.replace("\\", "/")] = "" if set(blob) == {"0"} else blob
+    return staged
+
+def _load_persisted(path: Path, head: str, tree: str) -> Optional[dict]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if data.get("tree") != tree or data.get("head") != head:
+        return None
+    return data
+
+def _persist(path: Path, data: dict):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        # La cache è solo un'ottimizzazione: non blocchiamo il commit
+        pass
+
+def get_snapshot() -> dict:
+    if _snapshot is not None:
+        return _snapshot
+    with _lock:
+        return _snapshot if _snapshot is not None else _take_snapshot()
+
+def _take_snapshot() -> dict:
+    global _snapshot
+    git_dir, head, branch = _read_refs()
+    tree = _write_tree()
+    state_path = Path(git_dir) / "git-hooks-cordova" / STATE_FILE
+
+    data = _load_persisted(state_path, head, tree) if tree else None
+    if data is None:
+        data = {
+            "head": head,
+            "tree": tree,
+            "staged": _read_staged(),
+        }
+        if tree:
+            _persist(state_path, data)
+
+    # Il branch non fa parte della chiave: lo prendiamo sempre fresco
+    data["branch"] = branch
+    data["git_dir"] = git_dir
+    _snapshot = data
+    return _snapshot
+
+def reset():
+    """Dimentica lo snapshot in memoria (il prossimo accesso lo ricalcola)."""
+    global _snapshot
+    _snapshot = None
+
+def cache_dir() -> Path:
+    """Cartella locale per le cache degli hook (dentro .git, quindi mai committata)."""
+    return Path(get_snapshot()["git_dir"]) / "git-hooks-cordova"
+
+def get_branch() -> str:
+    return get_snapshot()["branch"]
+
+def get_index_tree() -> Optional[str]:
+    return get_snapshot()["tree"]
+
+def get_staged_files() -> set[str]:
+    return set(get_snapshot()["staged"])
+
+def is_staged(rel: str) -> bool:
+    return rel in get_snapshot()["staged"]
+
+def get_staged_blob(rel: str) -> Optional[str]:
+    """SHA del blob staged per `rel`, None se non è nello staged o è stato cancellato."""
+    return get_snapshot()["staged"].get(rel) or None
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Client del daemon degli hook (vedi hook_daemon.py), lanciato dai wrapper
+pre-commit / commit-msg con `python -S` per avviarsi il prima possibile: solo
+libreria standard, niente import degli script di controllo.
+
+Manda al daemon gli argomenti del runner e stampa la sua risposta. Se il daemon
+non risponde o chiede di ripiegare (index temporaneo di `git commit -a`,
+worktree diverso, script aggiornati, ...) esegue direttamente run_hooks.py con
+gli stessi argomenti. Se il socket è rimasto ma il daemon non c'è più (es. dopo
+un riavvio) lo rilancia in background per i commit successivi.
+"""
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+RUN_HOOKS = os.path.join(SCRIPTS_DIR, "run_hooks.py")
+DAEMON = os.path.join(SCRIPTS_DIR, "hook_daemon.py")
+
+CONNECT_TIMEOUT = 0.5
+REPLY_TIMEOUT = float(os.environ.get("HOOKS_CORDOVA_DAEMON_TIMEOUT", "30"))
+
+# Variabili d'ambiente che cambiano il comportamento degli hook
+ENV_PREFIXES = ("HOOKS_CORDOVA_", "PRE_COMMIT_")
+
+@contextlib.contextmanager
+def _in_dir(path: str):
+    # Connessione con path relativo: i path dei socket Unix hanno un limite
+    # di ~100 caratteri, la cartella .git di un progetto può superarlo
+    old = os.getcwd()
+    os.chdir(path or ".")
+    try:
+        yield
+    finally:
+        os.chdir(old)
+
+def send(socket_path: str, message: dict, timeout: float = REPLY_TIMEOUT) -> dict:
+    """Una richiesta JSON (una riga) e la sua risposta. OSError se il daemon non c'è."""
+    directory, name = os.path.split(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT)
+        with _in_dir(directory):
+            sock.connect(name)
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionResetError("il daemon ha chiuso la connessione")
+    return json.loads(line)
+
+def respawn(socket_path: str):
+    """Rilancia il daemon staccato dal terminale (non aspettiamo che sia pronto)."""
+    log = os.path.join(os.path.dirname(socket_path), "daemon.log")
+    env = {k: v for k, v in os.environ.items() if not k.startswith("GIT_")}
+    try:
+        with open(log, "ab") as out:
+            subprocess.Popen(
+                [sys.executable, DAEMON, "serve"],
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=out,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+    except OSError:
+        pass
+
+def fallback(runner_args: list[str]):
+    sys.stdout.flush()
+    os.execv(sys.executable, [sys.executable, RUN_HOOKS, *runner_args])
+
+def main() -> int:
+    args = sys.argv[1:]
+    try:
+        i = args.index("--socket")
+    except ValueError:
+        fallback(args)
+    socket_path = args[i + 1]
+    runner_args = args[:i] + args[i + 2:]
+
+    message = {
+        "cmd": "run",
+        "argv": runner_args,
+        "cwd": os.getcwd(),
+        "index": os.environ.get("GIT_INDEX_FILE"),
+        "env": {k: v for k, v in os.environ.items() if k.startswith(ENV_PREFIXES)},
+    }
+    try:
+        reply = send(socket_path, message)
+    except (ConnectionRefusedError, FileNotFoundError):
+        respawn(socket_path)
+        fallback(runner_args)
+    except (OSError, ValueError):
+        fallback(runner_args)
+
+    if "code" not in reply:
+        fallback(runner_args)
+    sys.stdout.write(reply.get("output", ""))
+    sys.stdout.flush()
+    return reply["code"]
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Daemon degli hook: un processo Python che resta attivo con gli script di
+controllo già importati e lo stato git già calcolato, e risponde ai wrapper
+pre-commit / commit-msg su un socket Unix (.git/git-hooks-cordova/daemon.sock).
+
+- Un thread controlla ogni POLL_INTERVAL secondi (e a ogni richiesta)
+  .git/index, .git/HEAD, il ref del branch corrente, .git/packed-refs, i file
+  di versione di tutte le app e apps.json; quando cambiano dimentica lo stato (git_state, versioni, diff,
+  `cat-file --batch`) e lo ricalcola subito: branch, file staged, versioni
+  staged e indice del CHANGELOG sono pronti prima del commit.
+- Le richieste vengono eseguite una alla volta con run_hooks.run_stage, con
+  le variabili HOOKS_CORDOVA_* / PRE_COMMIT_* del client.
+- Il client (hook_client.py) ripiega sull'esecuzione diretta quando il daemon
+  non può rispondere in modo affidabile: index temporaneo (`git commit -a`,
+  `git commit <path>`), altro worktree, stage diversi da pre-commit/commit-msg,
+  hook che non sono script di scripts/. Se cambiano gli script o la config il
+  daemon risponde "ripiega" e si riavvia con il codice nuovo.
+
+Avviato da setup_hooks.py e fermato da disable_hooks.py; si chiude da solo dopo
+HOOKS_CORDOVA_DAEMON_IDLE_HOURS ore senza richieste (default 12).
+`python hook_daemon.py start|stop|status`. Solo macOS / Linux.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Optional
+
+import apps
+import changelog_index
+import git_state
+import push_state
+import run_hooks
+import staged_blobs
+import tracing
+import version_diff
+import versions
+import workspace
+from git_state import ROOT, cache_dir
+from hook_client import ENV_PREFIXES, _in_dir, send
+
+SOCKET_NAME = "daemon.sock"
+PID_FILE = "daemon.pid"
+LOG_FILE = "daemon.log"
+
+POLL_INTERVAL = 0.2
+IDLE_TIMEOUT = float(os.environ.get("HOOKS_CORDOVA_DAEMON_IDLE_HOURS", "12")) * 3600
+START_TIMEOUT = 5.0
+
+DAEMON_STAGES = {"pre-commit", "commit-msg"}
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+def supported() -> bool:
+    return sys.platform != "win32" and hasattr(socket, "AF_UNIX")
+
+def socket_path() -> Path:
+    return cache_dir() / SOCKET_NAME
+
+def _stat_key(path: Path) -> Optional[tuple]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def code_signature(config: Path) -> tuple:
+    """Script e config: se cambiano, il daemon va riavviato."""
+    paths = sorted(SCRIPTS_DIR.glob("*.py")) + [config]
+    return tuple((p.name, _stat_key(p)) for p in paths)
+
+def reset_state():
+    """Dimentica tutto ciò che dipende dall'index o dal branch."""
+    git_state.reset()
+    push_state.reset()
+    version_diff.reset()
+    apps.reset()
+    # cat-file --batch legge l'index una volta sola, all'avvio
+    staged_blobs.close()
+
+def warm():
+    """Precalcola lo stato usato dai controlli (come farebbe il primo hook)."""
+    git_state.get_snapshot()
+    version_diff.version_changes()
+    for rel in apps.version_paths(versions.VERSION_FILES):
+        if git_state.is_staged(rel):
+            versions.staged_version(rel)
+    for rel in apps.version_paths([changelog_index.CHANGELOG_FILE]):
+        if git_state.get_staged_blob(rel):
+            changelog_index.staged_headings(rel)
+
+@contextlib.contextmanager
+def request_env(env: dict):
+    """Le variabili HOOKS_CORDOVA_* / PRE_COMMIT_* del client, solo per la richiesta."""
+    saved = {k: v for k, v in os.environ.items() if k.startswith(ENV_PREFIXES)}
+    for key in saved:
+        del os.environ[key]
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for key in [k for k in os.environ if k.startswith(ENV_PREFIXES)]:
+            del os.environ[key]
+        os.environ.update(saved)
+
+class Daemon:
+    def __init__(self, config_path: Path):
+        self.config_path = config_path
+        self.config = run_hooks.load_config(config_path)
+        self.code = code_signature(config_path)
+        self.git_dir = Path(git_state.get_snapshot()["git_dir"])
+        self.lock = threading.Lock()
+        self.signature: Optional[tuple] = None
+        self.started = time.time()
+        self.last_request = time.time()
+        self.requests = 0
+        self.restart = False
+        self.stopping = False
+
+    def branch_ref(self) -> Optional[Path]:
+        """File del ref del branch corrente (refs/heads/...), None con HEAD staccato."""
+        try:
+            head = (self.git_dir / "HEAD").read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        if not head.startswith("ref: "):
+            return None
+        return self.git_dir / head[len("ref: "):]
+
+    def watched(self) -> list[Path]:
+        # Un commit o un `reset --soft` spostano solo il ref del branch (o
+        # packed-refs), senza toccare index e HEAD
+        ref = self.branch_ref()
+        return [
+            self.git_dir / "index",
+            self.git_dir / "HEAD",
+            *([ref] if ref is not None else []),
+            self.git_dir / "packed-refs",
+            apps.APPS_FILE,
+            *(ROOT / rel for rel in apps.version_paths()),
+        ]
+
+    def refresh(self):
+        """Se index / HEAD / file di versione sono cambiati, ricalcola lo stato."""
+        with self.lock:
+            signature = tuple(_stat_key(p) for p in self.watched())
+            if signature == self.signature:
+                return
+            reset_state()
+            self.signature = signature
+            try:
+                warm()
+            except Exception:
+                # Es. repo senza commit: lo stato verrà calcolato dalla richiesta
+                traceback.print_exc()
+                reset_state()
+
+    def watch(self):
+        while not self.stopping:
+            self.refresh()
+            time.sleep(POLL_INTERVAL)
+
+    def fallback_reason(self, message: dict, args) -> Optional[str]:
+        stage = run_hooks.STAGE_ALIASES.get(args.hook_stage, args.hook_stage)
+        if stage not in DAEMON_STAGES:
+            return f"stage {stage}"
+        if Path(message.get("cwd") or "").resolve() != ROOT.resolve():
+            return "altro worktree"
+        index = message.get("index")
+        if index and (Path(message["cwd"]) / index).resolve() != (self.git_dir / "index").resolve():
+            return "index temporaneo"
+        if args.config.resolve() != self.config_path.resolve():
+            return "config diversa"
+        if code_signature(self.config_path) != self.code:
+            self.restart = True
+            return "script aggiornati"
+        for hook in run_hooks.hooks_for_stage(self.config, stage):
+            if run_hooks.resolve_entry(hook["entry"])[0] is None:
+                return f"hook {hook['id']} esterno"
+        return None
+
+    def run(self, message: dict) -> dict:
+        try:
+            args = run_hooks.parse_args(message.get("argv") or [])
+        except SystemExit:
+            return {"fallback": "argomenti"}
+
+        reason = self.fallback_reason(message, args)
+        if reason:
+            print(f"↷ {args.hook_stage}: esecuzione diretta ({reason})", flush=True)
+            return {"fallback": reason}
+
+        stage = run_hooks.STAGE_ALIASES.get(args.hook_stage, args.hook_stage)
+        env = dict(message.get("env") or {})
+        if args.no_cache:
+            env["HOOKS_CORDOVA_NO_CACHE"] = "1"
+
+        self.refresh()
+        with self.lock, request_env(env):
+            tracing.reset_run()
+            tracing.set_run(stage)
+            buf = io.StringIO()
+            with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
+                try:
+                    with tracing.span("daemon request", "daemon"):
+                        code = run_hooks.run_stage(stage, args.commit_msg_filename, self.config)
+                except Exception:
+                    traceback.print_exc()
+                    code = 1
+            tracing.flush()
+        return {"code": code, "output": buf.getvalue()}
+
+    def handle(self, conn: socket.socket):
+        with conn, conn.makefile("rb") as f:
+            try:
+                message = json.loads(f.readline() or b"{}")
+            except ValueError:
+                return
+            cmd = message.get("cmd")
+            if cmd == "run":
+                self.requests += 1
+                self.last_request = time.time()
+                reply = self.run(message)
+            elif cmd == "status":
+                reply = {
+                    "pid": os.getpid(),
+                    "started": self.started,
+                    "requests": self.requests,
+                    "last_request": self.last_request,
+                }
+            elif cmd == "stop":
+                self.stopping = True
+                reply = {"ok": True}
+            else:
+                reply = {"fallback": f"comando {cmd}"}
+            conn.sendall(json.dumps(reply).encode("utf-8") + b"\n")
+
+    def serve(self, server: socket.socket):
+        threading.Thread(target=self.watch, daemon=True).start()
+        server.settimeout(1.0)
+        while not (self.stopping or self.restart):
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                if time.time() - self.last_request > IDLE_TIMEOUT:
+                    print("ℹ Nessuna richiesta da troppo tempo: chiusura", flush=True)
+                    break
+                continue
+            conn.settimeout(None)
+            try:
+                self.handle(conn)
+            except OSError:
+                # Client sparito (timeout, Ctrl+C): niente da rispondere
+                pass
+
+def _bind(path: Path) -> socket.socket:
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with _in_dir(str(path.parent)):
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path.name)
+        server.bind(path.name)
+        # Solo l'utente che ha avviato il daemon può mandare richieste
+        os.chmod(path.name, 0o600)
+    server.listen(16)
+    return server
+
+def serve() -> int:
+    if not supported():
+        return 1
+    try:
+        with workspace.lock("daemon", blocking=False):
+            daemon = Daemon(run_hooks.CONFIG_FILE)
+            path = socket_path()
+            server = _bind(path)
+            pid_file = cache_dir() / PID_FILE
+            pid_file.write_text(str(os.getpid()), encoding="utf-8")
+            signal.signal(signal.SIGTERM, lambda *_: setattr(daemon, "stopping", True))
+            print(f"▶ Daemon {os.getpid()} in ascolto su {path}", flush=True)
+            try:
+                daemon.serve(server)
+            finally:
+                server.close()
+                if not daemon.restart:
+                    path.unlink(missing_ok=True)
+                pid_file.unlink(missing_ok=True)
+                # Gli span del thread di controllo non sono un run da registrare
+                tracing.reset_run()
+    except BlockingIOError:
+        # Un altro daemon è già attivo per questa repo
+        return 0
+
+    if daemon.restart:
+        print("↻ Script aggiornati: riavvio del daemon", flush=True)
+        os.execv(sys.executable, [sys.executable, str(Path(__file__).resolve()), "serve"])
+    return 0
+
+def status() -> Optional[dict]:
+    try:
+        return send(str(socket_path()), {"cmd": "status"}, timeout=2.0)
+    except (OSError, ValueError):
+        return None
+
+def start() -> int:
+    if not supported():
+        print("ℹ Daemon degli hook non disponibile su questa piattaforma: gli hook girano direttamente")
+        return 0
+    info = status()
+    if info:
+        print(f"✔ Daemon degli hook già attivo (pid {info['pid']})")
+        return 0
+
+    log = cache_dir() / LOG_FILE
+    log.parent.mkdir(parents=True, exist_ok=True)
+    env = {k: v for k, v in os.environ.items() if not k.startswith("GIT_")}
+    with log.open("ab") as out:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "serve"],
+            cwd=ROOT,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        info = status()
+        if info:
+            print(f"✔ Daemon degli hook avviato (pid {info['pid']})")
+            return 0
+        time.sleep(0.1)
+    print(f"⚠ Il daemon degli hook non risponde: gli hook gireranno direttamente (log: {log})")
+    return 1
+
+def stop() -> int:
+    path = socket_path()
+    try:
+        send(str(path), {"cmd": "stop"}, timeout=2.0)
+        stopped = True
+    except (OSError, ValueError):
+        stopped = False
+        # Daemon bloccato: proviamo con il pid
+        try:
+            pid = int((cache_dir() / PID_FILE).read_text(encoding="utf-8"))
+            os.kill(pid, signal.SIGTERM)
+            stopped = True
+        except (OSError, ValueError):
+            pass
+    # Senza socket i wrapper non provano più a contattare il daemon
+    path.unlink(missing_ok=True)
+    print("✔ Daemon degli hook fermato" if stopped else "ℹ Daemon degli hook non attivo")
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Daemon degli hook pre-commit / commit-msg")
+    parser.add_argument("command", choices=["start", "stop", "status", "serve"])
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        return serve()
+    if args.command == "start":
+        return start()
+    if args.command == "stop":
+        return stop()
+
+    info = status()
+    if not info:
+        print("ℹ Daemon degli hook non attivo")
+        return 0
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(info["started"]))
+    print(f"✔ Daemon attivo: pid {info['pid']}, avviato {started}, {info['requests']} richieste")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
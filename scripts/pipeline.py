@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Build come sequenza di step con nome, input e output dichiarati, e un journal
+dei checkpoint per riprendere da dove ci si era fermati.
+
+Per ogni step completato il journal (.git/git-hooks-cordova/pipelines/<nome>.json)
+salva l'hash dei suoi input. Al run successivo gli step iniziali con gli stessi
+input e gli output ancora presenti vengono saltati; dal primo step cambiato (o
+mai completato, es. Gradle fallito a metà) si riesegue tutto quello che segue.
+
+Gli step senza input (es. chiudere / aprire Xcode) vengono eseguiti sempre e
+non invalidano quelli successivi. Gli input possono essere un dict o una
+funzione che lo calcola al momento dello step (dopo gli step precedenti).
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple, Union
+
+import tracing
+from git_state import cache_dir
+
+Inputs = Union[dict, Callable[[], dict], None]
+
+class Step(NamedTuple):
+    name: str
+    action: Callable[[], object]
+    inputs: Inputs
+    outputs: tuple[Path, ...]
+
+def files_digest(root: Path, paths: list[str]) -> str:
+    """Hash di path relativo + contenuto di tutti i file sotto `paths` (relativi a `root`)."""
+    h = hashlib.sha256()
+    for rel in paths:
+        base = root / rel
+        if base.is_file():
+            files = [base]
+        elif base.is_dir():
+            files = sorted(p for p in base.rglob("*") if p.is_file())
+        else:
+            continue
+        for path in files:
+            h.update(path.relative_to(root).as_posix().encode("utf-8") + b"\0")
+            with path.open("rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+            h.update(b"\0")
+    return h.hexdigest()
+
+class Pipeline:
+    def __init__(self, name: str):
+        self.name = name
+        self.steps: list[Step] = []
+
+    def add(self, name: str, action: Callable[[], object], inputs: Inputs = None, outputs=()) -> "Pipeline":
+        self.steps.append(Step(name, action, inputs, tuple(outputs)))
+        return self
+
+    @property
+    def journal_path(self) -> Path:
+        return cache_dir() / "pipelines" / f"{self.name}.json"
+
+    def load_journal(self) -> dict:
+        try:
+            return json.loads(self.journal_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, journal: dict):
+        path = self.journal_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(journal, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def run(self, force: bool = False):
+        """
+        Esegue gli step a partire dal primo non più valido (tutti con force=True).
+        Un errore dello step (eccezione o sys.exit) viene registrato e rilanciato.
+        """
+        journal = {} if force else self.load_journal()
+        resuming = True
+
+        for index, step in enumerate(self.steps):
+            inputs = step.inputs() if callable(step.inputs) else step.inputs
+            digest = None
+            if inputs is not None:
+                digest = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+                entry = journal.get(step.name) or {}
+                if (
+                    resuming
+                    and entry.get("status") == "done"
+                    and entry.get("inputs") == digest
+                    and all(p.exists() for p in step.outputs)
+                ):
+                    print(f"✔ [{self.name}] {step.name}: invariato, salto (checkpoint)")
+                    continue
+                # Da qui in poi tutto va rifatto: dimentichiamo i checkpoint successivi
+                resuming = False
+                for later in self.steps[index:]:
+                    journal.pop(later.name, None)
+
+            print(f"▶ [{self.name}] {step.name}", flush=True)
+            started = time.time()
+            try:
+                with tracing.span(f"{self.name}:{step.name}", "pipeline"):
+                    step.action()
+            except BaseException:
+                if digest is not None:
+                    journal[step.name] = {"status": "failed", "finished": time.time()}
+                    self._save(journal)
+                raise
+
+            if digest is not None:
+                journal[step.name] = {
+                    "status": "done",
+                    "inputs": digest,
+                    "outputs": [str(p) for p in step.outputs],
+                    "seconds": round(time.time() - started, 3),
+                    "finished": time.time(),
+                }
+                self._save(journal)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Impronta dell'insieme piattaforme/plugin di Cordova, per le build incrementali.
+
+Se piattaforma, plugin ed engine dichiarati in config.xml / package.json non sono
+cambiati dall'ultima `cordova platform add`, non serve rimuovere e ricreare
+platforms/, plugins/ e node_modules/: si riusa l'albero esistente (e lo stato
+incrementale di Gradle). L'impronta è l'input dello step "platform" delle
+pipeline di build (vedi pipeline.py).
+"""
+import hashlib
+import json
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from git_state import ROOT
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def config_plugins(root: Path = ROOT) -> list[list[str]]:
+    """Elementi <plugin> / <engine> di config.xml come [tag, name, spec]."""
+    config = root / "config.xml"
+    if not config.exists():
+        return []
+    found = []
+    for _, elem in ET.iterparse(config, events=("end",)):
+        tag = _local_name(elem.tag)
+        if tag in {"plugin", "engine"}:
+            found.append([tag, elem.get("name", ""), elem.get("spec", "")])
+        elem.clear()
+    return sorted(found)
+
+def package_cordova_deps(root: Path = ROOT) -> dict:
+    """Dipendenze cordova-* e sezione `cordova` di package.json."""
+    package_json = root / "package.json"
+    if not package_json.exists():
+        return {}
+    data = json.loads(package_json.read_text(encoding="utf-8"))
+    deps = {}
+    for section in ("dependencies", "devDependencies"):
+        for name, spec in (data.get(section) or {}).items():
+            if name.startswith("cordova"):
+                deps[name] = spec
+    return {"deps": deps, "cordova": data.get("cordova", {})}
+
+def platform_fingerprint(platform_spec: str, root: Path = ROOT) -> str:
+    package_lock = root / "package-lock.json"
+    lock = hashlib.sha256(package_lock.read_bytes()).hexdigest() if package_lock.exists() else ""
+    data = {
+        "platform": platform_spec,
+        "config": config_plugins(root),
+        "package": package_cordova_deps(root),
+        "lock": lock,
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
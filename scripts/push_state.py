@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Stato del push in corso, per gli hook dello stage pre-push.
+
+git passa all'hook pre-push il remote (come argomenti) e su stdin una riga per
+ogni ref aggiornato: "<ref locale> <sha locale> <ref remoto> <sha remoto>".
+Il runner esegue gli hook una volta per ref, sulla cima del range pushato,
+esportando le stesse variabili del framework pre-commit (PRE_COMMIT_FROM_REF,
+PRE_COMMIT_TO_REF, PRE_COMMIT_LOCAL_BRANCH, ...). Gli script di build leggono da
+qui cosa buildare: solo il commit in cima, mai quelli intermedi né l'index.
+"""
+import os
+import subprocess
+from typing import NamedTuple, Optional
+
+import tracing
+from git_state import get_branch
+
+class PushUpdate(NamedTuple):
+    local_ref: str
+    local_sha: str
+    remote_ref: str
+    remote_sha: str
+
+class PushTarget(NamedTuple):
+    from_ref: Optional[str]
+    to_ref: str
+    branch: str
+    tree: str
+
+_target: Optional[PushTarget] = None
+_files: Optional[list[str]] = None
+
+def _is_zero(sha: str) -> bool:
+    return set(sha) == {"0"}
+
+def _git(*args: str) -> str:
+    with tracing.span(f"git {args[0]}", "git"):
+        return subprocess.check_output(["git", *args], text=True)
+
+def _commit_exists(sha: str) -> bool:
+    result = subprocess.run(
+        ["git", "cat-file", "-e", f"{sha}^{{commit}}"],
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0
+
+def parse_updates(lines) -> list[PushUpdate]:
+    """Righe di stdin del pre-push -> ref aggiornati (le cancellazioni sono escluse)."""
+    updates = []
+    for line in lines:
+        parts = line.split()
+        if len(parts) != 4:
+            continue
+        update = PushUpdate(*parts)
+        if not _is_zero(update.local_sha):
+            updates.append(update)
+    return updates
+
+def from_ref(update: PushUpdate, remote_name: str) -> Optional[str]:
+    """
+    Base del range pushato: lo sha remoto se lo conosciamo, altrimenti (branch
+    nuovo) il padre del primo commit che nessun ref del remote contiene ancora.
+    None se il range parte dal commit radice (tutti i file sono "nuovi").
+    """
+    if not _is_zero(update.remote_sha) and _commit_exists(update.remote_sha):
+        return update.remote_sha
+
+    ancestors = _git(
+        "rev-list", update.local_sha, "--topo-order", "--reverse", "--not", f"--remotes={remote_name}",
+    ).split()
+    if not ancestors:
+        # Tutto già presente sul remote: range vuoto
+        return update.local_sha
+    parents = _git("rev-list", "--parents", "-n", "1", ancestors[0]).split()[1:]
+    return parents[0] if parents else None
+
+def push_env(update: PushUpdate, remote_name: str, remote_url: str) -> dict[str, str]:
+    """Variabili d'ambiente impostate dal framework pre-commit per il pre-push."""
+    base = from_ref(update, remote_name)
+    env = {
+        "PRE_COMMIT_TO_REF": update.local_sha,
+        "PRE_COMMIT_LOCAL_BRANCH": update.local_ref,
+        "PRE_COMMIT_REMOTE_BRANCH": update.remote_ref,
+        "PRE_COMMIT_REMOTE_NAME": remote_name,
+        "PRE_COMMIT_REMOTE_URL": remote_url,
+    }
+    if base is not None:
+        env["PRE_COMMIT_FROM_REF"] = base
+    return env
+
+def reset():
+    global _target, _files
+    _target = None
+    _files = None
+
+def current() -> Optional[PushTarget]:
+    """Il push in corso (dalle variabili PRE_COMMIT_*), None fuori dal pre-push."""
+    global _target
+    to_ref = os.environ.get("PRE_COMMIT_TO_REF")
+    if not to_ref:
+        return None
+    if _target is None or _target.to_ref != to_ref:
+        branch = os.environ.get("PRE_COMMIT_LOCAL_BRANCH", "")
+        if branch.startswith("refs/heads/"):
+            branch = branch[len("refs/heads/"):]
+        elif not branch or branch == "HEAD":
+            branch = get_branch()
+        _target = PushTarget(
+            from_ref=os.environ.get("PRE_COMMIT_FROM_REF") or None,
+            to_ref=to_ref,
+            branch=branch,
+            tree=_git("rev-parse", f"{to_ref}^{{tree}}").strip(),
+        )
+    return _target
+
+def changed_files() -> list[str]:
+    """File cambiati nel range pushato (tutti i file del tree se parte dalla radice)."""
+    global _files
+    target = current()
+    if target is None:
+        return []
+    if _files is None:
+        if target.from_ref is None:
+            out = _git("ls-tree", "-r", "--name-only", "-z", target.to_ref)
+        else:
+            # Senza i file cancellati, come per lo staged
+            out = _git("diff", "--name-only", "--no-ext-diff", "-z", "--diff-filter=ACMRTUXB",
+                       f"{target.from_ref}...{target.to_ref}")
+        _files = sorted(f for f in out.split("\0") if f)
+    return _files
+
+def target_branch() -> str:
+    """Branch da buildare: quello pushato nel pre-push, altrimenti quello corrente."""
+    target = current()
+    return target.branch if target is not None else get_branch()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Cache locale degli esiti positivi degli hook.
+
+Chiave: tree dell'index (`git write-tree`) + HEAD + branch + id dell'hook + hash
+dello script (i controlli dipendono anche dal nome del branch e dallo staged
+diff rispetto a HEAD, che cambia dopo un `reset --soft` o uno squash a parità
+di tree) + hash di tutti gli script di scripts/ e di .pre-commit-config.yaml
+(la logica sta anche nei moduli importati: aggiornati gli hook, nessun esito
+vecchio viene riusato) + app di apps.json.
+Se un hook è già passato per lo stesso identico tree (es. commit rifiutato dal
+commit-msg e subito ritentato) non lo rieseguiamo, build Android compresa.
+Le voci sono file vuoti in .git/git-hooks-cordova/results/: l'mtime fa da
+"ultimo utilizzo" per l'eviction LRU, per età e per numero di voci. Un limite
+in byte non servirebbe: lo spazio occupato dipende solo dal numero di voci.
+
+Disattivabile con HOOKS_CORDOVA_NO_CACHE=1 (o `run_hooks.py --no-cache`).
+"""
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import apps
+from git_state import cache_dir, get_branch, get_index_tree, get_snapshot
+
+MAX_ENTRIES = int(os.environ.get("HOOKS_CORDOVA_CACHE_MAX_ENTRIES", "500"))
+MAX_AGE_DAYS = int(os.environ.get("HOOKS_CORDOVA_CACHE_MAX_AGE_DAYS", "14"))
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+CONFIG_FILE = SCRIPTS_DIR.parent / ".pre-commit-config.yaml"
+
+_script_hashes: dict[Path, str] = {}
+# (stat dei file, hash): ricalcolato solo se uno script o la config cambiano
+_code_hash: Optional[tuple[tuple, str]] = None
+
+def enabled() -> bool:
+    return os.environ.get("HOOKS_CORDOVA_NO_CACHE", "") in {"", "0"}
+
+def results_dir() -> Path:
+    return cache_dir() / "results"
+
+def script_hash(path: Path) -> str:
+    if path not in _script_hashes:
+        _script_hashes[path] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return _script_hashes[path]
+
+def code_hash() -> str:
+    """Hash di tutti gli script di scripts/ e della config degli hook."""
+    global _code_hash
+    paths = sorted(SCRIPTS_DIR.glob("*.py")) + [CONFIG_FILE]
+    present = []
+    for path in paths:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        present.append((path, st.st_size, st.st_mtime_ns))
+    signature = tuple((path.name, size, mtime) for path, size, mtime in present)
+    if _code_hash is None or _code_hash[0] != signature:
+        h = hashlib.sha256()
+        for path, _, _ in present:
+            h.update(path.name.encode("utf-8") + b"\0")
+            h.update(path.read_bytes() + b"\0")
+        _code_hash = (signature, h.hexdigest())
+    return _code_hash[1]
+
+def result_key(hook_id: str, script: Path) -> Optional[str]:
+    tree = get_index_tree()
+    if not tree or not script.exists():
+        return None
+    app_map = ";".join(f"{a.name}={a.path}" for a in apps.load())
+    head = get_snapshot()["head"]
+    raw = f"{tree}\0{head}\0{get_branch()}\0{hook_id}\0{script_hash(script)}\0{code_hash()}\0{app_map}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def has_passed(hook_id: str, script: Path) -> bool:
+    key = result_key(hook_id, script)
+    if key is None:
+        return False
+    entry = results_dir() / key
+    if not entry.exists():
+        return False
+    if time.time() - entry.stat().st_mtime > MAX_AGE_DAYS * 86400:
+        return False
+    # Aggiorna l'mtime: la voce è appena stata usata
+    os.utime(entry)
+    return True
+
+def record_pass(hook_id: str, script: Path):
+    key = result_key(hook_id, script)
+    if key is None:
+        return
+    try:
+        results_dir().mkdir(parents=True, exist_ok=True)
+        (results_dir() / key).touch()
+        evict()
+    except OSError:
+        # La cache è solo un'ottimizzazione
+        pass
+
+def evict():
+    """Rimuove le voci più vecchie di MAX_AGE_DAYS e, oltre MAX_ENTRIES, le meno usate."""
+    now = time.time()
+    entries = []
+    for entry in results_dir().iterdir():
+        try:
+            mtime = entry.stat().st_mtime
+        except OSError:
+            continue
+        if now - mtime > MAX_AGE_DAYS * 86400:
+            entry.unlink(missing_ok=True)
+        else:
+            entries.append((mtime, entry))
+
+    entries.sort(reverse=True)
+    for _, entry in entries[MAX_ENTRIES:]:
+        entry.unlink(missing_ok=True)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Runner "nativo" degli hook definiti in .pre-commit-config.yaml.
+
+Al posto del framework pre-commit (un interprete Python nuovo per ogni hook),
+importa gli script di scripts/ come moduli e chiama il loro main() nello stesso
+processo, così lo stato git (git_state) e i file letti vengono condivisi.
+Rispetta `stages`, `files`/`exclude`, `always_run`, `pass_filenames` e `fail_fast`.
+
+Gli hook già passati per lo stesso tree dell'index vengono saltati ("cached pass",
+vedi result_cache.py); `--no-cache` o HOOKS_CORDOVA_NO_CACHE=1 per forzarli.
+
+Nello stage pre-push i ref aggiornati arrivano su stdin: gli hook girano una
+volta per ref, con i file cambiati nel range e le variabili PRE_COMMIT_* del
+framework (vedi push_state.py).
+"""
+import argparse
+import contextlib
+import importlib
+import importlib.util
+import io
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import traceback
+from pathlib import Path
+from typing import Optional
+
+import push_state
+import result_cache
+import tracing
+from git_state import get_staged_blob, get_staged_files
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+HOOK_ROOT = SCRIPTS_DIR.parent
+# La config generata da setup_hooks.py (filtri con i path delle app), se c'è
+SOURCE_CONFIG = HOOK_ROOT / ".pre-commit-config.yaml"
+GENERATED_CONFIG = HOOK_ROOT / "hooks" / ".pre-commit-config.yaml"
+CONFIG_FILE = GENERATED_CONFIG if GENERATED_CONFIG.exists() else SOURCE_CONFIG
+
+# Stage il cui esito dipende da altro oltre al tree dell'index (es. il messaggio
+# di commit, o i commit pushati)
+UNCACHEABLE_STAGES = {"prepare-commit-msg", "commit-msg", "pre-push"}
+
+# Nomi storici degli stage ancora accettati da pre-commit
+STAGE_ALIASES = {
+    "commit": "pre-commit",
+    "push": "pre-push",
+    "merge-commit": "pre-merge-commit",
+}
+
+ALL_STAGES = ("pre-commit", "pre-merge-commit", "pre-push", "prepare-commit-msg", "commit-msg")
+
+COLS = 79
+
+def yaml_available() -> bool:
+    return importlib.util.find_spec("yaml") is not None
+
+def load_config(path: Path = CONFIG_FILE) -> dict:
+    try:
+        import yaml
+    except ImportError:
+        print("✗ PyYAML non installato: `pip install pyyaml` (o usa HOOKS_CORDOVA_RUNNER=pre-commit)", file=sys.stderr)
+        raise SystemExit(1)
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with path.open(encoding="utf-8") as f:
+        return yaml.load(f, Loader=loader) or {}
+
+def iter_hooks(config: dict):
+    """Tutti gli hook della config, con i default di pre-commit già applicati."""
+    default_stages = config.get("default_stages") or ALL_STAGES
+    for repo in config.get("repos", []):
+        for hook in repo.get("hooks", []):
+            hook = dict(hook)
+            stages = hook.get("stages") or default_stages
+            hook["stages"] = [STAGE_ALIASES.get(s, s) for s in stages]
+            hook.setdefault("name", hook["id"])
+            hook.setdefault("files", "")
+            hook.setdefault("exclude", "^$")
+            hook.setdefault("always_run", False)
+            hook.setdefault("pass_filenames", True)
+            hook.setdefault("fail_fast", False)
+            hook.setdefault("verbose", False)
+            yield hook
+
+def hooks_for_stage(config: dict, stage: str) -> list[dict]:
+    return [h for h in iter_hooks(config) if stage in h["stages"]]
+
+def filenames_for_hook(hook: dict, all_files: list[str]) -> list[str]:
+    include = re.compile(hook["files"])
+    exclude = re.compile(hook["exclude"])
+    return [f for f in all_files if include.search(f) and not exclude.search(f)]
+
+def resolve_entry(entry: str) -> tuple[Optional[str], list[str], list[str]]:
+    """
+    Ritorna (nome modulo, argomenti extra, comando) per l'entry di un hook.
+    Il modulo è valorizzato solo per gli script che vivono in scripts/.
+    """
+    cmd = shlex.split(entry)
+    script = Path(cmd[0])
+    if script.suffix == ".py" and (SCRIPTS_DIR / script.name).exists():
+        return script.stem, cmd[1:], cmd
+    return None, cmd[1:], cmd
+
+def script_path(hook: dict) -> Path:
+    module_name, _, cmd = resolve_entry(hook["entry"])
+    if module_name is not None:
+        return SCRIPTS_DIR / f"{module_name}.py"
+    return Path(cmd[0])
+
+def call_in_process(module_name: str, argv: list[str]) -> int:
+    module = importlib.import_module(module_name)
+    old_argv = sys.argv
+    sys.argv = argv
+    try:
+        ret = module.main()
+    except SystemExit as e:
+        ret = e.code
+    finally:
+        sys.argv = old_argv
+
+    if ret is None:
+        return 0
+    if isinstance(ret, int):
+        return ret
+    # sys.exit("messaggio"): come fa Python, stampa e ritorna 1
+    print(ret, file=sys.stderr)
+    return 1
+
+def run_hook(hook: dict, filenames: list[str]) -> tuple[int, str]:
+    module_name, extra_args, cmd = resolve_entry(hook["entry"])
+    args = extra_args + list(hook.get("args", []))
+    if hook["pass_filenames"]:
+        args += filenames
+
+    # Catturiamo solo l'output Python: i sottoprocessi (cordova/gradle) scrivono
+    # direttamente sul terminale, come farebbero senza il runner.
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
+        try:
+            if module_name is not None:
+                code = call_in_process(module_name, [cmd[0]] + args)
+            elif cmd[0].endswith(".py"):
+                code = subprocess.run([sys.executable, cmd[0]] + args).returncode
+            else:
+                # Eseguibile o comando di sistema: come lo lancerebbe pre-commit
+                code = subprocess.run([cmd[0]] + args).returncode
+        except Exception:
+            traceback.print_exc()
+            code = 1
+    return code, buf.getvalue()
+
+def print_status(name: str, status: str, note: str = ""):
+    dots = "." * max(COLS - len(name) - len(note) - len(status), 3)
+    print(f"{name}{dots}{note}{status}", flush=True)
+
+def run_stage(stage: str, commit_msg_filename: Optional[str] = None, config: Optional[dict] = None) -> int:
+    config = config if config is not None else load_config()
+    hooks = hooks_for_stage(config, stage)
+    if not hooks:
+        return 0
+
+    if stage in {"commit-msg", "prepare-commit-msg"}:
+        all_files = [commit_msg_filename] if commit_msg_filename else []
+    elif stage == "pre-push":
+        all_files = push_state.changed_files()
+    else:
+        # Come pre-commit (--diff-filter=ACMRTUXB): i file cancellati non
+        # vengono passati agli hook, che non troverebbero il blob
+        all_files = sorted(f for f in get_staged_files() if get_staged_blob(f))
+
+    use_cache = result_cache.enabled() and stage not in UNCACHEABLE_STAGES
+
+    retval = 0
+    for hook in hooks:
+        filenames = filenames_for_hook(hook, all_files)
+        if not filenames and not hook["always_run"]:
+            print_status(hook["name"], "Skipped", "(no files to check)")
+            continue
+
+        script = script_path(hook)
+        if use_cache and result_cache.has_passed(hook["id"], script):
+            print_status(hook["name"], "Passed", "(cached pass)")
+            continue
+
+        with tracing.span(f"hook {hook['id']}", "hook"):
+            code, output = run_hook(hook, filenames)
+
+        if code == 0:
+            print_status(hook["name"], "Passed")
+            if use_cache:
+                result_cache.record_pass(hook["id"], script)
+        else:
+            print_status(hook["name"], "Failed")
+            print(f"- hook id: {hook['id']}")
+            print(f"- exit code: {code}")
+            retval = 1
+
+        if output and (code != 0 or hook["verbose"]):
+            print()
+            print(output.rstrip())
+            print()
+
+        if code != 0 and (config.get("fail_fast") or hook["fail_fast"]):
+            break
+
+    return retval
+
+def run_pre_push(remote_name: str, remote_url: str, config: dict) -> int:
+    """Esegue lo stage pre-push per ogni ref pushato (letto da stdin)."""
+    retval = 0
+    for update in push_state.parse_updates(sys.stdin):
+        env = push_state.push_env(update, remote_name, remote_url)
+        if env.get("PRE_COMMIT_FROM_REF") == update.local_sha:
+            continue
+        os.environ.update(env)
+        if "PRE_COMMIT_FROM_REF" not in env:
+            os.environ.pop("PRE_COMMIT_FROM_REF", None)
+        push_state.reset()
+        print(f"→ {update.local_ref} ({update.local_sha[:10]})", flush=True)
+        retval |= run_stage("pre-push", config=config)
+        if retval and config.get("fail_fast"):
+            break
+    return retval
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Esegue gli hook di .pre-commit-config.yaml in un solo processo")
+    parser.add_argument("--hook-stage", default="pre-commit")
+    parser.add_argument("--commit-msg-filename")
+    parser.add_argument("--remote-name", default="", help="pre-push: nome del remote")
+    parser.add_argument("--remote-url", default="", help="pre-push: URL del remote")
+    parser.add_argument("--config", type=Path, default=CONFIG_FILE)
+    parser.add_argument("--no-cache", action="store_true", help="riesegue anche gli hook già passati")
+    return parser.parse_args(argv)
+
+def framework_fallback(args: argparse.Namespace, stage: str) -> int:
+    """
+    Senza PyYAML la config non è leggibile: passa la mano al framework
+    pre-commit (se installato) con gli stessi argomenti dei wrapper.
+    """
+    pre_commit = shutil.which("pre-commit")
+    if pre_commit is None:
+        print("✗ PyYAML non installato: `pip install pyyaml` (o installa pre-commit)", file=sys.stderr)
+        return 1
+    print("ℹ PyYAML non installato: uso il framework pre-commit", file=sys.stderr, flush=True)
+    config = str(args.config)
+    if stage == "pre-push":
+        # hook-impl legge i ref da stdin, come gli hook installati da pre-commit
+        argv = ["hook-impl", "--config", config, "--hook-type", stage,
+                "--hook-dir", str(HOOK_ROOT), "--", args.remote_name, args.remote_url]
+    else:
+        argv = ["run", "--config", config, "--hook-stage", stage]
+        if args.commit_msg_filename:
+            argv += ["--commit-msg-filename", args.commit_msg_filename]
+    os.execv(pre_commit, [pre_commit, *argv])
+
+def main() -> int:
+    args = parse_args()
+
+    if args.no_cache:
+        os.environ["HOOKS_CORDOVA_NO_CACHE"] = "1"
+
+    stage = STAGE_ALIASES.get(args.hook_stage, args.hook_stage)
+    if not yaml_available():
+        return framework_fallback(args, stage)
+    tracing.set_run(stage)
+    if stage == "pre-push" and not os.environ.get("PRE_COMMIT_TO_REF"):
+        return run_pre_push(args.remote_name, args.remote_url, load_config(args.config))
+    return run_stage(stage, args.commit_msg_filename, load_config(args.config))
+
+if __name__ == "__main__":
+    sys.exit(main())
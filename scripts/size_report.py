@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Dimensioni degli APK / AAB voce per voce e confronto con la versione
+precedente, per capire cosa fa crescere il download da un rilascio all'altro.
+
+Per ogni artefatto dell'archivio (artifact_store.py) si salva un indice delle
+voci dello zip (path, dimensione compressa e non compressa, CRC) letto dalla
+central directory, senza decomprimere nulla, in
+.git/git-hooks-cordova/artifacts/sizes/<digest>.json.gz. Nel confronto le voci
+con stesso path e stesso CRC sono invariate e vengono scartate subito: il
+resto viene raggruppato per cartella (assets/www/js, lib/<abi>, un gruppo per
+plugin in assets/www/plugins, ...).
+
+La versione precedente è la più alta archiviata sotto quella buildata, della
+stessa app (con più app le versioni sono archiviate come <app>/<versione>). Con
+HOOKS_CORDOVA_MAX_SIZE_GROWTH (percentuale, es. 10) la build fallisce se la
+dimensione compressa di un artefatto cresce oltre la soglia; senza, solo report.
+
+`python size_report.py <versione> [--against <versione>]` per un confronto a mano.
+"""
+import argparse
+import gzip
+import json
+import math
+import os
+import re
+import sys
+import zipfile
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import artifact_store
+import tracing
+
+SIZES_DIR = "sizes"
+
+# Profondità dei gruppi (senza il modulo "base/" degli AAB): assets/www/js
+GROUP_DEPTH = 3
+PLUGINS_DIR = ("assets", "www", "plugins")
+TOP_GROUPS = 8
+
+class Change(NamedTuple):
+    group: str
+    before: int
+    after: int
+
+def max_growth() -> Optional[float]:
+    """Soglia di crescita in percentuale da HOOKS_CORDOVA_MAX_SIZE_GROWTH, None se non impostata."""
+    raw = os.environ.get("HOOKS_CORDOVA_MAX_SIZE_GROWTH", "")
+    value = raw.strip().rstrip("%").strip()
+    if not value:
+        return None
+    try:
+        limit = float(value)
+    except ValueError:
+        limit = None
+    if limit is None or not math.isfinite(limit) or limit < 0:
+        print(f"✗ HOOKS_CORDOVA_MAX_SIZE_GROWTH={raw!r} non valida: serve una percentuale, es. 10 o 10%",
+              file=sys.stderr)
+        sys.exit(1)
+    return limit
+
+def version_key(version: str) -> tuple:
+    """Ordine delle versioni: 1.10.0 dopo 1.9.2 (numeri, poi il resto come testo)."""
+    return tuple(int(n) for n in re.findall(r"\d+", version)), version
+
+def _index_path(digest: str) -> Path:
+    return artifact_store.store_dir() / SIZES_DIR / f"{digest}.json.gz"
+
+def _prune():
+    """Elimina gli indici degli oggetti rimossi dall'archivio."""
+    for path in (artifact_store.store_dir() / SIZES_DIR).glob("*.json.gz"):
+        if not artifact_store.exists(path.name.split(".", 1)[0]):
+            path.unlink(missing_ok=True)
+
+@tracing.traced("size index", "io")
+def entry_index(digest: str) -> dict[str, list[int]]:
+    """{path: [compressa, non compressa, CRC]} delle voci dello zip archiviato con `digest`."""
+    path = _index_path(digest)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    with zipfile.ZipFile(artifact_store.object_path(digest)) as zf:
+        entries = {
+            info.filename: [info.compress_size, info.file_size, info.CRC]
+            for info in zf.infolist()
+            if not info.is_dir()
+        }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(entries, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    _prune()
+    return entries
+
+def group_of(name: str, bundle: bool) -> str:
+    parts = name.split("/")[:-1]
+    module = parts[:1] if bundle else []
+    parts = parts[len(module):]
+    if not parts:
+        return "/".join(module) or "(root)"
+    depth = GROUP_DEPTH + 1 if tuple(parts[:3]) == PLUGINS_DIR else GROUP_DEPTH
+    return "/".join(module + parts[:depth])
+
+def compare(old: dict[str, list[int]], new: dict[str, list[int]], bundle: bool) -> list[Change]:
+    """Variazione della dimensione compressa per gruppo, ordinata per crescita."""
+    groups: dict[str, list[int]] = {}
+    for name in old.keys() | new.keys():
+        before, after = old.get(name), new.get(name)
+        # Stesso CRC e stesse dimensioni: voce invariata
+        if before == after:
+            continue
+        totals = groups.setdefault(group_of(name, bundle), [0, 0])
+        totals[0] += before[0] if before else 0
+        totals[1] += after[0] if after else 0
+    changes = [Change(group, b, a) for group, (b, a) in groups.items() if a != b]
+    return sorted(changes, key=lambda c: c.after - c.before, reverse=True)
+
+def previous_version(version: str, manifest: dict) -> Optional[str]:
+    app, _, number = version.rpartition("/")
+    older = [
+        v for v in manifest["versions"]
+        if v.rpartition("/")[0] == app and version_key(v.rpartition("/")[2]) < version_key(number)
+    ]
+    return max(older, key=lambda v: version_key(v.rpartition("/")[2]), default=None)
+
+def _human(size: int) -> str:
+    sign = "-" if size < 0 else "+"
+    size = abs(size)
+    if size >= 1024 * 1024:
+        return f"{sign}{size / (1024 * 1024):.2f} MB"
+    return f"{sign}{size / 1024:.1f} KB"
+
+def _total(entries: dict[str, list[int]]) -> int:
+    return sum(e[0] for e in entries.values())
+
+def report(version: str, against: Optional[str] = None) -> bool:
+    """
+    Stampa le differenze di dimensione fra gli artefatti di `version` e quelli
+    di `against` (default: la versione precedente). False se un artefatto
+    supera HOOKS_CORDOVA_MAX_SIZE_GROWTH.
+    """
+    manifest = artifact_store.load_manifest()
+    current = manifest["versions"].get(version)
+    if current is None:
+        print(f"ℹ Nessun artefatto archiviato per la versione {version}")
+        return True
+    against = against or previous_version(version, manifest)
+    previous = manifest["versions"].get(against) if against else None
+    if previous is None:
+        print(f"ℹ Dimensioni {version}: nessuna versione precedente con cui confrontare")
+        return True
+
+    limit = max_growth()
+    ok = True
+    for name, artifact in current["artifacts"].items():
+        old = previous["artifacts"].get(name)
+        if old is None or not artifact_store.exists(old["digest"]):
+            continue
+        try:
+            before = entry_index(old["digest"])
+            after = entry_index(artifact["digest"])
+        except (OSError, zipfile.BadZipFile) as e:
+            print(f"⚠ {name}: indice delle dimensioni non disponibile ({e})")
+            continue
+        total_before, total_after = _total(before), _total(after)
+        growth = (total_after - total_before) * 100 / total_before if total_before else 0.0
+        print(f"ℹ {name} {against} → {version}: {_human(total_after - total_before)} ({growth:+.1f}%)")
+        for change in compare(before, after, name.endswith(".aab"))[:TOP_GROUPS]:
+            if change.after > change.before:
+                print(f"    {_human(change.after - change.before):>12}  {change.group}")
+
+        if limit is not None and growth > limit:
+            print(f"✗ {name}: crescita {growth:.1f}% oltre la soglia del {limit:g}% "
+                  "(HOOKS_CORDOVA_MAX_SIZE_GROWTH)", file=sys.stderr)
+            ok = False
+    return ok
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Differenze di dimensione fra gli artefatti di due versioni")
+    parser.add_argument("version")
+    parser.add_argument("--against", help="versione di confronto (default: la precedente archiviata)")
+    args = parser.parse_args()
+    return 0 if report(args.version, args.against) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
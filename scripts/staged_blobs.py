@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Lettura dei blob dalla versione STAGED (index) o da un commit, non dal working tree.
+
+Tutti i blob passano da un unico processo `git cat-file --batch` tenuto aperto
+per tutta la durata del processo Python. `scan_blob` legge il blob a blocchi e
+ferma la ricerca al primo match (route.js può essere un bundle JS di diversi
+MB); il resto del blob viene solo scartato. L'estrazione delle versioni e la
+relativa cache sono in versions.py. `blob_sha` chiede solo lo SHA a un secondo
+processo `git cat-file --batch-check`, per usare la cache senza leggere il blob.
+
+Con più app i controlli girano in thread diversi: ogni richiesta (header +
+contenuto) avviene sotto `lock`, che chi usa stream_blob deve tenere finché
+non ha consumato tutti i blocchi.
+"""
+import atexit
+import subprocess
+import threading
+from typing import Callable, Iterator, Optional
+
+import tracing
+
+CHUNK_SIZE = 64 * 1024
+# Quanto del blocco precedente teniamo per i match a cavallo di due blocchi
+# (il tag <widget ...> va spesso su più righe)
+OVERLAP = 8 * 1024
+
+_proc: Optional[subprocess.Popen] = None
+# `git cat-file --batch-check`: solo SHA e dimensione, senza il contenuto
+_check_proc: Optional[subprocess.Popen] = None
+
+# Un solo processo cat-file: una richiesta alla volta
+lock = threading.RLock()
+
+def _batch() -> subprocess.Popen:
+    global _proc
+    if _proc is None or _proc.poll() is not None:
+        _proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+    return _proc
+
+def _batch_check() -> subprocess.Popen:
+    global _check_proc
+    if _check_proc is None or _check_proc.poll() is not None:
+        _check_proc = subprocess.Popen(
+            ["git", "cat-file", "--batch-check"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+    return _check_proc
+
+@atexit.register
+def close():
+    global _proc, _check_proc
+    with lock:
+        for proc in (_proc, _check_proc):
+            if proc is not None and proc.poll() is None:
+                proc.stdin.close()
+                proc.wait()
+        _proc = _check_proc = None
+
+def _request(rel: str, rev: str = "") -> tuple[str, int]:
+    """
+    Chiede a cat-file il blob di `rel` nel commit `rev` (default: l'index);
+    ritorna (sha, dimensione).
+    """
+    proc = _batch()
+    proc.stdin.write(f"{rev}:{rel}\n".encode("utf-8"))
+    proc.stdin.flush()
+    header = proc.stdout.readline().decode("utf-8").split()
+    if len(header) != 3 or header[1] != "blob":
+        raise FileNotFoundError(rel)
+    return header[0], int(header[2])
+
+def blob_sha(rel: str, rev: str = "") -> Optional[str]:
+    """SHA del blob di `rel` nel commit `rev` (default: l'index), None se non c'è."""
+    with lock:
+        proc = _batch_check()
+        proc.stdin.write(f"{rev}:{rel}\n".encode("utf-8"))
+        proc.stdin.flush()
+        header = proc.stdout.readline().decode("utf-8").split()
+    if len(header) != 3 or header[1] != "blob":
+        return None
+    return header[0]
+
+def _read_chunks(size: int):
+    """Legge `size` byte dal batch a blocchi, poi consuma il newline finale."""
+    out = _batch().stdout
+    remaining = size
+    while remaining:
+        chunk = out.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            raise EOFError("git cat-file --batch terminato inaspettatamente")
+        remaining -= len(chunk)
+        yield chunk
+    out.read(1)
+
+def stream_blob(rel: str, rev: str = "") -> tuple[str, int, Iterator[bytes]]:
+    """
+    Blob di `rel` (staged, o nel commit `rev`) come (sha, dimensione, blocchi).
+    I blocchi vanno consumati tutti prima di chiedere un altro blob, tenendo `lock`.
+    """
+    sha, size = _request(rel, rev)
+    return sha, size, _read_chunks(size)
+
+def read_blob(rel: str) -> bytes:
+    """Contenuto staged di `rel`. FileNotFoundError se il file non è nell'index."""
+    with lock, tracing.span("git cat-file read", "git", path=rel):
+        _, size = _request(rel)
+        return b"".join(_read_chunks(size))
+
+def read_text(rel: str) -> str:
+    return read_blob(rel).decode("utf-8")
+
+def scan_blob(
+    rel: str,
+    finder: Callable[[bytes], tuple[bool, Optional[str]]],
+    rev: str = "",
+) -> tuple[str, Optional[str]]:
+    """
+    Passa a `finder` il blob di `rel` (staged, o nel commit `rev`) un blocco alla
+    volta, fermandosi appena ritorna (True, valore). Ritorna (sha del blob, valore).
+    """
+    with lock, tracing.span("git cat-file scan", "git", path=rel):
+        sha, size = _request(rel, rev)
+        done, found = False, None
+        buf = b""
+        for chunk in _read_chunks(size):
+            # Dopo il match continuiamo solo a svuotare la pipe, senza cercare
+            if done:
+                continue
+            buf += chunk
+            done, found = finder(buf)
+            if not done:
+                buf = buf[-OVERLAP:]
+    return sha, found
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Tempi di esecuzione degli hook: sottoprocessi (git, cordova, Gradle), operazioni
+su file (rmtree, copie, cache) e step delle pipeline.
+
+Ogni processo raccoglie gli span in memoria e, all'uscita, scrive:
+- un trace in formato Chrome trace-event (.git/git-hooks-cordova/traces/*.json,
+  da aprire con chrome://tracing o https://ui.perfetto.dev), ultimi MAX_TRACES;
+- una riga in traces/history.jsonl con stage, branch, versione e durata
+  totale di ogni step.
+
+`python tracing.py report` mostra p50 / p95 per step sugli ultimi run.
+HOOKS_CORDOVA_TRACE=0 per disattivare tutto.
+"""
+import argparse
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+MAX_TRACES = 50
+MAX_HISTORY = 1000
+
+HISTORY_FILE = "history.jsonl"
+
+_t0 = time.perf_counter_ns()
+_started = time.time()
+_events: list[dict] = []
+_meta: dict = {}
+
+def enabled() -> bool:
+    return os.environ.get("HOOKS_CORDOVA_TRACE", "") != "0"
+
+def reset_run():
+    """Nuovo run da zero: per i processi che eseguono più run (es. il daemon)."""
+    global _t0, _started
+    _t0 = time.perf_counter_ns()
+    _started = time.time()
+    _events.clear()
+    _meta.clear()
+
+def set_run(name: str):
+    """Nome del run (es. lo stage del runner); default: nome dello script."""
+    _meta["run"] = name
+
+def run_name() -> str:
+    return _meta.get("run") or Path(sys.argv[0]).stem or "hooks"
+
+def annotate(**values):
+    """Metadati del run (es. version=...) salvati nel trace e nella history."""
+    _meta.update({k: v for k, v in values.items() if v is not None})
+
+def command_name(cmd: list[str], words: int = 3) -> str:
+    """
+    Nome stabile per lo span di un comando: eseguibile + primi argomenti, senza
+    opzioni e path (es. "cordova platform add", "gradlew :app:assembleRelease").
+    """
+    parts = [Path(cmd[0]).name]
+    for arg in cmd[1:]:
+        if len(parts) >= words:
+            break
+        if arg.startswith("-") or "/" in arg or "\\" in arg:
+            continue
+        parts.append(arg)
+    return " ".join(parts)
+
+@contextlib.contextmanager
+def span(name: str, cat: str = "step", **args):
+    """Misura il blocco come evento "X" (complete) del trace."""
+    if not enabled():
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end = time.perf_counter_ns()
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (start - _t0) / 1000,
+            "dur": (end - start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = {k: str(v) for k, v in args.items()}
+        _events.append(event)
+
+def traced(name: str, cat: str = "step"):
+    """Decoratore: tutta la funzione come un unico span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def traces_dir() -> Path:
+    from git_state import cache_dir
+
+    return cache_dir() / "traces"
+
+def step_durations(events: list[dict]) -> dict[str, float]:
+    """Millisecondi totali per nome di span."""
+    totals: dict[str, float] = {}
+    for event in events:
+        totals[event["name"]] = totals.get(event["name"], 0.0) + event["dur"] / 1000
+    return {name: round(ms, 3) for name, ms in totals.items()}
+
+@atexit.register
+def flush():
+    """Scrive trace e riga di history (mai bloccante per l'hook)."""
+    if not enabled() or not _events:
+        return
+    events = list(_events)
+    _events.clear()
+    try:
+        from git_state import get_branch
+
+        run = run_name()
+        record = {
+            "time": _started,
+            "run": run,
+            "branch": _meta.get("branch") or get_branch(),
+            "version": _meta.get("version"),
+            "total_ms": round((time.perf_counter_ns() - _t0) / 1e6, 3),
+            "steps": step_durations(events),
+        }
+        directory = traces_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(_started))
+        trace = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {k: v for k, v in record.items() if k != "steps"},
+        }
+        (directory / f"{stamp}-{run}-{os.getpid()}.json").write_text(json.dumps(trace), encoding="utf-8")
+        for old in sorted(directory.glob("*.json"))[:-MAX_TRACES]:
+            old.unlink(missing_ok=True)
+
+        history = directory / HISTORY_FILE
+        with history.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        _trim_history(history)
+    except Exception:
+        # Il tracing è solo diagnostica
+        pass
+
+def _trim_history(history: Path):
+    # Riscriviamo solo quando il file è cresciuto molto oltre il limite
+    if history.stat().st_size < MAX_HISTORY * 2 * 512:
+        return
+    lines = history.read_text(encoding="utf-8").splitlines()
+    if len(lines) > MAX_HISTORY * 2:
+        tmp = history.with_name(f".{history.name}.{os.getpid()}.tmp")
+        tmp.write_text("\n".join(lines[-MAX_HISTORY:]) + "\n", encoding="utf-8")
+        os.replace(tmp, history)
+
+def load_history(last: int, run: Optional[str] = None) -> list[dict]:
+    path = traces_dir() / HISTORY_FILE
+    if not path.exists():
+        return []
+    records = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if run is None or record.get("run") == run:
+            records.append(record)
+    return records[-last:]
+
+def percentile(values: list[float], p: float) -> float:
+    """Percentile con interpolazione lineare (come numpy di default)."""
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def report(last: int, run: Optional[str]) -> int:
+    records = load_history(last, run)
+    if not records:
+        print("Nessun run registrato in", traces_dir() / HISTORY_FILE)
+        return 0
+
+    per_step: dict[str, list[float]] = {"(totale)": [r["total_ms"] for r in records]}
+    for record in records:
+        for name, ms in record["steps"].items():
+            per_step.setdefault(name, []).append(ms)
+
+    width = max(len(name) for name in per_step)
+    print(f"Ultimi {len(records)} run" + (f" ({run})" if run else ""))
+    print(f"{'step':<{width}}  {'n':>4}  {'p50 ms':>10}  {'p95 ms':>10}")
+    rows = sorted(per_step.items(), key=lambda item: percentile(item[1], 50), reverse=True)
+    for name, values in rows:
+        print(f"{name:<{width}}  {len(values):>4}  {percentile(values, 50):>10.1f}  {percentile(values, 95):>10.1f}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Report dei tempi degli hook")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--last", type=int, default=50, help="numero di run da considerare")
+    parser.add_argument("--run", help="solo i run con questo nome (es. pre-commit, pre-push)")
+    args = parser.parse_args()
+    # Il report non deve finire a sua volta nella history
+    os.environ["HOOKS_CORDOVA_TRACE"] = "0"
+    return report(args.last, args.run)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Analisi in un solo passaggio delle righe di versione cambiate nello staged diff.
+
+Un unico `git diff --cached -U0` per tutti i file di VERSION_PATTERNS, letto riga
+per riga mentre git lo produce (senza tenerlo tutto in memoria). Per ogni file
+ritorna la versione vecchia e quella nuova, riutilizzabili anche nei messaggi di
+errore degli altri controlli. Con più app (apps.py) lo stesso diff copre i file
+di tutte le app; le chiavi sono i path relativi alla root della repo.
+"""
+import re
+import subprocess
+import threading
+from typing import NamedTuple, Optional
+
+import apps
+import tracing
+from git_state import ROOT
+from versions import CONFIG_FILE, ROUTE_FILE, ROUTE_PATTERN
+
+# Pattern che identificano le righe "di versione"
+VERSION_PATTERNS = {
+    ROUTE_FILE: re.compile(r"FCIC_CONFIG\.VERSION"),
+    CONFIG_FILE: re.compile(r"<widget[^>]*\bversion="),
+}
+
+# Estrazione del valore dalla riga di versione
+VALUE_PATTERNS = {
+    ROUTE_FILE: re.compile(ROUTE_PATTERN.decode("ascii")),
+    CONFIG_FILE: re.compile(r'\bversion="([^"]+)"'),
+}
+
+class VersionChange(NamedTuple):
+    path: str
+    old: Optional[str]
+    new: Optional[str]
+
+    def describe(self) -> str:
+        return f"{self.path}: {self.old or '?'} → {self.new or '?'}"
+
+_changes: Optional[dict[str, VersionChange]] = None
+_lock = threading.Lock()
+
+def _value(kind: str, line: str) -> Optional[str]:
+    m = VALUE_PATTERNS[kind].search(line)
+    return m.group(1) if m else None
+
+def reset():
+    """Dimentica le versioni calcolate (lo staged è cambiato)."""
+    global _changes
+    _changes = None
+
+def version_changes() -> dict[str, VersionChange]:
+    """
+    File di versione -> VersionChange, solo per i file in cui lo staged diff
+    tocca almeno una riga di versione. Calcolato una volta per processo.
+    """
+    global _changes
+    with _lock:
+        if _changes is not None:
+            return _changes
+
+        with tracing.span("git diff --cached", "git"):
+            found = _scan_diff()
+
+        _changes = {path: VersionChange(path, v[0], v[1]) for path, v in found.items()}
+        return _changes
+
+def _unquote(name: str) -> str:
+    """
+    Path come scritto da git nell'header del diff: tra virgolette con escape
+    in stile C se contiene caratteri speciali, con un TAB finale se contiene
+    spazi.
+    """
+    name = name.rstrip("\t")
+    if len(name) < 2 or not (name.startswith('"') and name.endswith('"')):
+        return name
+    raw = name[1:-1].encode("utf-8").decode("unicode_escape")
+    return raw.encode("latin-1").decode("utf-8", errors="replace")
+
+def _scan_diff() -> dict[str, list[Optional[str]]]:
+    found: dict[str, list[Optional[str]]] = {}
+    # Path di ogni app -> tipo di file (chiave di VERSION_PATTERNS)
+    kinds = {app.rel(name): name for app in apps.load() for name in VERSION_PATTERNS}
+    proc = subprocess.Popen(
+        [
+            # Prefissi e quoting fissi, qualunque sia la config dell'utente
+            # (diff.noprefix, diff.mnemonicPrefix, core.quotePath)
+            "git", "-c", "core.quotepath=off",
+            "diff", "--cached", "-U0", "--no-color", "--no-ext-diff",
+            "--src-prefix=a/", "--dst-prefix=b/",
+            "--", *kinds,
+        ],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+
+    current = None
+    in_header = False
+    for line in proc.stdout:
+        if line.startswith("diff --git "):
+            current = None
+            in_header = True
+            continue
+        if in_header:
+            if line.startswith("@@"):
+                in_header = False
+            elif line.startswith("--- ") or line.startswith("+++ "):
+                # "+++ b/path" (o "--- a/path" se il file è stato cancellato)
+                name = _unquote(line[4:].rstrip("\n"))
+                if name != "/dev/null":
+                    current = name[2:]
+            continue
+        kind = kinds.get(current)
+        if kind is None or line[0] not in {"+", "-"}:
+            continue
+        if not VERSION_PATTERNS[kind].search(line):
+            continue
+
+        # Il file risulta toccato anche se il valore non è estraibile
+        old_new = found.setdefault(current, [None, None])
+        slot = 0 if line[0] == "-" else 1
+        if old_new[slot] is None:
+            old_new[slot] = _value(kind, line)
+
+    # Se il diff fallisce non blocchiamo a sproposito: nessun cambiamento
+    if proc.wait() != 0:
+        found = {}
+    return found
+
+def file_touches_version(path: str) -> bool:
+    return path in version_changes()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Estrazione della versione da www/js/route.js e config.xml, condivisa da tutti
+gli script (controlli pre-commit / commit-msg e build).
+
+Tre sorgenti, stessa logica di ricerca:
+- working tree: il file viene mappato in memoria (mmap) e la regex si ferma al
+  primo match, senza copiare il file in una stringa;
+- index (staged) e commit: il blob viene letto a blocchi da `git cat-file
+  --batch` (vedi staged_blobs) fermando la ricerca al primo match.
+
+In config.xml l'elemento <widget> è sempre il primo: cerchiamo solo il suo tag
+di apertura e non guardiamo il resto del file (plugin, preference, ...).
+
+I risultati sono salvati in .git/git-hooks-cordova/versions.json, per SHA del
+blob (index / commit) o per stat del file (dimensione, mtime, inode) nel
+working tree, così gli altri hook e le build non rileggono nulla.
+
+Con più app (apps.py) i path sono quelli relativi alla root della repo, es.
+apps/brand-x/config.xml: conta il nome del file, non la cartella.
+"""
+import json
+import mmap
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+import staged_blobs
+import tracing
+from git_state import ROOT, cache_dir, get_staged_blob
+
+ROUTE_FILE = "www/js/route.js"
+CONFIG_FILE = "config.xml"
+
+# Ordine di ricerca della versione del progetto
+VERSION_FILES = (ROUTE_FILE, CONFIG_FILE)
+
+ROUTE_PATTERN = rb'FCIC_CONFIG\.VERSION\s*=\s*"([^"]+)"'
+ROUTE_RE = re.compile(ROUTE_PATTERN)
+WIDGET_RE = re.compile(rb"<widget\b[^>]*>")
+WIDGET_VERSION_RE = re.compile(rb'\bversion="([^"]+)"')
+
+VERSIONS_FILE = "versions.json"
+MAX_VERSIONS = 200
+
+_versions: Optional[dict] = None
+# I controlli delle app girano in thread diversi
+_lock = threading.RLock()
+
+def is_config(rel: str) -> bool:
+    return rel == CONFIG_FILE or rel.endswith("/" + CONFIG_FILE)
+
+def search(rel: str, data) -> tuple[bool, Optional[str]]:
+    """
+    Cerca la versione di `rel` in `data` (bytes o mmap). Ritorna (definitivo,
+    versione): definitivo=False se serve leggere altri dati per decidere.
+    """
+    if is_config(rel):
+        tag = WIDGET_RE.search(data)
+        if not tag:
+            return False, None
+        # Trovato il <widget>: con o senza version, il resto del file non conta
+        m = WIDGET_VERSION_RE.search(tag.group(0))
+        return True, m.group(1).decode("utf-8") if m else None
+
+    m = ROUTE_RE.search(data)
+    if not m:
+        return False, None
+    return True, m.group(1).decode("utf-8")
+
+def _load() -> dict:
+    global _versions
+    with _lock:
+        if _versions is None:
+            try:
+                _versions = json.loads((cache_dir() / VERSIONS_FILE).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                _versions = {}
+        return _versions
+
+def _save():
+    path = cache_dir() / VERSIONS_FILE
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(_versions), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+def _remember(key: str, version: Optional[str]):
+    with _lock:
+        versions = _load()
+        versions.pop(key, None)
+        versions[key] = version
+        # Teniamo solo le voci più recenti (i dict mantengono l'ordine di inserimento)
+        for old in list(versions)[:-MAX_VERSIONS]:
+            del versions[old]
+        _save()
+
+def _scan_file(path: Path, rel: str) -> Optional[str]:
+    with tracing.span("version scan", "io", path=rel):
+        with path.open("rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # File vuoto: niente da mappare
+                return None
+            with data:
+                return search(rel, data)[1]
+
+def working_version(rel: str, root: Path = ROOT) -> Optional[str]:
+    """
+    Versione dichiarata nella copia di `rel` nel working tree di `root`.
+    None se il file non contiene la versione, FileNotFoundError se non esiste.
+    """
+    path = root / rel
+    st = path.stat()
+    key = f"stat:{path.resolve()}:{st.st_size}:{st.st_mtime_ns}:{st.st_ino}"
+    versions = _load()
+    if key in versions:
+        return versions[key]
+
+    version = _scan_file(path, rel)
+    _remember(key, version)
+    return version
+
+def _scan_blob(rel: str, rev: str = "") -> tuple[str, Optional[str]]:
+    return staged_blobs.scan_blob(rel, lambda buf: search(rel, buf), rev)
+
+def staged_version(rel: str) -> Optional[str]:
+    """
+    Versione dichiarata nella copia staged di `rel` (route.js o config.xml).
+    None se il file non contiene la versione, FileNotFoundError se non è nell'index.
+    """
+    sha = get_staged_blob(rel)
+    known = _load()
+    if sha and f"{rel}:{sha}" in known:
+        return known[f"{rel}:{sha}"]
+
+    sha, version = _scan_blob(rel)
+    _remember(f"{rel}:{sha}", version)
+    return version
+
+def version_at(rev: str, rel: str) -> Optional[str]:
+    """
+    Come staged_version, ma per `rel` nel commit `rev` (es. la cima di un push).
+    FileNotFoundError se il file non esiste in quel commit.
+    """
+    # Solo lo SHA (cat-file --batch-check): se il blob è già noto non si legge
+    sha = staged_blobs.blob_sha(rel, rev)
+    known = _load()
+    if sha and f"{rel}:{sha}" in known:
+        return known[f"{rel}:{sha}"]
+
+    sha, version = _scan_blob(rel, rev)
+    _remember(f"{rel}:{sha}", version)
+    return version
+
+def project_version(rev: Optional[str] = None, root: Path = ROOT) -> Optional[str]:
+    """
+    Versione del progetto: route.js, altrimenti config.xml. Dal working tree di
+    `root`, o dal commit `rev` se indicato (`root` è allora la cartella dell'app
+    nella repo). None se nessuno dei due la dichiara.
+    """
+    prefix = "" if not rev or root == ROOT else f"{root.relative_to(ROOT).as_posix()}/"
+    for rel in VERSION_FILES:
+        try:
+            version = version_at(rev, prefix + rel) if rev else working_version(rel, root)
+        except FileNotFoundError:
+            continue
+        if version:
+            return version
+    return None
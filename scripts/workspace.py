@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Workspace di build isolati, copie leggere del progetto del cliente.
+
+Ogni variante (es. debug / release) viene buildata in
+.git/git-hooks-cordova/workspaces/<nome>/, sincronizzato dal working tree a ogni
+run: www/ (e le altre cartelle di sola lettura) via hardlink, il resto via
+reflink quando il filesystem lo permette, altrimenti copia. Le modifiche
+specifiche della variante (overlay, es. _versioneProduzione in route.js) vengono
+scritte solo nel workspace: il working tree dello sviluppatore non viene mai
+toccato. platforms/, plugins/ e node_modules/ appartengono al workspace e
+restano tra un run e l'altro, così le build incrementali continuano a funzionare.
+
+Chi builda nei workspace prende prima `lock("workspaces")`, così due build
+(es. hook sincrono e worker della coda) non lavorano mai sullo stesso platforms/.
+"""
+import contextlib
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import tracing
+from git_state import ROOT, cache_dir
+
+# Cartelle (di primo livello) mai copiate nel workspace
+EXCLUDED = {".git", "tools", "builds", "platforms", "plugins", "node_modules"}
+
+# Cartelle che Cordova legge soltanto: hardlink. Il resto (config.xml,
+# package.json, ...) viene riscritto da `cordova platform add` e va copiato.
+HARDLINK_DIRS = {"www", "res", "resources"}
+
+FICLONE = 0x40049409
+
+def workspace_path(name: str) -> Path:
+    return cache_dir() / "workspaces" / name
+
+@contextlib.contextmanager
+def lock(name: str, blocking: bool = True):
+    """
+    Lock esclusivo tra processi su .git/git-hooks-cordova/locks/<name>.lock.
+    Con blocking=False solleva BlockingIOError se è già preso.
+    """
+    path = cache_dir() / "locks" / f"{name}.lock"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a+") as f:
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except OSError as e:
+            raise BlockingIOError(f"lock {name} già in uso") from e
+        # Il lock si rilascia chiudendo il file
+        yield
+
+@tracing.traced("export tree", "fs")
+def export_tree(tree: str, dest: Path) -> Path:
+    """
+    Estrae il tree git `tree` in `dest` (svuotata prima) usando un index
+    temporaneo: né l'index né il working tree dello sviluppatore vengono toccati.
+    """
+    shutil.rmtree(dest, ignore_errors=True)
+    dest.mkdir(parents=True)
+    env = dict(os.environ, GIT_INDEX_FILE=str(dest.parent / f".{dest.name}.index"))
+    subprocess.run(["git", "read-tree", tree], env=env, check=True)
+    subprocess.run(["git", "checkout-index", "-a", "-f", f"--prefix={dest}/"], env=env, check=True)
+    Path(env["GIT_INDEX_FILE"]).unlink(missing_ok=True)
+    return dest
+
+def reflink(src: Path, dst: Path) -> bool:
+    """Clona `src` in `dst` con un reflink (copy-on-write); False se non si può."""
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        with src.open("rb") as s, dst.open("wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+def clone_file(src: Path, dst: Path):
+    """Copia indipendente di `src` (reflink se possibile): modificarla non tocca l'originale."""
+    tmp = dst.with_name(f".{dst.name}.ws-tmp")
+    if not reflink(src, tmp):
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+def link_file(src: Path, dst: Path):
+    tmp = dst.with_name(f".{dst.name}.ws-tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        clone_file(src, dst)
+        return
+    os.replace(tmp, dst)
+
+def _sync_file(src: Path, dst: Path, hardlink: bool):
+    if src.is_symlink():
+        target = os.readlink(src)
+        if dst.is_symlink() and os.readlink(dst) == target:
+            return
+        dst.unlink(missing_ok=True)
+        os.symlink(target, dst)
+        return
+
+    if dst.exists() and not dst.is_symlink():
+        same = os.path.samefile(src, dst)
+        if hardlink and same:
+            return
+        if not hardlink and not same:
+            s, d = src.stat(), dst.stat()
+            if s.st_size == d.st_size and s.st_mtime_ns == d.st_mtime_ns:
+                return
+    elif dst.is_symlink():
+        dst.unlink()
+
+    if hardlink:
+        link_file(src, dst)
+    else:
+        clone_file(src, dst)
+
+def _write_overlay(dst: Path, data: bytes):
+    if dst.exists() and not dst.is_symlink() and dst.read_bytes() == data:
+        # Se per qualche motivo fosse un hardlink al file dello sviluppatore
+        # lo sostituiamo comunque con un file indipendente
+        if dst.stat().st_nlink == 1:
+            return
+    tmp = dst.with_name(f".{dst.name}.ws-tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, dst)
+
+@tracing.traced("sync workspace", "fs")
+def sync_workspace(name: str, overlays: dict[str, bytes], source: Path = ROOT) -> Path:
+    """
+    Allinea il workspace `name` a `source` (di default il working tree) e
+    applica gli overlay (path relativo -> contenuto). Ritorna la root del workspace.
+    """
+    dest = workspace_path(name)
+    dest.mkdir(parents=True, exist_ok=True)
+    seen = set(overlays)
+
+    for dirpath, dirnames, filenames in os.walk(source):
+        rel_dir = Path(dirpath).relative_to(source)
+        if not rel_dir.parts:
+            dirnames[:] = [d for d in dirnames if d not in EXCLUDED]
+            filenames = [f for f in filenames if f not in EXCLUDED]
+        hardlink = bool(rel_dir.parts) and rel_dir.parts[0] in HARDLINK_DIRS
+
+        (dest / rel_dir).mkdir(parents=True, exist_ok=True)
+        for filename in filenames:
+            rel = (rel_dir / filename).as_posix()
+            seen.add(rel)
+            if rel not in overlays:
+                _sync_file(Path(dirpath) / filename, dest / rel, hardlink)
+
+    for rel, data in overlays.items():
+        (dest / rel).parent.mkdir(parents=True, exist_ok=True)
+        _write_overlay(dest / rel, data)
+
+    # File cancellati dal working tree: spariscono anche dal workspace
+    for dirpath, dirnames, filenames in os.walk(dest):
+        rel_dir = Path(dirpath).relative_to(dest)
+        if not rel_dir.parts:
+            dirnames[:] = [d for d in dirnames if d not in EXCLUDED]
+            filenames = [f for f in filenames if f not in EXCLUDED]
+        for filename in filenames:
+            if (rel_dir / filename).as_posix() not in seen:
+                (Path(dirpath) / filename).unlink()
+
+    return dest
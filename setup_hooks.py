@@ -1,4 +1,8 @@
 #!/usr/bin/env python3
+import argparse
+import hashlib
+import os
+import re
 import subprocess
 import sys
 from pathlib import Path
@@ -6,6 +10,122 @@ from pathlib import Path
 # Ora il root è due livelli sopra: repo-cliente/
 ROOT = Path(__file__).resolve().parents[2]
 HOOK_PATH = ROOT / "tools" / "git-hooks-cordova"
+# Wrapper generati: non tracciati, la rigenerazione non sporca il clone degli hook
+GENERATED_DIR = HOOK_PATH / "hooks"
+CONFIG_PATH = HOOK_PATH / ".pre-commit-config.yaml"
+APPS_PATH = HOOK_PATH / "apps.json"
+# Config con i filtri dei file di versione per le app di apps.json
+GENERATED_CONFIG = GENERATED_DIR / ".pre-commit-config.yaml"
+
+# Filtro dei file di versione dell'app unica in .pre-commit-config.yaml
+VERSION_FILES_FILTER = r"^(www/js/route\.js|config\.xml|CHANGELOG\.md)$"
+
+# Metacaratteri da escapare nei path (validi sia per `re` sia per l'ERE di bash)
+ERE_SPECIAL = re.compile(r"([.^$*+?()\[\]{}|\\])")
+
+sys.path.insert(0, str(HOOK_PATH / "scripts"))
+
+# Gli hook senza filtro `files` (es. release-branch-version-files) fanno qualcosa
+# solo sui branch con questo prefisso o se ci sono file di versione nello staged.
+RELEASE_BRANCH_PREFIX = "release/"
+
+# Costrutti regex Python che l'ERE di bash (`[[ =~ ]]`) non capisce
+NON_ERE = re.compile(r"\\[dDwWsSbBAZ]|\(\?")
+
+# Wrapper tracciati in tools/git-hooks-cordova/ (core.hooksPath): sempre uguali,
+# rimandano a quello generato in hooks/
+SHIM_TEMPLATE = """#!/usr/bin/env bash
+# Rimanda al wrapper generato da setup_hooks.py in hooks/ (non tracciato).
+HOOK_DIR="${{0%/*}}"
+if [ ! -x "$HOOK_DIR/hooks/{stage}" ]; then
+  "$(command -v python3 || command -v python)" "$HOOK_DIR/setup_hooks.py" --regenerate >&2
+fi
+exec "$HOOK_DIR/hooks/{stage}" "$@"
+"""
+
+HOOK_TEMPLATE = """#!/usr/bin/env bash
+# Generato da setup_hooks.py: non modificare a mano, viene rigenerato
+# automaticamente quando cambiano .pre-commit-config.yaml o apps.json.
+set -euo pipefail
+
+GIT_INFO="$(git rev-parse --show-toplevel --git-common-dir --abbrev-ref HEAD 2>/dev/null || true)"
+REPO_ROOT="${{GIT_INFO%%$'\\n'*}}"
+GIT_REST="${{GIT_INFO#*$'\\n'}}"
+GIT_COMMON="${{GIT_REST%%$'\\n'*}}"
+BRANCH="${{GIT_REST#*$'\\n'}}"
+[ "$GIT_REST" = "$GIT_INFO" ] && GIT_COMMON=""
+[ "$BRANCH" = "$GIT_REST" ] && BRANCH=""
+[ -n "$REPO_ROOT" ] || REPO_ROOT="$(git rev-parse --show-toplevel)"
+HOOK_ROOT="$REPO_ROOT/tools/git-hooks-cordova"
+PYTHON="$(command -v python3 || command -v python)"
+
+echo "[git-hooks-cordova] {stage} hook"
+
+# Config e apps.json con cui è stato generato questo script (hash dei blob git):
+# se sono cambiati (pull, checkout, modifica a mano) si rigenera e per questo
+# run niente fast path. Le date dei file non bastano: dopo un pull sono casuali.
+HOOK_INPUTS=("$HOOK_ROOT/.pre-commit-config.yaml")
+[ -f "$HOOK_ROOT/apps.json" ] && HOOK_INPUTS+=("$HOOK_ROOT/apps.json")
+INPUTS_HASH="$(git hash-object --no-filters -- "${{HOOK_INPUTS[@]}}")"
+STALE=""
+if [ "${{INPUTS_HASH//$'\n'/ }}" != "{inputs_hash}" ]; then
+  STALE=1
+  "$PYTHON" "$HOOK_ROOT/setup_hooks.py" --regenerate
+fi
+{guard}
+# HOOKS_CORDOVA_RUNNER=pre-commit per tornare al framework pre-commit
+if [ "${{HOOKS_CORDOVA_RUNNER:-native}}" = "pre-commit" ]; then
+  exec pre-commit {framework_cmd}
+fi
+{daemon}
+exec "$PYTHON" "$HOOK_ROOT/scripts/run_hooks.py" \\
+  --config "$HOOK_ROOT/hooks/.pre-commit-config.yaml" \\
+  --hook-stage {stage}{runner_args}
+"""
+
+GUARD_TEMPLATE = """
+# Fast path: nessun file di versione nello staged e branch non di release
+# -> usciamo subito, senza avviare Python.
+VERSION_FILES_RE='{files_re}'
+if [ -z "$STALE" ]; then
+  case "$BRANCH" in
+    {release_prefix}*) ;;
+    *)
+      RELEVANT=""
+      while IFS= read -r f; do
+        if [[ "$f" =~ $VERSION_FILES_RE ]]; then RELEVANT=1; break; fi
+      done <<< "$(git diff --cached --name-only)"
+      [ -n "$RELEVANT" ] || exit 0
+      ;;
+  esac
+fi
+"""
+
+DAEMON_TEMPLATE = """
+# Daemon degli hook (scripts/hook_daemon.py): controlli già caricati e stato git
+# precalcolato. Il client ripiega da solo su run_hooks.py se serve.
+DAEMON_SOCKET="$GIT_COMMON/git-hooks-cordova/daemon.sock"
+if [ "${{HOOKS_CORDOVA_DAEMON:-1}}" != "0" ] && [ -n "$GIT_COMMON" ] && [ -S "$DAEMON_SOCKET" ]; then
+  exec "$PYTHON" -S "$HOOK_ROOT/scripts/hook_client.py" \\
+    --socket "$DAEMON_SOCKET" \\
+    --config "$HOOK_ROOT/hooks/.pre-commit-config.yaml" \\
+    --hook-stage {stage}{runner_args}
+fi
+"""
+
+# Stage -> argomenti extra passati al runner
+HOOK_SCRIPTS = {
+    "pre-commit": [],
+    "commit-msg": ['--commit-msg-filename "$1"'],
+    "pre-push": ['--remote-name "$1"', '--remote-url "$2"'],
+}
+
+# Stage che non dipendono dallo staged: niente fast path sui file di versione
+# (nel pre-push i ref arrivano su stdin e il branch pushato può non essere HEAD)
+NO_FAST_PATH = {"pre-push"}
+
+# Stage serviti dal daemon (le build del pre-push girano sempre direttamente)
+DAEMON_STAGES = {"pre-commit", "commit-msg"}
 
 def run(cmd, allow_fail=False):
     print(">", " ".join(cmd))
@@ -14,17 +134,160 @@ def run(cmd, allow_fail=False):
         print(f"✗ Command failed: {' '.join(cmd)}")
         sys.exit(result.returncode)
 
+def inputs_hash() -> str:
+    """Hash dei blob git (come `git hash-object`) di config e apps.json, separati da spazio."""
+    hashes = []
+    for path in (CONFIG_PATH, APPS_PATH):
+        if path.exists():
+            data = path.read_bytes()
+            hashes.append(hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest())
+    return " ".join(hashes)
+
+def app_files_filter() -> str:
+    """Filtro ancorato con i file di versione di tutte le app (apps.version_paths)."""
+    import apps
+
+    paths = [ERE_SPECIAL.sub(r"\\\1", p) for p in apps.version_paths()]
+    return f"^({'|'.join(paths)})$"
+
+def render_config() -> str:
+    """
+    .pre-commit-config.yaml con i filtri VERSION_FILES_FILTER sostituiti dai path
+    esatti delle app: un config.xml o un CHANGELOG.md annidato (plugin, codice
+    vendorizzato) non fa partire controlli e build. Sostituzione testuale, per
+    non richiedere PyYAML e non perdere i commenti.
+    """
+    text = CONFIG_PATH.read_text(encoding="utf-8")
+    quoted = "'" + app_files_filter().replace("'", "''") + "'"
+    return re.sub(
+        r"^(\s*files:\s*)" + re.escape(VERSION_FILES_FILTER) + r"[ \t]*$",
+        lambda m: m.group(1) + quoted,
+        text,
+        flags=re.M,
+    )
+
+def version_files_regex() -> str:
+    """
+    Unione dei filtri `files` degli hook nella config generata, in sintassi
+    ERE per bash. Stringa vuota se non è esprimibile (niente fast path).
+    """
+    from run_hooks import load_config, iter_hooks, yaml_available
+
+    if not yaml_available():
+        # Gli hook ripiegheranno sul framework pre-commit: niente fast path
+        print("⚠ PyYAML non installato: `pip install pyyaml` per il runner nativo e il fast path")
+        return ""
+
+    patterns = []
+    for hook in iter_hooks(load_config(GENERATED_CONFIG)):
+        if hook["files"] and hook["files"] not in patterns:
+            patterns.append(hook["files"])
+
+    if not patterns or any(NON_ERE.search(p) for p in patterns):
+        return ""
+    if len(patterns) == 1:
+        return patterns[0]
+    return "|".join(f"({p})" for p in patterns)
+
+def render_hook(stage: str, files_re: str, inputs: str) -> str:
+    if files_re and "'" not in files_re and stage not in NO_FAST_PATH:
+        guard = GUARD_TEMPLATE.format(files_re=files_re, release_prefix=RELEASE_BRANCH_PREFIX)
+    else:
+        guard = ""
+    args = HOOK_SCRIPTS[stage]
+    if stage == "pre-push":
+        # `hook-impl` è quello che usano gli hook installati da pre-commit:
+        # legge i ref da stdin e imposta PRE_COMMIT_FROM_REF / TO_REF
+        framework_cmd = (
+            'hook-impl \\\n    --config "$HOOK_ROOT/hooks/.pre-commit-config.yaml" \\\n'
+            f'    --hook-type {stage} \\\n    --hook-dir "$HOOK_ROOT" \\\n    -- "$@"'
+        )
+    else:
+        framework_cmd = (
+            'run \\\n    --config "$HOOK_ROOT/hooks/.pre-commit-config.yaml" \\\n'
+            f'    --hook-stage {stage}' + "".join(f" \\\n    {a}" for a in args)
+        )
+    runner_args = "".join(f" \\\n  {a}" for a in args)
+    daemon = ""
+    if stage in DAEMON_STAGES:
+        daemon = DAEMON_TEMPLATE.format(stage=stage, runner_args=runner_args.replace("\n  ", "\n    "))
+    return HOOK_TEMPLATE.format(
+        stage=stage,
+        inputs_hash=inputs,
+        guard=guard,
+        framework_cmd=framework_cmd,
+        daemon=daemon,
+        runner_args=runner_args,
+    )
+
+def _write_executable(path: Path, text: str):
+    """Scrive con un file nuovo e rename: bash potrebbe stare eseguendo quello vecchio."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8", newline="\n")
+    os.chmod(tmp, 0o755)
+    os.replace(tmp, path)
+
+def write_hook_scripts():
+    """(Ri)genera config, wrapper pre-commit / commit-msg / pre-push e fast path."""
+    GENERATED_DIR.mkdir(exist_ok=True)
+    tmp = GENERATED_CONFIG.with_name(f".{GENERATED_CONFIG.name}.{os.getpid()}.tmp")
+    tmp.write_text(render_config(), encoding="utf-8", newline="\n")
+    os.replace(tmp, GENERATED_CONFIG)
+    files_re = version_files_regex()
+    inputs = inputs_hash()
+    for stage in HOOK_SCRIPTS:
+        _write_executable(GENERATED_DIR / stage, render_hook(stage, files_re, inputs))
+        # Il rimando tracciato si riscrive solo se diverso (es. stage nuovo)
+        shim = HOOK_PATH / stage
+        text = SHIM_TEMPLATE.format(stage=stage)
+        if not shim.exists() or shim.read_text(encoding="utf-8") != text:
+            _write_executable(shim, text)
+        elif not os.access(shim, os.X_OK):
+            os.chmod(shim, 0o755)
+    print("✔ Wrapper generati:", ", ".join(HOOK_SCRIPTS))
+
 def main():
+    parser = argparse.ArgumentParser(description="Attiva gli hook locali git-hooks-cordova")
+    parser.add_argument(
+        "--regenerate",
+        action="store_true",
+        help="rigenera solo i wrapper (usato dagli hook quando cambia la config)",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="non avviare il daemon degli hook (pre-commit / commit-msg girano direttamente)",
+    )
+    args = parser.parse_args()
+
+    if args.regenerate:
+        write_hook_scripts()
+        return 0
+
     print("🔧 Enabling local git hooks from:", HOOK_PATH)
 
     if not HOOK_PATH.exists():
         print("✗ tools/git-hooks-cordova not found. Hai clonato il repo degli hook?")
         return 1
 
+    print("🔧 Generating hook wrappers...")
+    write_hook_scripts()
+
     print("🔧 Setting git core.hooksPath...")
 
     run(["git", "config", "core.hooksPath", str(HOOK_PATH)])
 
+    import hook_daemon
+    from run_hooks import yaml_available
+
+    if args.no_daemon:
+        hook_daemon.stop()
+    elif not yaml_available():
+        print("ℹ Daemon degli hook non avviato: serve PyYAML")
+    else:
+        print("🔧 Starting hook daemon...")
+        hook_daemon.start()
+
     print("✅ Local hooks enabled!")
     print(f"Git ora usa gli hook in: {HOOK_PATH}")
     print("ℹ Repo cliente rimane completamente pulita.")